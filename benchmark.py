@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the NanoBanana Pro generation pipeline.
+
+Runs each pipeline stage against the local fake backend inside a throwaway
+workspace and reports seconds per operation. Results are written as JSON so
+runs can be diffed between commits; with --baseline and --threshold the run
+fails when a stage's median slows down by more than the given percentage.
+
+Usage:
+    uv run python benchmark.py -o bench.json
+    uv run python benchmark.py --baseline bench.json --threshold 10
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+
+# A stage prepares its inputs in a directory (untimed) and returns the timed
+# operation plus the number of operations one call performs
+Stage = Callable[[str], Tuple[Callable[[], None], int]]
+
+def _png_bytes(size: Tuple[int, int]) -> bytes:
+    """Encode a noisy PNG so its size resembles a real response."""
+    from PIL import Image
+    img = Image.effect_noise(size, 64).convert("RGB")
+    buffer = BytesIO()
+    img.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+def stage_fill_template(workdir: str):
+    """TemplateManager.fill_template over every built-in template."""
+    from src.templates import template_manager
+
+    templates = [template_manager.get_text_to_image_template(t) for t in template_manager.get_all_text_to_image_themes()]
+    templates += [template_manager.get_image_editing_template(f) for f in template_manager.get_all_image_editing_features()]
+
+    def run():
+        for template in templates:
+            template_manager.fill_template(template, {})
+    return run, len(templates)
+
+def stage_edit_image(workdir: str):
+    """Validation, upload encoding and request of a camera-sized edit input."""
+    from PIL import Image
+    from src.backends import FakeBackend
+    from src.gemini_client import GeminiClient
+    from src.image_probe import image_probe
+
+    path = os.path.join(workdir, "camera.jpg")
+    Image.effect_noise((4000, 3000), 32).convert("RGB").save(path, quality=90)
+    client = GeminiClient(backend=FakeBackend(latency_mean=0, default_size="64x64"))
+
+    def run():
+        image_probe.clear()
+        success, message, _ = client.edit_image("Make it warmer", [path])
+        assert success, message
+    return run, 1
+
+def stage_response_decode(workdir: str):
+    """Extracting text and inline image data from a Gemini response."""
+    from src.backends import GeminiBackend
+
+    data = _png_bytes((1024, 1024))
+    parts = [SimpleNamespace(text="Here is your image", inline_data=None),
+             SimpleNamespace(text=None, inline_data=SimpleNamespace(data=data))]
+    response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))])
+    backend = GeminiBackend.__new__(GeminiBackend)  # no API configuration needed
+
+    def run():
+        for _ in range(100):
+            backend.decode(response)
+    return run, 100
+
+def stage_save_images(workdir: str):
+    """save_images of two ~2MB PNGs until they are on disk."""
+    from src.backends import FakeBackend
+    from src.gemini_client import GeminiClient
+    from src.write_behind import write_behind
+
+    images = [_png_bytes((1024, 1024)), _png_bytes((1024, 1024))]
+    client = GeminiClient(backend=FakeBackend(latency_mean=0))
+
+    def run():
+        client.save_images(images, "bench")
+        errors = write_behind.flush()
+        assert not errors, errors
+    return run, len(images)
+
+def stage_add_to_history(workdir: str):
+    """config.add_to_history with a full 1000-entry history."""
+    from src.config import config
+    from src.write_behind import write_behind
+
+    config.settings["max_history_items"] = 1000
+    entry = {"mode": "text-to-image", "theme_or_feature": "photorealistic",
+             "prompt": "A photorealistic banana " * 10, "resolution": "square-medium",
+             "generated_files": ["images/text2img_photorealistic_20250101_000000.png"]}
+    for _ in range(1000):
+        config.add_to_history(dict(entry))
+    write_behind.flush()
+
+    def run():
+        config.add_to_history(dict(entry))
+        write_behind.flush()
+    return run, 1
+
+def stage_directory_scan(workdir: str):
+    """EnhancedImageBrowser directory scan of a nested tree of 3000 images."""
+    from pathlib import Path
+    from rich.console import Console
+    from src.enhanced_image_browser import EnhancedImageBrowser
+
+    root = Path(workdir) / "gallery"
+    for d in range(30):
+        folder = root / f"album_{d:02d}" / "raw"
+        folder.mkdir(parents=True)
+        for i in range(100):
+            (folder / f"IMG_{i:04d}.jpg").write_bytes(b"\xff\xd8\xff")
+            if i % 10 == 0:
+                (folder / f"notes_{i}.txt").write_text("not an image")
+    browser = EnhancedImageBrowser(Console(file=open(os.devnull, "w")))
+    browser.current_directory = root
+
+    def run():
+        images, _ = browser._scan_images_in_directory(root)
+        assert len(images) == 3000
+    return run, 1
+
+def stage_generate_end_to_end(workdir: str):
+    """generate_text_to_image plus saving with a zero-latency fake backend."""
+    from src.backends import FakeBackend
+    from src.gemini_client import GeminiClient
+    from src.write_behind import write_behind
+
+    client = GeminiClient(backend=FakeBackend(latency_mean=0, payload_kb=2048))
+
+    def run():
+        success, message, images = client.generate_text_to_image("A banana", "square-medium")
+        assert success, message
+        client.save_images(images, "bench_e2e")
+        write_behind.flush()
+    return run, 1
+
+STAGES: Dict[str, Stage] = {
+    "fill_template": stage_fill_template,
+    "edit_image": stage_edit_image,
+    "response_decode": stage_response_decode,
+    "save_images": stage_save_images,
+    "add_to_history": stage_add_to_history,
+    "directory_scan": stage_directory_scan,
+    "generate_end_to_end": stage_generate_end_to_end
+}
+
+def run_stage(name: str, workdir: str, repeat: int) -> Dict[str, float]:
+    """Time one stage; returns per-operation statistics in seconds."""
+    stage_dir = os.path.join(workdir, name)
+    os.makedirs(stage_dir)
+    run, ops = STAGES[name](stage_dir)
+
+    run()  # warm-up: imports, caches, pools
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) / ops)
+
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops_per_sample": ops,
+        "repeat": repeat
+    }
+
+def _git_commit() -> Optional[str]:
+    """Current commit hash, if running from a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(names: List[str], repeat: int) -> Dict:
+    """Run the selected stages in an isolated workspace."""
+    # Never touch the real API from a benchmark
+    os.environ["NANOBANANA_BACKEND"] = "fake"
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="nanobanana-bench-") as workdir:
+        # Config, images and history are relative to the working directory
+        os.chdir(workdir)
+        try:
+            from src.config import config
+            config.settings.update({"save_history": True, "response_cache": False,
+                                    "rate_limit_rpm": 0, "output_codec": "original"})
+            stages = {}
+            for name in names:
+                print(f"  {name}...", end="", flush=True)
+                stages[name] = run_stage(name, workdir, repeat)
+                print(f" {stages[name]['median'] * 1000:.3f} ms/op")
+        finally:
+            os.chdir(original_cwd)
+
+    return {
+        "version": 1,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stages": stages
+    }
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print per-stage changes against a baseline; return the regressed stages."""
+    regressions = []
+    print(f"\n{'Stage':<22} {'Baseline':>12} {'Current':>12} {'Change':>9}")
+    for name, current in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            print(f"{name:<22} {'-':>12} {current['median'] * 1000:>10.3f}ms {'new':>9}")
+            continue
+        change = (current["median"] - base["median"]) / base["median"] * 100 if base["median"] else 0.0
+        flag = ""
+        if threshold is not None and change > threshold:
+            regressions.append(name)
+            flag = "  ✗ regression"
+        print(f"{name:<22} {base['median'] * 1000:>10.3f}ms {current['median'] * 1000:>10.3f}ms {change:>+8.1f}%{flag}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the NanoBanana Pro pipeline with the fake backend")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON result")
+    parser.add_argument("--threshold", type=float,
+                        help="Fail when a stage's median is more than N%% slower than the baseline")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Timed samples per stage")
+    parser.add_argument("-s", "--stage", action="append", choices=sorted(STAGES),
+                        help="Only run this stage (repeatable)")
+    args = parser.parse_args(argv)
+
+    if args.threshold is not None and not args.baseline:
+        parser.error("--threshold requires --baseline")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print("🍌 NanoBanana Pro benchmark")
+    results = run_benchmarks(args.stage or list(STAGES), max(1, args.repeat))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) regressed by more than {args.threshold:g}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,11 @@ __version__ = "2.0.0"
 __author__ = "NanoBanana Pro Team"
 __description__ = "Professional AI-powered image generation and editing CLI application using Google's Gemini API"
 
-from .main import main
+__all__ = ["main"]
 
-__all__ = ["main"]
\ No newline at end of file
+def __getattr__(name):
+    # Importing the package (e.g. for src.image_probe) shouldn't load the whole app
+    if name == "main":
+        from .main import main
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,314 @@
+"""Generation backends behind ``GeminiClient``.
+
+``GeminiBackend`` talks to the Gemini API. ``FakeBackend`` runs locally and
+returns synthetic PNGs with configurable latency and failure rates, so
+concurrency, retries, saving and history can be exercised without quota or
+network access.
+
+The backend is chosen with the ``backend`` setting or the
+``NANOBANANA_BACKEND`` environment variable (``gemini``, ``fake`` or
+``replay``; see ``cassette.py`` for recording and replay).
+"""
+
+import os
+import re
+import time
+import zlib
+import math
+import random
+import struct
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import config
+
+class GenerationBackend:
+    """Interface for something that turns request content into text and images."""
+
+    name = "base"
+
+    @property
+    def model_name(self) -> str:
+        """Model identifier used in response cache keys."""
+        return self.name
+
+    def fetch(self, content: List[Any]) -> Any:
+        """Send one request and return the raw response.
+
+        Failures are raised as exceptions so the client can classify and retry them.
+        """
+        raise NotImplementedError
+
+    async def fetch_async(self, content: List[Any]) -> Any:
+        """Coroutine variant of ``fetch``."""
+        return await asyncio.to_thread(self.fetch, content)
+
+    def decode(self, response: Any) -> Tuple[Optional[str], List[bytes]]:
+        """Turn a raw response into the response text and encoded images."""
+        return response
+
+    def generate(self, content: List[Any]) -> Tuple[Optional[str], List[bytes]]:
+        """Run one request; return the response text and encoded images."""
+        return self.decode(self.fetch(content))
+
+    async def generate_async(self, content: List[Any]) -> Tuple[Optional[str], List[bytes]]:
+        """Coroutine variant of ``generate``."""
+        return self.decode(await self.fetch_async(content))
+
+class GeminiBackend(GenerationBackend):
+    """Backend that calls the Gemini API through ``google.generativeai``."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None):
+        import google.generativeai as genai
+
+        self.api_key = api_key or config.get_api_key()
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+
+        self._genai = genai
+        genai.configure(api_key=self.api_key)
+        self._image_model = None
+        self._text_model = None
+
+    @property
+    def model_name(self) -> str:
+        return config.GEMINI_IMAGE_MODEL
+
+    @property
+    def image_model(self):
+        """Get image generation model."""
+        if self._image_model is None:
+            self._image_model = self._genai.GenerativeModel(config.GEMINI_IMAGE_MODEL)
+        return self._image_model
+
+    @property
+    def text_model(self):
+        """Get text generation model."""
+        if self._text_model is None:
+            self._text_model = self._genai.GenerativeModel(config.GEMINI_TEXT_MODEL)
+        return self._text_model
+
+    def fetch(self, content: List[Any]) -> Any:
+        return self.image_model.generate_content(content)
+
+    async def fetch_async(self, content: List[Any]) -> Any:
+        return await self.image_model.generate_content_async(content)
+
+    def decode(self, response: Any) -> Tuple[Optional[str], List[bytes]]:
+        """Extract text and inline image data from a model response."""
+        images = []
+        text_response = None
+
+        for part in response.candidates[0].content.parts:
+            if part.text:
+                text_response = part.text
+            elif part.inline_data:
+                images.append(part.inline_data.data)
+
+        return text_response, images
+
+class FakeBlockedPromptException(Exception):
+    """Raised by the fake backend to simulate a safety block."""
+
+FAILURE_MESSAGES = {
+    "rate_limit": "429 Resource has been exhausted",
+    "server": "503 The model is overloaded",
+    "safety": "Prompt blocked by safety filters"
+}
+
+def simulated_error(category: str, message: str) -> Exception:
+    """Build an exception that the retry module classifies as ``category``."""
+    try:
+        # Imported here: google.api_core pulls in grpc, which is slow to load
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        api_exceptions = None
+
+    if category == "rate_limit" and api_exceptions is not None:
+        return api_exceptions.TooManyRequests(message)
+    if category == "server" and api_exceptions is not None:
+        return api_exceptions.ServiceUnavailable(message)
+    if category == "safety":
+        return FakeBlockedPromptException(message)
+    if category == "network":
+        return ConnectionError(message)
+    # Without google.api_core the message text still classifies correctly
+    return RuntimeError(message)
+
+class FakeBackend(GenerationBackend):
+    """Deterministic local backend that returns synthetic PNGs.
+
+    The image size follows the resolution instruction in the prompt
+    ("exactly WxH pixels"), falling back to ``default_size``. Latency is drawn
+    from ``latency_distribution`` ("constant", "uniform", "exponential" or
+    "lognormal") with mean ``latency_mean`` seconds. ``rate_limit_rate``,
+    ``server_error_rate`` and ``safety_rate`` are per-request failure
+    probabilities, and ``payload_kb`` pads each PNG to roughly that size.
+    """
+
+    name = "fake"
+
+    DEFAULTS = {
+        "latency_distribution": "lognormal",
+        "latency_mean": 0.5,
+        "latency_sigma": 0.5,
+        "rate_limit_rate": 0.0,
+        "server_error_rate": 0.0,
+        "safety_rate": 0.0,
+        "payload_kb": 0,
+        "default_size": "1024x1024",
+        "seed": 0
+    }
+
+    _SIZE_PATTERN = re.compile(r"exactly (\d+)x(\d+) pixels")
+
+    def __init__(self, **options):
+        unknown = set(options) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown fake backend options: {', '.join(sorted(unknown))}")
+        settings = {**self.DEFAULTS, **options}
+
+        self.latency_distribution = settings["latency_distribution"]
+        if self.latency_distribution not in ("constant", "uniform", "exponential", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {self.latency_distribution}")
+        self.latency_mean = float(settings["latency_mean"])
+        self.latency_sigma = float(settings["latency_sigma"])
+        self.rate_limit_rate = float(settings["rate_limit_rate"])
+        self.server_error_rate = float(settings["server_error_rate"])
+        self.safety_rate = float(settings["safety_rate"])
+        self.payload_kb = int(settings["payload_kb"])
+        width, height = str(settings["default_size"]).lower().split("x")
+        self.default_size = (int(width), int(height))
+
+        self._random = random.Random(settings["seed"])
+        self._lock = threading.Lock()
+        self._png_cache: Dict[Tuple[int, int, int], bytes] = {}
+        self.requests = 0
+
+    @classmethod
+    def from_config(cls) -> 'FakeBackend':
+        """Create a fake backend from the ``fake_backend`` settings."""
+        return cls(**config.get("fake_backend", {}))
+
+    def fetch(self, content: List[Any]) -> Tuple[Optional[str], List[bytes]]:
+        delay, failure = self._plan()
+        time.sleep(delay)
+        return self._respond(content, failure)
+
+    async def fetch_async(self, content: List[Any]) -> Tuple[Optional[str], List[bytes]]:
+        delay, failure = self._plan()
+        await asyncio.sleep(delay)
+        return self._respond(content, failure)
+
+    def _plan(self) -> Tuple[float, Optional[str]]:
+        """Draw this request's latency and outcome from the seeded generator."""
+        with self._lock:
+            self.requests += 1
+            delay = self._latency()
+            roll = self._random.random()
+
+        failure = None
+        for kind, rate in (("rate_limit", self.rate_limit_rate),
+                           ("server", self.server_error_rate),
+                           ("safety", self.safety_rate)):
+            if roll < rate:
+                failure = kind
+                break
+            roll -= rate
+        return delay, failure
+
+    def _latency(self) -> float:
+        """Draw a latency with the configured distribution and mean."""
+        mean = self.latency_mean
+        if mean <= 0:
+            return 0.0
+        if self.latency_distribution == "uniform":
+            return self._random.uniform(0, 2 * mean)
+        if self.latency_distribution == "exponential":
+            return self._random.expovariate(1 / mean)
+        if self.latency_distribution == "lognormal":
+            sigma = self.latency_sigma
+            return self._random.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)
+        return mean
+
+    def _respond(self, content: List[Any], failure: Optional[str]) -> Tuple[Optional[str], List[bytes]]:
+        """Raise the planned failure or build a successful response."""
+        if failure is not None:
+            raise simulated_error(failure, f"{FAILURE_MESSAGES[failure]} (fake backend)")
+
+        prompt = next((part for part in content if isinstance(part, str)), "")
+        match = self._SIZE_PATTERN.search(prompt)
+        size = (int(match.group(1)), int(match.group(2))) if match else self.default_size
+        shade = zlib.crc32(prompt.encode("utf-8")) & 0xFFFFFF
+        return f"Fake image for: {prompt[:60]}", [self._synthetic_png(size, shade)]
+
+    def _synthetic_png(self, size: Tuple[int, int], shade: int) -> bytes:
+        """Build (and memoize) a solid-colour PNG padded to ``payload_kb``."""
+        key = (size[0], size[1], shade)
+        with self._lock:
+            cached = self._png_cache.get(key)
+        if cached is not None:
+            return cached
+
+        width, height = size
+        color = bytes(((shade >> 16) & 0xFF, (shade >> 8) & 0xFF, shade & 0xFF))
+        raw = (b"\x00" + color * width) * height
+        chunks = [
+            self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+            self._chunk(b"IDAT", zlib.compress(raw, 1))
+        ]
+        png = b"\x89PNG\r\n\x1a\n" + b"".join(chunks)
+
+        # Pad with a private ancillary chunk that decoders skip
+        padding = self.payload_kb * 1024 - len(png) - 12 - 12
+        if padding > 0:
+            png += self._chunk(b"fkPd", bytes(padding))
+        png += self._chunk(b"IEND", b"")
+
+        with self._lock:
+            if len(self._png_cache) < 64:
+                self._png_cache[key] = png
+        return png
+
+    @staticmethod
+    def _chunk(kind: bytes, data: bytes) -> bytes:
+        """Encode one PNG chunk."""
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def backend_name() -> str:
+    """Name of the configured backend."""
+    return (os.environ.get("NANOBANANA_BACKEND") or config.get("backend", "gemini")).lower()
+
+def create_backend(name: Optional[str] = None) -> GenerationBackend:
+    """Create the configured backend (or ``name`` when given).
+
+    ``replay`` serves responses from the cassette at ``NANOBANANA_CASSETTE``
+    (or the ``cassette_path`` setting). Setting ``NANOBANANA_RECORD`` to a
+    file path records every interaction of the chosen backend to that cassette.
+    """
+    name = (name or backend_name()).lower()
+    if name == "gemini":
+        backend = GeminiBackend()
+    elif name == "fake":
+        backend = FakeBackend.from_config()
+    elif name == "replay":
+        from .cassette import ReplayBackend
+        path = os.environ.get("NANOBANANA_CASSETTE") or config.get("cassette_path")
+        if not path:
+            raise ValueError("Replay backend needs a cassette: set NANOBANANA_CASSETTE")
+        return ReplayBackend(
+            path,
+            timing_scale=float(config.get("cassette_timing_scale", 1.0)),
+            match=config.get("cassette_match", "fingerprint")
+        )
+    else:
+        raise ValueError(f"Unknown backend: {name}")
+
+    record_path = os.environ.get("NANOBANANA_RECORD")
+    if record_path:
+        from .cassette import RecordingBackend
+        backend = RecordingBackend(backend, record_path)
+    return backend
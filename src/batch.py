@@ -0,0 +1,360 @@
+"""Headless batch generation for NanoBanana Pro.
+
+Reads job records from a JSONL file, runs them through a worker pool against
+the Gemini client and streams one result record per job to a manifest file.
+Jobs already recorded in the manifest are skipped, so an interrupted run can
+simply be restarted with the same arguments.
+
+Job record fields:
+    id             Optional stable job identifier (defaults to a hash of the record)
+    prompt         Prompt text, or
+    template       Theme key (text-to-image) or feature key (editing, with ``images``)
+    parameters     Template parameters used with ``template``
+    theme          Label for prompt-only jobs (used for history and file prefix)
+    resolution     Resolution preset name, e.g. ``square-medium``
+    images         Input image paths; makes the job an image editing job
+    output_prefix  Prefix for saved image files
+    cache          Response cache mode: "use" (default), "refresh" or "off"
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterator, Set, Tuple
+
+from .config import config
+from .templates import template_manager
+from .write_behind import write_behind
+
+@dataclass
+class BatchJob:
+    """A single generation job from the job file."""
+    job_id: str
+    line_number: int
+    prompt: Optional[str] = None
+    template: Optional[str] = None
+    parameters: Dict[str, str] = field(default_factory=dict)
+    theme: Optional[str] = None
+    resolution: Optional[str] = None
+    images: List[str] = field(default_factory=list)
+    output_prefix: Optional[str] = None
+    cache_mode: str = "use"
+
+    @property
+    def mode(self) -> str:
+        """Generation mode of this job."""
+        return "image-editing" if self.images else "text-to-image"
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any], line_number: int) -> 'BatchJob':
+        """Create a job from a decoded JSONL record."""
+        if not isinstance(record, dict):
+            raise ValueError("job record must be a JSON object")
+        if not record.get("prompt") and not record.get("template"):
+            raise ValueError("job record needs a 'prompt' or a 'template'")
+
+        job_id = record.get("id")
+        if job_id is None:
+            canonical = json.dumps(record, sort_keys=True, ensure_ascii=False)
+            job_id = hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+        images = record.get("images") or []
+        if isinstance(images, str):
+            images = [images]
+
+        cache_mode = record.get("cache", "use")
+        if cache_mode not in ("use", "refresh", "off"):
+            raise ValueError(f"invalid cache mode: {cache_mode}")
+
+        return cls(
+            job_id=str(job_id),
+            line_number=line_number,
+            prompt=record.get("prompt"),
+            template=record.get("template"),
+            parameters=record.get("parameters") or {},
+            theme=record.get("theme"),
+            resolution=record.get("resolution"),
+            images=list(images),
+            output_prefix=record.get("output_prefix"),
+            cache_mode=cache_mode
+        )
+
+    def resolve_prompt(self) -> Tuple[str, str]:
+        """Return the final prompt and the theme/feature label for history."""
+        if self.template:
+            if self.images:
+                template = template_manager.get_image_editing_template(self.template)
+            else:
+                template = template_manager.get_text_to_image_template(self.template)
+            if not template:
+                raise ValueError(f"Template not found: {self.template}")
+            return template_manager.fill_template(template, self.parameters), template.name
+
+        return self.prompt, self.theme or "custom"
+
+    def file_prefix(self) -> str:
+        """Prefix for saved files; the job id keeps parallel jobs from colliding."""
+        if self.output_prefix:
+            base = self.output_prefix
+        elif self.images:
+            base = f"batch_edited_{self.template or self.theme or 'custom'}"
+        else:
+            base = f"batch_text2img_{self.template or self.theme or 'custom'}"
+        return f"{base}_{self.job_id}"
+
+def iter_jobs(jobs_path: str) -> Iterator[Tuple[Optional[BatchJob], Optional[str], int]]:
+    """Stream jobs from a JSONL file.
+
+    Yields ``(job, error, line_number)``; ``error`` is set for malformed lines.
+    """
+    with open(jobs_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                yield BatchJob.from_record(json.loads(line), line_number), None, line_number
+            except (json.JSONDecodeError, ValueError) as e:
+                yield None, str(e), line_number
+
+def load_manifest(manifest_path: str) -> Dict[str, str]:
+    """Load the latest recorded status per job id from a manifest file."""
+    statuses = {}
+    if not os.path.exists(manifest_path):
+        return statuses
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line behind
+                continue
+            if isinstance(record, dict) and "id" in record:
+                statuses[str(record["id"])] = record.get("status", "")
+    return statuses
+
+class BatchRunner:
+    """Runs batch jobs through a thread pool and records results to a manifest."""
+
+    def __init__(self, client, manifest_path: str, workers: int = 4,
+                 retry_failed: bool = False, save_history: bool = True, quiet: bool = False,
+                 cache_mode: Optional[str] = None):
+        self.client = client
+        self.cache_mode = cache_mode  # Overrides per-job cache modes when set
+        self.manifest_path = manifest_path
+        self.workers = max(1, workers)
+        self.retry_failed = retry_failed
+        self.save_history = save_history
+        self.quiet = quiet
+        self._lock = threading.Lock()
+        self.stats = {"success": 0, "failed": 0, "skipped": 0, "invalid": 0}
+
+    def _should_skip(self, job_id: str, statuses: Dict[str, str]) -> bool:
+        """Check whether a job was already handled in a previous run."""
+        status = statuses.get(job_id)
+        if status is None:
+            return False
+        return status == "success" or not self.retry_failed
+
+    def run(self, jobs_path: str) -> Dict[str, int]:
+        """Run every job in the job file that is not already in the manifest."""
+        statuses = load_manifest(self.manifest_path)
+        seen: Set[str] = set()
+        # Bound the number of queued jobs so huge job files are streamed, not loaded
+        slots = threading.BoundedSemaphore(self.workers * 2)
+
+        with open(self.manifest_path, 'a', encoding='utf-8') as manifest, \
+             ThreadPoolExecutor(max_workers=self.workers) as executor:
+            interrupted = True
+            try:
+                for job, error, line_number in iter_jobs(jobs_path):
+                    if job is None:
+                        self._report(f"✗ line {line_number}: {error}")
+                        self.stats["invalid"] += 1
+                        continue
+                    if job.job_id in seen or self._should_skip(job.job_id, statuses):
+                        self.stats["skipped"] += 1
+                        continue
+                    seen.add(job.job_id)
+
+                    slots.acquire()
+                    future = executor.submit(self._run_job, job, manifest)
+                    future.add_done_callback(lambda _: slots.release())
+                interrupted = False
+            finally:
+                # Even on Ctrl-C, let running jobs finish and record them so a resume doesn't redo them
+                executor.shutdown(wait=True, cancel_futures=interrupted)
+                # Manifest records of the last jobs are written by the save callbacks
+                write_behind.flush()
+
+        return self.stats
+
+    def _run_job(self, job: BatchJob, manifest) -> None:
+        """Execute one job; its manifest record is written once its images are saved."""
+        started = time.perf_counter()
+        retry_stats = None
+
+        try:
+            prompt, label = job.resolve_prompt()
+            is_valid, message = self.client.validate_prompt(prompt)
+            if is_valid:
+                cache_mode = self.cache_mode or job.cache_mode
+                if job.images:
+                    success, message, images = self.client.edit_image(
+                        prompt, job.images, job.resolution, cache_mode=cache_mode)
+                else:
+                    success, message, images = self.client.generate_text_to_image(
+                        prompt, job.resolution, cache_mode=cache_mode)
+                retry_stats = getattr(self.client, "last_call_stats", None)
+                if success and images:
+                    # Disk writes overlap with the next request; the job finishes when they're done
+                    def on_saved(files: List[str], errors: List[str]):
+                        self._finish_job(job, manifest, started, retry_stats, prompt, label,
+                                         not errors and bool(files),
+                                         "; ".join(errors) if errors else message, files)
+                    self.client.save_images(images, job.file_prefix(), on_complete=on_saved)
+                    return
+                success = False
+            else:
+                success = False
+        except Exception as e:
+            prompt, label = job.prompt, job.theme or "custom"
+            success, message = False, f"Unexpected error: {str(e)}"
+
+        self._finish_job(job, manifest, started, retry_stats, prompt, label, success, message, [])
+
+    def _finish_job(self, job: BatchJob, manifest, started: float, retry_stats,
+                    prompt: str, label: str, success: bool, message: str, files: List[str]) -> None:
+        """Append a job's result to the manifest and history."""
+        if success and not files:
+            success, message = False, "Images were generated but couldn't be saved"
+
+        record = {
+            "id": job.job_id,
+            "line": job.line_number,
+            "status": "success" if success else "failed",
+            "mode": job.mode,
+            "message": message,
+            "generated_files": files,
+            "elapsed": round(time.perf_counter() - started, 3),
+            "retries": retry_stats.retries if retry_stats else 0,
+            "backoff_seconds": round(retry_stats.backoff_seconds, 3) if retry_stats else 0.0,
+            "finished_at": datetime.now().isoformat()
+        }
+
+        with self._lock:
+            manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+            manifest.flush()
+            self.stats["success" if success else "failed"] += 1
+
+        # Outside the lock: queueing the history write can block while the write-behind queue is full
+        if success and self.save_history:
+            entry = {
+                "mode": job.mode,
+                "theme_or_feature": label,
+                "prompt": prompt,
+                "resolution": job.resolution or ("original" if job.images else None),
+                "generated_files": files,
+                "batch_job": job.job_id
+            }
+            if job.images:
+                entry["input_images"] = job.images
+            config.add_to_history(entry)
+
+        if success:
+            self._report(f"✓ {job.job_id}: {', '.join(files)}")
+        else:
+            self._report(f"✗ {job.job_id}: {message}")
+
+    def _report(self, message: str):
+        """Print a progress line unless running quietly."""
+        if not self.quiet:
+            print(message, flush=True)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for ``nanobanana batch``."""
+    parser = argparse.ArgumentParser(
+        prog="nanobanana batch",
+        description="Run generation jobs from a JSONL file without the interactive menus"
+    )
+    parser.add_argument("jobs", help="JSONL job file (one job record per line)")
+    parser.add_argument("-o", "--manifest",
+                        help="Output manifest file (default: <jobs>.manifest.jsonl)")
+    parser.add_argument("-w", "--workers", type=int,
+                        default=config.get("max_concurrent_requests", 4),
+                        help="Number of concurrent requests")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Re-run jobs recorded as failed in the manifest")
+    parser.add_argument("--no-history", action="store_true",
+                        help="Don't add batch results to the generation history")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Only print the final summary")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument("--cache", action="store_true",
+                             help="Enable the response cache for this run")
+    cache_group.add_argument("--no-cache", action="store_true",
+                             help="Bypass the response cache for every job")
+    cache_group.add_argument("--refresh-cache", action="store_true",
+                             help="Force fresh results and overwrite cached responses")
+
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.jobs):
+        print(f"Error: job file not found: {args.jobs}", file=sys.stderr)
+        return 1
+
+    manifest_path = args.manifest or f"{os.path.splitext(args.jobs)[0]}.manifest.jsonl"
+
+    if args.cache or args.refresh_cache:
+        config.settings["response_cache"] = True
+    cache_mode = "off" if args.no_cache else "refresh" if args.refresh_cache else None
+
+    from .gemini_client import get_client
+    try:
+        client = get_client()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    runner = BatchRunner(
+        client,
+        manifest_path,
+        workers=args.workers,
+        retry_failed=args.retry_failed,
+        save_history=not args.no_history,
+        quiet=args.quiet,
+        cache_mode=cache_mode
+    )
+
+    try:
+        stats = runner.run(args.jobs)
+    except KeyboardInterrupt:
+        print("\nBatch interrupted; re-run the same command to resume", file=sys.stderr)
+        return 130
+
+    print(f"\nBatch complete: {stats['success']} succeeded, {stats['failed']} failed, "
+          f"{stats['skipped']} skipped, {stats['invalid']} invalid")
+    print(f"Manifest: {manifest_path}")
+
+    retry_totals = client.retry_totals.snapshot()
+    if retry_totals["retries"]:
+        print(f"Retries: {retry_totals['retries']} "
+              f"({retry_totals['backoff_seconds']:.1f}s spent backing off) {retry_totals['retries_by_category']}")
+
+    cache = client.response_cache
+    if cache is not None and cache_mode != "off":
+        cache_stats = cache.stats()
+        print(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['entries']} entries ({cache_stats['bytes'] / (1024 * 1024):.1f}MB)")
+    return 0 if stats["failed"] == 0 and stats["invalid"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Record/replay cassettes of generation responses.
+
+``RecordingBackend`` wraps another backend and captures each request's
+fingerprint, response text, images and observed latency. ``ReplayBackend``
+serves those responses back with the recorded timing (optionally scaled) and
+needs neither network nor an API key, so benchmarks can run against real
+model outputs deterministically.
+
+A cassette is a zip file holding ``interactions.jsonl`` plus one stored (not
+recompressed) member per distinct image under ``blobs/``.
+"""
+
+import os
+import json
+import time
+import atexit
+import asyncio
+import hashlib
+import tempfile
+import threading
+import zipfile
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .backends import GenerationBackend, simulated_error
+from .retry import classify_error
+
+INDEX_NAME = "interactions.jsonl"
+
+def fingerprint(content: List[Any]) -> str:
+    """Stable hash of request content (text parts and image blob digests)."""
+    digest = hashlib.sha256()
+    for part in content:
+        if isinstance(part, str):
+            digest.update(b"text\0" + part.encode("utf-8"))
+        elif isinstance(part, dict) and "data" in part:
+            digest.update(b"blob\0" + str(part.get("mime_type", "")).encode("utf-8"))
+            digest.update(hashlib.sha256(part["data"]).digest())
+        else:
+            digest.update(b"other\0" + type(part).__name__.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class RecordingBackend(GenerationBackend):
+    """Backend wrapper that records every interaction to a cassette file."""
+
+    name = "record"
+
+    def __init__(self, inner: GenerationBackend, path: str):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        self._interactions: List[Dict[str, Any]] = []
+        self._blobs: set = set()
+        # Record to a temporary file so a cassette is never left half-written
+        fd, self._tmp_path = tempfile.mkstemp(prefix=".cassette-", dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+        self._zip: Optional[zipfile.ZipFile] = zipfile.ZipFile(self._tmp_path, "w", zipfile.ZIP_DEFLATED)
+        atexit.register(self.close)
+
+    @property
+    def model_name(self) -> str:
+        return self.inner.model_name
+
+    def fetch(self, content: List[Any]) -> Tuple[Optional[str], List[bytes]]:
+        started = time.perf_counter()
+        try:
+            text, images = self.inner.generate(content)
+        except Exception as e:
+            self._record(content, time.perf_counter() - started, error=e)
+            raise
+        self._record(content, time.perf_counter() - started, text, images)
+        return text, images
+
+    async def fetch_async(self, content: List[Any]) -> Tuple[Optional[str], List[bytes]]:
+        started = time.perf_counter()
+        try:
+            text, images = await self.inner.generate_async(content)
+        except Exception as e:
+            await asyncio.to_thread(self._record, content, time.perf_counter() - started, error=e)
+            raise
+        await asyncio.to_thread(self._record, content, time.perf_counter() - started, text, images)
+        return text, images
+
+    def _record(self, content: List[Any], latency: float, text: Optional[str] = None,
+                images: Optional[List[bytes]] = None, error: Optional[Exception] = None):
+        """Store one interaction; identical images are stored once."""
+        interaction: Dict[str, Any] = {
+            "fingerprint": fingerprint(content),
+            "latency": round(latency, 4)
+        }
+        if error is not None:
+            interaction["error"] = {"category": classify_error(error), "message": str(error)}
+        else:
+            interaction["text"] = text
+            interaction["images"] = [hashlib.sha256(data).hexdigest() for data in images or []]
+
+        with self._lock:
+            if self._zip is None:
+                return
+            for name, data in zip(interaction.get("images", []), images or []):
+                if name not in self._blobs:
+                    # Image payloads are already compressed
+                    self._zip.writestr(f"blobs/{name}", data, compress_type=zipfile.ZIP_STORED)
+                    self._blobs.add(name)
+            self._interactions.append(interaction)
+
+    def close(self):
+        """Write the interaction index and close the cassette."""
+        with self._lock:
+            if self._zip is None:
+                return
+            index = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in self._interactions)
+            self._zip.writestr(INDEX_NAME, index)
+            self._zip.close()
+            self._zip = None
+            os.replace(self._tmp_path, self.path)
+
+class ReplayBackend(GenerationBackend):
+    """Backend that serves responses from a cassette.
+
+    With ``match="fingerprint"`` each request gets the next recorded response
+    for identical content; ``match="sequential"`` replays interactions in
+    recorded order regardless of content. Recorded latencies are multiplied by
+    ``timing_scale`` (0 replays instantly).
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, timing_scale: float = 1.0, match: str = "fingerprint"):
+        if match not in ("fingerprint", "sequential"):
+            raise ValueError(f"Unknown cassette match mode: {match}")
+        self.path = path
+        self.timing_scale = max(0.0, float(timing_scale))
+        self.match = match
+        self._lock = threading.Lock()
+        self._zip = zipfile.ZipFile(path, "r")
+
+        with self._zip.open(INDEX_NAME) as f:
+            self.interactions = [json.loads(line) for line in f if line.strip()]
+        self._by_fingerprint: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for interaction in self.interactions:
+            self._by_fingerprint[interaction["fingerprint"]].append(interaction)
+        self._position = 0
+
+    def _next(self, content: List[Any]) -> Dict[str, Any]:
+        """Pick the recorded interaction for this request; repeats cycle."""
+        with self._lock:
+            if self.match == "sequential":
+                if not self.interactions:
+                    raise LookupError(f"Cassette {self.path} is empty")
+                interaction = self.interactions[self._position % len(self.interactions)]
+                self._position += 1
+                return interaction
+
+            key = fingerprint(content)
+            queue = self._by_fingerprint.get(key)
+            if not queue:
+                raise LookupError(f"No recorded response for request {key[:12]} in {self.path}")
+            interaction = queue.popleft()
+            queue.append(interaction)
+            return interaction
+
+    def _respond(self, interaction: Dict[str, Any]) -> Tuple[Optional[str], List[bytes]]:
+        """Rebuild the recorded response or raise the recorded error."""
+        error = interaction.get("error")
+        if error:
+            raise simulated_error(error["category"], error["message"])
+        with self._lock:
+            images = [self._zip.read(f"blobs/{name}") for name in interaction.get("images", [])]
+        return interaction.get("text"), images
+
+    def fetch(self, content: List[Any]) -> Tuple[Optional[str], List[bytes]]:
+        interaction = self._next(content)
+        time.sleep(interaction["latency"] * self.timing_scale)
+        return self._respond(interaction)
+
+    async def fetch_async(self, content: List[Any]) -> Tuple[Optional[str], List[bytes]]:
+        interaction = self._next(content)
+        await asyncio.sleep(interaction["latency"] * self.timing_scale)
+        return self._respond(interaction)
@@ -4,7 +4,6 @@ import os
 import re
 from typing import Dict, List, Optional, Any, Tuple
 from PIL import Image
-from io import BytesIO
 
 from .ui import ui
 from .gemini_client import get_client
@@ -14,11 +13,18 @@ class ChatImageGenerator:
     """Handles conversational image generation and refinement."""
     
     def __init__(self):
-        self.client = get_client()
+        self._client = None
         self.conversation_history = []
         self.current_images = []
         self.reference_images = {}  # Store referenced images by name
     
+    @property
+    def client(self):
+        """Gemini client, created on first use."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+    
     def _parse_image_references(self, text: str) -> Tuple[str, List[str]]:
         """Parse image references in text and return clean text and image paths.
         
@@ -50,8 +56,12 @@ class ChatImageGenerator:
         
         return clean_text, image_paths
     
-    def _load_reference_images(self, image_paths: List[str]) -> List[Image.Image]:
-        """Load referenced images from file paths."""
+    def _load_reference_images(self, image_paths: List[str]) -> List[str]:
+        """Check referenced images and return their absolute paths.
+        
+        Paths rather than opened images go into the request, so files that
+        already fit the upload policy are sent as their original bytes.
+        """
         loaded_images = []
         
         for path in image_paths:
@@ -67,12 +77,13 @@ class ChatImageGenerator:
                 
                 # Validate it's an image file
                 try:
-                    img = Image.open(full_path)
-                    loaded_images.append(img)
+                    with Image.open(full_path):
+                        pass
+                    loaded_images.append(full_path)
                     
                     # Store in reference images for reuse
                     filename = os.path.basename(path)
-                    self.reference_images[filename] = img
+                    self.reference_images[filename] = full_path
                     
                     ui.show_info(f"📸 Loaded reference image: {filename}")
                     
@@ -137,12 +148,12 @@ class ChatImageGenerator:
             messages = []
             
             # Add current generated images to conversation context if available
+            # (passed as encoded bytes so they are uploaded without a decode/re-encode)
             if self.current_images:
                 for img_data in self.current_images:
-                    img = Image.open(BytesIO(img_data))
                     messages.append({
                         'type': 'image',
-                        'content': img
+                        'content': img_data
                     })
             
             # Add referenced images
@@ -164,6 +175,8 @@ class ChatImageGenerator:
                 
                 success, response_text, new_images = self.client.chat_about_image(messages)
             
+            ui.show_retry_stats(self.client.last_call_stats)
+            
             if success:
                 # Show response
                 ui.console.print(f"[bold cyan]Assistant:[/bold cyan] {response_text}\n")
@@ -207,24 +220,17 @@ class ChatImageGenerator:
             ui.show_warning("No images to save")
             return
         
-        # Save images
-        saved_files = self.client.save_images(self.current_images, "chat_image")
-        
-        ui.show_success(f"Saved {len(saved_files)} image(s)", saved_files)
-        
-        # Add to history
-        conversation_summary = self._summarize_conversation()
-        config.add_to_history({
+        # Save images; only files actually written are added to history
+        saved_files = ui.save_generated_images(self.client, self.current_images, "chat_image", {
             "mode": "chat-image",
             "theme_or_feature": "conversational",
-            "prompt": conversation_summary,
-            "generated_files": saved_files,
+            "prompt": self._summarize_conversation(),
             "conversation_length": len(self.conversation_history)
         })
         
         # Ask if user wants to open images
-        if config.get("auto_open_images") or \
-           ui.console.input("Open saved images? [Y/n]: ").lower() in ['', 'y', 'yes']:
+        if saved_files and (config.get("auto_open_images") or
+                            ui.console.input("Open saved images? [Y/n]: ").lower() in ['', 'y', 'yes']):
             self._open_images(saved_files)
     
     def _summarize_conversation(self) -> str:
@@ -287,6 +293,9 @@ class ChatImageGenerator:
         
         system = platform.system()
         
+        # Images are written in the background; wait until they are on disk
+        ui.wait_for_saves()
+        
         for path in image_paths:
             try:
                 if system == "Darwin":  # macOS
@@ -1,11 +1,15 @@
 """Configuration management for NanoBanana Pro."""
 
 import os
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from datetime import datetime
 import json
 from pathlib import Path
 
+from .write_behind import write_behind
+from .history_store import HistoryQuery, HistoryStore
+
 class Config:
     """Configuration manager for NanoBanana Pro."""
     
@@ -31,15 +35,44 @@ class Config:
     CONFIG_DIR = ".nanobanana"
     
     def __init__(self):
+        # Nothing touches the disk until a setting is read or a file is written
         self.config_dir = Path(self.CONFIG_DIR)
-        self.config_dir.mkdir(exist_ok=True)
         self.config_file = self.config_dir / "config.json"
-        self.history_file = self.config_dir / "history.json"
-        
-        # Ensure images directory exists
+        self.history_file = self.config_dir / "history.jsonl"
+        self._history = None
+        self._history_lock = threading.Lock()
+        self._pending_history: List[Dict[str, Any]] = []
+        self._history_queued = False  # a write of the pending entries is already queued
+        self._settings: Optional[Dict[str, Any]] = None
+    
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """Current settings, loaded from the config file on first access."""
+        if self._settings is None:
+            self._settings = self._load_config()
+        return self._settings
+    
+    @settings.setter
+    def settings(self, value: Dict[str, Any]):
+        self._settings = value
+    
+    @property
+    def history(self):
+        """History store for the ``history_backend`` setting ("jsonl" or "sqlite")."""
+        if self._history is None:
+            legacy_file = self.config_dir / "history.json"
+            if self.get("history_backend", "jsonl") == "sqlite":
+                from .history_db import SQLiteHistoryStore
+                self._history = SQLiteHistoryStore(self.config_dir / "history.db",
+                                                   import_paths=(self.history_file, legacy_file))
+            else:
+                self._history = HistoryStore(self.history_file, legacy_path=legacy_file)
+        return self._history
+    
+    def ensure_dirs(self):
+        """Create the config and images directories if they don't exist yet."""
+        self.config_dir.mkdir(exist_ok=True)
         Path(self.IMAGES_DIR).mkdir(exist_ok=True)
-        
-        self.settings = self._load_config()
     
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from file."""
@@ -47,9 +80,41 @@ class Config:
             "default_resolution": "square-medium",
             "default_theme": "photorealistic",
             "save_history": True,
-            "max_history_items": 100,
+            "max_history_items": 10000,
+            "history_backend": "jsonl",
             "auto_open_images": False,
-            "language": "zh"
+            "language": "zh",
+            "backend": "gemini",
+            "fake_backend": {},
+            "cassette_timing_scale": 1.0,
+            "cassette_match": "fingerprint",
+            "max_concurrent_requests": 4,
+            "response_cache": False,
+            "response_cache_max_mb": 1024,
+            "retry_max_attempts": 4,
+            "retry_base_delay": 1.0,
+            "retry_max_delay": 30.0,
+            "retry_deadline": 120.0,
+            "rate_limit_rpm": 0,
+            "rate_limit_burst": 1,
+            "rate_limit_shared": True,
+            "upload_max_edge": 2048,
+            "upload_max_megapixels": 4.0,
+            "upload_format": "JPEG",
+            "upload_quality": 90,
+            "browser_max_depth": None,
+            "browser_ignore": ["node_modules", "__pycache__", "venv", "site-packages", "$RECYCLE.BIN"],
+            "browser_scan_workers": 8,
+            "browser_index": True,
+            "browser_previews": False,
+            "thumbnail_cache_mb": 256,
+            "duplicate_hash": "auto",
+            "duplicate_threshold": None,
+            "output_codec": "original",
+            "output_quality": 90,
+            "metrics_textfile": None,
+            "metrics_summary_file": None,
+            "metrics_export_interval": 60
         }
         
         if self.config_file.exists():
@@ -65,6 +130,7 @@ class Config:
     def save_config(self):
         """Save current configuration to file."""
         try:
+            self.config_dir.mkdir(exist_ok=True)
             with open(self.config_file, 'w') as f:
                 json.dump(self.settings, f, indent=2)
         except IOError as e:
@@ -84,42 +150,77 @@ class Config:
         return os.environ.get("GEMINI_API_KEY")
     
     def add_to_history(self, entry: Dict[str, Any]):
-        """Add entry to generation history."""
+        """Add entry to generation history.
+        
+        Entries are appended to the history log in the background; entries
+        queued together are written in a single append, so only one history
+        write is queued at a time.
+        """
         if not self.get("save_history"):
             return
             
-        history = self.get_history()
         entry["timestamp"] = datetime.now().isoformat()
-        history.insert(0, entry)  # Add to beginning
-        
-        # Keep only max_history_items
-        max_items = self.get("max_history_items", 100)
-        history = history[:max_items]
+        with self._history_lock:
+            self._pending_history.append(entry)
+            if self._history_queued:
+                return
+            self._history_queued = True
+        write_behind.submit(self._write_pending_history, description="history update")
+    
+    def _write_pending_history(self):
+        """Append queued history entries to the history log."""
+        with self._history_lock:
+            self._history_queued = False
+            if not self._pending_history:
+                return
+            entries, self._pending_history = self._pending_history, []
+            try:
+                self.history.append(entries)
+            except IOError as e:
+                print(f"Error saving history: {e}")
+                return
         
+        if self.history.needs_compaction(self.get("max_history_items", 10000)):
+            write_behind.submit(self._compact_history, description="history compaction")
+    
+    def _compact_history(self):
+        """Drop history entries beyond max_history_items."""
         try:
-            with open(self.history_file, 'w') as f:
-                json.dump(history, f, indent=2)
+            self.history.compact(self.get("max_history_items", 10000))
         except IOError as e:
-            print(f"Error saving history: {e}")
+            print(f"Error compacting history: {e}")
     
-    def get_history(self) -> list:
-        """Get generation history."""
-        if not self.history_file.exists():
-            return []
-            
-        try:
-            with open(self.history_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
+    def iter_history(self, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream generation history, newest first."""
+        # Make sure entries still queued for writing are included
+        self._write_pending_history()
+        max_items = self.get("max_history_items", 10000)
+        return self.history.iter_newest(max_items if limit is None else min(limit, max_items))
+    
+    def get_history(self, limit: Optional[int] = None) -> list:
+        """Get generation history, newest first."""
+        return list(self.iter_history(limit))
+    
+    def query_history(self, query: Optional[HistoryQuery] = None, cursor: Any = None,
+                      limit: int = 10) -> Tuple[List[Dict[str, Any]], Any]:
+        """One page of history matching ``query`` and the cursor of the next page (or None)."""
+        if cursor is None:
+            self._write_pending_history()
+        return self.history.query(query, cursor, limit, max_items=self.get("max_history_items", 10000))
+    
+    def history_count(self) -> int:
+        """Number of history entries within max_history_items."""
+        self._write_pending_history()
+        return min(self.history.count(), self.get("max_history_items", 10000))
     
     def clear_history(self):
         """Clear generation history."""
-        try:
-            if self.history_file.exists():
-                self.history_file.unlink()
-        except IOError as e:
-            print(f"Error clearing history: {e}")
+        with self._history_lock:
+            self._pending_history = []
+            try:
+                self.history.clear()
+            except IOError as e:
+                print(f"Error clearing history: {e}")
 
 # Global config instance
 config = Config()
\ No newline at end of file
@@ -22,6 +22,12 @@ except ImportError:
     print("Warning: pillow-heif not installed. HEIC conversion not available.")
     print("Install with: uv add pillow-heif")
 
+try:
+    from .image_probe import image_probe
+except ImportError:
+    # Run as a standalone script from the src directory
+    from image_probe import image_probe
+
 def convert_image_to_jpeg(input_path: str, output_path: Optional[str] = None, quality: int = 90) -> Tuple[bool, str]:
     """
     Convert an image file to JPEG format.
@@ -57,6 +63,12 @@ def convert_image_to_jpeg(input_path: str, output_path: Optional[str] = None, qu
         if input_ext not in supported_formats:
             return False, f"Unsupported input format: {input_ext}. Supported: PNG, HEIC, HEIF, JPEG"
         
+        # Read the header first so unreadable files fail before a full decode
+        try:
+            image_probe.probe(str(input_file))
+        except Exception as e:
+            return False, f"Cannot read image {input_file.name}: {str(e)}"
+        
         # Open and convert image
         with Image.open(input_file) as img:
             # Convert to RGB if necessary (PNG might have alpha channel, HEIC might be in different color space)
@@ -0,0 +1,173 @@
+"""Persistent directory index for the image browser.
+
+After a scan, every directory listing of the tree (entries, sizes, mtimes
+and any image metadata already probed) is stored in
+``.nanobanana/index/<root hash>.json``. Reopening the browser on the same
+directory loads that index instead of walking the tree; revalidating it only
+stats each directory and re-lists the ones whose mtime changed.
+
+The browser's file name search index is stored next to it
+(``<root hash>.names``) and reused as long as the list of names is unchanged.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import config
+from .filename_index import FilenameIndex
+from .image_probe import ImageMeta, image_probe
+from .image_scanner import DirectoryListing, ImageScanner, ScanNode, ScannedFile, gc_paused, iter_listings
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+
+class DirectoryIndex:
+    """Stores scan results per root directory, keeping the most recently used ones."""
+
+    def __init__(self, index_dir: Path, max_indexes: int = 32):
+        self.index_dir = Path(index_dir)
+        self.max_indexes = max_indexes
+        self._lock = threading.Lock()
+
+    def _path(self, root: str) -> Path:
+        digest = hashlib.sha1(os.path.abspath(root).encode("utf-8", "surrogateescape")).hexdigest()
+        return self.index_dir / f"{digest[:20]}.json"
+
+    def _search_path(self, root: str) -> Path:
+        return self._path(root).with_suffix(".names")
+
+    def load(self, root: str, scanner: ImageScanner) -> Optional[Dict[str, DirectoryListing]]:
+        """Stored listings of ``root`` by relative path, or None if there is no usable index.
+
+        Stored image metadata is handed to ``image_probe`` so visible pages don't re-read headers.
+        """
+        root = os.fspath(root)
+        try:
+            with open(self._path(root), 'r', encoding='utf-8') as f, gc_paused():
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (data.get("version") != INDEX_VERSION or data.get("root") != os.path.abspath(root)
+                or data.get("scanner") != scanner.signature()):
+            return None
+
+        listings: Dict[str, DirectoryListing] = {}
+        metas: List[ImageMeta] = []
+        abs_root = os.path.abspath(root)
+        try:
+            with gc_paused():
+                for relative, entry in data["directories"].items():
+                    path = os.path.join(root, relative) if relative else root
+                    files = list(map(ScannedFile._make, entry["files"]))
+                    listings[relative] = DirectoryListing(path=path, relative=relative, depth=entry["depth"],
+                                                          mtime_ns=entry["mtime_ns"], files=files,
+                                                          subdirs=entry["subdirs"])
+                    if entry.get("meta"):
+                        abs_prefix = os.path.join(abs_root, relative, "")
+                        sizes = {f.name: f for f in files}
+                        for name, (image_format, width, height, mode, orientation) in entry["meta"].items():
+                            scanned = sizes[name]
+                            metas.append(ImageMeta(abs_prefix + name, image_format, width, height, mode,
+                                                   orientation, scanned.size, scanned.mtime_ns))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.debug("Ignoring malformed index for %s: %s", root, e)
+            return None
+        if "" not in listings:
+            return None
+
+        image_probe.prime(metas)
+        return listings
+
+    def save(self, root: str, scanner: ImageScanner, listings: Iterable[DirectoryListing]):
+        """Write the listings of a scan (atomically) and prune old indexes."""
+        root = os.fspath(root)
+        abs_root = os.path.abspath(root)
+        directories: Dict[str, Any] = {}
+        for listing in listings:
+            if listing.error is not None:
+                continue  # unreadable directories are retried on the next scan
+            abs_prefix = os.path.join(abs_root, listing.relative, "")
+            metas = {}
+            for scanned in listing.files:
+                meta = image_probe.cached(abs_prefix + scanned.name)
+                if meta is not None and meta.file_size == scanned.size and meta.mtime_ns == scanned.mtime_ns:
+                    metas[scanned.name] = [meta.format, meta.width, meta.height, meta.mode, meta.orientation]
+            directories[listing.relative] = {"mtime_ns": listing.mtime_ns, "depth": listing.depth,
+                                             "subdirs": listing.subdirs, "files": listing.files, "meta": metas}
+
+        data = {"version": INDEX_VERSION, "root": abs_root, "scanner": scanner.signature(),
+                "directories": directories}
+        path = self._path(root)
+        with self._lock:
+            try:
+                self.index_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning("Could not save directory index for %s: %s", root, e)
+                return
+            self._prune()
+
+    def load_search_index(self, root: str, names: Sequence[str], dir_ids: Sequence[int],
+                          directories: Sequence[str]) -> Optional[FilenameIndex]:
+        """The stored search index of ``root`` if it was built for exactly these names."""
+        try:
+            data = self._search_path(os.fspath(root)).read_bytes()
+        except OSError:
+            return None
+        return FilenameIndex.from_bytes(data, names, dir_ids, directories)
+
+    def save_search_index(self, root: str, index: FilenameIndex):
+        """Store a search index next to the directory index of ``root`` (atomically)."""
+        path = self._search_path(os.fspath(root))
+        data = index.to_bytes()
+        with self._lock:
+            try:
+                self.index_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+                index.saved = True
+            except OSError as e:
+                logger.warning("Could not save search index for %s: %s", root, e)
+
+    def _prune(self):
+        """Keep only the ``max_indexes`` most recently written indexes (lock held)."""
+        try:
+            indexes = sorted(self.index_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+            for stale in indexes[self.max_indexes:]:
+                stale.unlink()
+                stale.with_suffix(".names").unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def refresh(self, root: str, scanner: ImageScanner,
+                previous: Dict[str, DirectoryListing]) -> Tuple[Optional[ScanNode], bool]:
+        """Revalidate stored listings against the disk; returns the tree and whether anything changed."""
+        tree = scanner.scan(root, previous=previous)
+        if tree is None:
+            return None, True
+        current = {listing.relative: listing for listing in iter_listings(tree)}
+        changed = current.keys() != previous.keys() or any(
+            listing is not previous.get(relative) for relative, listing in current.items())
+        return tree, changed
+
+    def clear(self):
+        """Delete all stored indexes."""
+        with self._lock:
+            for path in [*self.index_dir.glob("*.json"), *self.index_dir.glob("*.names")]:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+# Global index shared by browser instances
+directory_index = DirectoryIndex(Path(config.CONFIG_DIR) / "index")
@@ -1,15 +1,35 @@
 """增强版图片浏览器 - 多列布局、目录导航和更好的用户体验"""
 
 import os
+import time
+import heapq
+import logging
+import threading
+from array import array
+from collections.abc import Sequence
+from itertools import groupby, repeat
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
-from rich.console import Console
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple, Union
+from dataclasses import dataclass, replace
+from rich.console import Console, Group
 from rich.table import Table
 from rich.text import Text
 from rich.columns import Columns
 from rich.panel import Panel
-from rich.prompt import Prompt, IntPrompt
+from rich.prompt import Confirm, Prompt, IntPrompt
+from rich.markup import escape
+
+from .config import config
+from .directory_index import directory_index
+from .filename_index import FilenameIndex, SearchHit
+from .image_probe import FileStat, image_probe
+from .image_scanner import (DEFAULT_IGNORE, DirectoryListing, ImageScanner, ScanNode, ScannedFile,
+                            iter_image_listings)
+from .thumbnail_cache import thumbnail_cache
+from .write_behind import write_behind
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class ImageInfo:
@@ -19,6 +39,7 @@ class ImageInfo:
     size: int
     directory: str
     relative_path: str
+    mtime_ns: int = 0
 
 @dataclass
 class DirectoryInfo:
@@ -28,6 +49,196 @@ class DirectoryInfo:
     image_count: int
     subdirs: List['DirectoryInfo']
 
+class ImageCatalog(Sequence):
+    """按列存储的图片列表
+    
+    目录路径只在目录表中保存一次，每张图片只占文件名字符串、目录编号、大小和修改时间；
+    除文件名本身外约 28 字节，ImageInfo 只在访问某一项时临时生成。
+    同一目录的图片在列表中连续排列。
+    
+    从扫描树生成时还保留每个目录的扫描信息（不含文件列表），目录结构和保存目录索引
+    都从这里得到，不必再保留整棵扫描树。
+    """
+    
+    def __init__(self, directories: Optional[Tuple[List[str], List[str]]] = None):
+        # 目录表：目录路径，以及相对当前目录的前缀（带结尾分隔符，当前目录为 ""）
+        self.dir_paths, self.dir_prefixes = directories if directories is not None else ([], [])
+        self.dir_ids = array('I')
+        self.names: List[str] = []
+        self.sizes = array('q')
+        self.mtimes = array('q')
+        # 扫描到的每个目录（不含文件列表）及其图片在列中的起始位置和数量，按浏览顺序
+        self.scanned_dirs: List[Tuple[DirectoryListing, int, int]] = []
+        self._search_index: Optional[FilenameIndex] = None
+        self._search_lock = threading.Lock()
+    
+    @classmethod
+    def from_tree(cls, root: ScanNode, prefix: str = "") -> 'ImageCatalog':
+        """按浏览顺序（子目录在前，然后是目录自身的图片）从扫描树生成"""
+        catalog = cls()
+        for listing in iter_image_listings(root):
+            files = listing.files
+            catalog.scanned_dirs.append((replace(listing, files=[]), len(catalog.names), len(files)))
+            if not files:
+                continue
+            relative_prefix = os.path.join(prefix, listing.relative, "") if prefix or listing.relative else ""
+            dir_id = catalog.add_directory(listing.path, relative_prefix)
+            # 整个目录一次性追加，不为每张图片创建对象
+            catalog.dir_ids.extend(repeat(dir_id, len(files)))
+            catalog.names.extend(map(itemgetter(0), files))
+            catalog.sizes.extend(map(itemgetter(1), files))
+            catalog.mtimes.extend(map(itemgetter(2), files))
+        return catalog
+    
+    def listings(self) -> Iterator[DirectoryListing]:
+        """扫描到的目录列表（文件列表从列中重新生成），用于保存目录索引"""
+        for listing, start, count in self.scanned_dirs:
+            files = list(map(ScannedFile, self.names[start:start + count],
+                             self.sizes[start:start + count], self.mtimes[start:start + count]))
+            yield replace(listing, files=files)
+    
+    def directory_infos(self) -> List[DirectoryInfo]:
+        """扫描根目录下包含图片的子目录（递归）"""
+        infos: Dict[str, DirectoryInfo] = {}
+        # 子目录总在父目录之前
+        for listing, _, count in self.scanned_dirs:
+            children = [infos[child] for child in (os.path.join(listing.relative, name) for name in listing.subdirs)
+                        if child in infos]
+            infos[listing.relative] = DirectoryInfo(
+                path=listing.path,
+                name=os.path.basename(listing.path),
+                image_count=count + sum(child.image_count for child in children),
+                subdirs=[child for child in children if child.image_count]
+            )
+        root = infos.get("")
+        return root.subdirs if root is not None else []
+    
+    def add_directory(self, path: str, relative_prefix: str) -> int:
+        self.dir_paths.append(path)
+        self.dir_prefixes.append(relative_prefix)
+        return len(self.dir_paths) - 1
+    
+    def append(self, dir_id: int, name: str, size: int, mtime_ns: int):
+        self.dir_ids.append(dir_id)
+        self.names.append(name)
+        self.sizes.append(size)
+        self.mtimes.append(mtime_ns)
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        name = self.names[index]
+        directory = self.dir_paths[self.dir_ids[index]]
+        return ImageInfo(
+            path=os.path.join(directory, name),
+            name=name,
+            size=self.sizes[index],
+            directory=directory,
+            relative_path=self.dir_prefixes[self.dir_ids[index]] + name,
+            mtime_ns=self.mtimes[index]
+        )
+    
+    def path(self, index: int) -> str:
+        return os.path.join(self.dir_paths[self.dir_ids[index]], self.names[index])
+    
+    def by_directory(self) -> Dict[str, List[int]]:
+        """目录路径 -> 该目录中图片的下标"""
+        groups: Dict[str, List[int]] = {}
+        start = 0
+        # 同一目录的图片是连续的，按段处理
+        for dir_id, run in groupby(self.dir_ids):
+            end = start + sum(1 for _ in run)
+            groups.setdefault(self.dir_paths[dir_id], []).extend(range(start, end))
+            start = end
+        return groups
+    
+    def search_index(self, load: Optional[Callable[[], Optional[FilenameIndex]]] = None) -> FilenameIndex:
+        """文件名搜索索引（第一次使用时生成，load 可先读取保存的索引）
+        
+        后台正在生成时，其他线程会等它完成，不会重复生成。
+        """
+        with self._search_lock:
+            if self._search_index is None:
+                index = load() if load is not None else None
+                self._search_index = index or FilenameIndex(self.names, self.dir_ids, self.dir_prefixes)
+            return self._search_index
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[SearchHit]:
+        """按文件名和相对路径搜索（关键词、通配符或模糊匹配），结果按匹配程度排序"""
+        return self.search_index().search(query, limit)
+    
+    def subset(self, indices: Iterable[int]) -> 'ImageCatalog':
+        """部分图片组成的新列表（共用目录表）"""
+        catalog = ImageCatalog((self.dir_paths, self.dir_prefixes))
+        for index in indices:
+            catalog.append(self.dir_ids[index], self.names[index], self.sizes[index], self.mtimes[index])
+        return catalog
+
+class ImageListView:
+    """虚拟化图片列表：只格式化当前可见的行，并缓存每个单元格的 Text
+    
+    尺寸信息用扫描时得到的大小和修改时间校验缓存，翻页时不再访问文件系统。
+    """
+    
+    NAME_WIDTH = 20  # 每列最多20字符
+    CELL_WIDTH = 35
+    
+    def __init__(self, images: ImageCatalog):
+        self.images = images
+        self._cells: Dict[Tuple[int, int, bool], Text] = {}
+        self._dims: Dict[int, str] = {}
+    
+    def _load_dims(self, indices: List[int]):
+        """读取可见图片的尺寸（只读文件头，已缓存的直接复用）"""
+        missing = [i for i in indices if i not in self._dims]
+        if not missing:
+            return
+        images = [self.images[i] for i in missing]
+        stats = {img.path: FileStat(img.size, img.mtime_ns) for img in images if img.mtime_ns}
+        metas = image_probe.probe_many([img.path for img in images], stats=stats)
+        for i, img in zip(missing, images):
+            meta = metas.get(img.path)
+            self._dims[i] = f"{meta.width}x{meta.height}" if meta else "?"
+    
+    def cell(self, index: int, number: int, selected: bool) -> Text:
+        """一个单元格：编号、文件名和尺寸"""
+        key = (index, number, selected)
+        text = self._cells.get(key)
+        if text is None:
+            name = self.images.names[index]
+            if len(name) > self.NAME_WIDTH:
+                name = name[:self.NAME_WIDTH - 3] + "..."
+            dims = self._dims.get(index, "?")
+            if selected:
+                text = Text(f"✓{number:2d}. {name:<{self.NAME_WIDTH}} {dims:>9}", style="green")
+            else:
+                text = Text(f" {number:2d}. {name:<{self.NAME_WIDTH}} ")
+                text.append(f"{dims:>9}", style="dim")
+            self._cells[key] = text
+        return text
+    
+    def render(self, start: int, end: int, selected_indices: set, cols: int) -> Text:
+        """渲染 images[start:end]，按列优先排列"""
+        count = end - start
+        rows = (count + cols - 1) // cols
+        self._load_dims(list(range(start, end)))
+        
+        blank = Text(" " * self.CELL_WIDTH)
+        lines = []
+        for row in range(rows):
+            cells = []
+            for col in range(cols):
+                idx = row + col * rows
+                if idx < count:
+                    cells.append(self.cell(start + idx, idx + 1, start + idx in selected_indices))
+                else:
+                    cells.append(blank)
+            lines.append(Text("  ").join(cells))
+        return Text("\n").join(lines)
+
 class EnhancedImageBrowser:
     """增强版图片浏览器"""
     
@@ -37,6 +248,21 @@ class EnhancedImageBrowser:
         self.console = console
         self.current_directory = Path.cwd()
         self.keyboard_mode = False
+        # 扫描结果缓存（按目录），避免每次循环都重新扫描整棵目录树
+        # 只保留按列存储的结果，扫描树生成结果后即释放
+        self._scan_cache: Dict[str, Tuple[ImageCatalog, List[DirectoryInfo]]] = {}
+        # 后台校验索引后得到的新结果，在下一次刷新界面时替换
+        self._refreshed: Dict[str, Tuple[ImageCatalog, List[DirectoryInfo]]] = {}
+        self._refresh_lock = threading.Lock()
+        self.use_index = bool(config.get("browser_index", True))
+        self.show_previews = bool(config.get("browser_previews", False))
+        self._view: Optional[ImageListView] = None
+        self.scanner = ImageScanner(
+            extensions=self.SUPPORTED_FORMATS,
+            max_depth=config.get("browser_max_depth"),
+            ignore=config.get("browser_ignore", DEFAULT_IGNORE),
+            max_workers=int(config.get("browser_scan_workers", 8))
+        )
         
     def _format_file_size(self, size: int) -> str:
         """格式化文件大小"""
@@ -47,57 +273,103 @@ class EnhancedImageBrowser:
         return f"{size:.1f}TB"
     
     
-    def _scan_images_in_directory(self, directory: Path, recursive: bool = True) -> Tuple[List[ImageInfo], List[DirectoryInfo]]:
+    def _scan_images_in_directory(self, directory: Path, recursive: bool = True,
+                                  on_progress=None) -> Tuple[ImageCatalog, List[DirectoryInfo]]:
         """扫描目录中的图片和子目录"""
-        images = []
-        subdirs = []
+        scanner = self.scanner
+        if not recursive:
+            scanner = ImageScanner(scanner.extensions, max_depth=0, ignore=scanner.ignore, max_workers=1)
         
-        if not directory.exists() or not directory.is_dir():
-            return images, subdirs
+        return self._scan_result(directory, scanner.scan(directory, on_listing=on_progress))
+    
+    def _scan_result(self, directory: Path, root: Optional[ScanNode]) -> Tuple[ImageCatalog, List[DirectoryInfo]]:
+        """把扫描树转换为图片列表和目录信息"""
+        if root is None:
+            return ImageCatalog(), []
         
+        # 相对路径以当前目录为基准
         try:
-            items = list(directory.iterdir())
-            items.sort(key=lambda x: (not x.is_dir(), x.name.lower()))
-            
-            for item in items:
-                if item.name.startswith('.'):
-                    continue
+            prefix = os.path.relpath(directory, self.current_directory)
+        except ValueError:  # Windows 下不同盘符
+            prefix = str(directory)
+        if prefix == ".":
+            prefix = ""
+        
+        images = ImageCatalog.from_tree(root, prefix)
+        return images, images.directory_infos()
+    
+    def _scan_cached(self, directory: Path, refresh: bool = False) -> Tuple[ImageCatalog, List[DirectoryInfo]]:
+        """扫描目录（带缓存），扫描时实时显示进度
+        
+        有目录索引时先直接显示索引内容，再在后台只重新扫描修改时间变化的目录。
+        refresh=True 时忽略索引完整重新扫描。
+        """
+        key = str(directory)
+        with self._refresh_lock:
+            refreshed = self._refreshed.pop(key, None)
+        if refreshed is not None and not refresh:
+            self._scan_cache[key] = refreshed
+            self.console.print("[dim]🔄 目录有变化，已更新为最新扫描结果[/dim]")
+        
+        if refresh or key not in self._scan_cache:
+            previous = directory_index.load(key, self.scanner) if self.use_index and not refresh else None
+            if previous is not None:
+                tree = self.scanner.build_tree(previous)
+                self._start_revalidation(directory, previous)
+            else:
+                with self.console.status("扫描图片中...") as status:
+                    def progress(listing, directories: int, images: int):
+                        status.update(f"扫描图片中... 已扫描 {directories} 个目录，找到 {images} 张图片")
                     
-                if item.is_file() and item.suffix.lower() in self.SUPPORTED_FORMATS:
-                    try:
-                        size = item.stat().st_size
-                        images.append(ImageInfo(
-                            path=str(item),
-                            name=item.name,
-                            size=size,
-                            directory=str(directory),
-                            relative_path=str(item.relative_to(self.current_directory))
-                        ))
-                    except (OSError, ValueError):
-                        continue
-                        
-                elif item.is_dir() and recursive:
-                    try:
-                        # 递归统计子目录的图片
-                        subdir_images, sub_subdirs = self._scan_images_in_directory(item, recursive=True)
-                        
-                        if subdir_images or sub_subdirs:
-                            subdirs.append(DirectoryInfo(
-                                path=str(item),
-                                name=item.name,
-                                image_count=len(subdir_images) + sum(s.image_count for s in sub_subdirs),
-                                subdirs=sub_subdirs
-                            ))
-                            # 将子目录的图片也加入到结果中
-                            images.extend(subdir_images)
-                            
-                    except (OSError, PermissionError):
-                        continue
-                        
-        except (OSError, PermissionError):
-            pass
+                    tree = self.scanner.scan(directory, on_listing=progress)
             
-        return images, subdirs
+            self._scan_cache[key] = self._scan_result(directory, tree)
+            if tree is not None:
+                if previous is None:
+                    self._save_index(directory)
+                # 生成索引很耗 CPU，放在单独的线程里，不占用写入队列
+                threading.Thread(target=self._prepare_search_index, args=(directory, self._scan_cache[key][0]),
+                                 name="search-index", daemon=True).start()
+        return self._scan_cache[key]
+    
+    def _start_revalidation(self, directory: Path, previous):
+        """在后台线程中校验索引，有变化时保存新结果"""
+        key = str(directory)
+        
+        def revalidate():
+            try:
+                tree, changed = directory_index.refresh(key, self.scanner, previous)
+                if tree is None:
+                    return
+                if changed:
+                    result = self._scan_result(directory, tree)
+                    with self._refresh_lock:
+                        self._refreshed[key] = result
+                    directory_index.save(key, self.scanner, result[0].listings())
+                    self._prepare_search_index(directory, result[0])
+            except Exception:
+                # 校验失败时继续使用索引内容，下次打开时重试；后台线程的异常不能输出到界面上
+                logger.debug("Revalidating the index of %s failed", key, exc_info=True)
+        
+        threading.Thread(target=revalidate, name="index-revalidate", daemon=True).start()
+    
+    def _prepare_search_index(self, directory: Path, images: ImageCatalog):
+        """在后台读取或生成文件名搜索索引，新生成的索引排队保存在目录索引旁"""
+        key = str(directory)
+        if not self.use_index:
+            images.search_index()
+            return
+        index = images.search_index(
+            lambda: directory_index.load_search_index(key, images.names, images.dir_ids, images.dir_prefixes))
+        if not index.saved:
+            write_behind.submit(directory_index.save_search_index, key, index, description="search index")
+    
+    def _save_index(self, directory: Path):
+        """在后台保存目录索引（包括已读取的图片尺寸）"""
+        cached = self._scan_cache.get(str(directory))
+        if self.use_index and cached is not None and cached[0].scanned_dirs:
+            write_behind.submit(directory_index.save, str(directory), self.scanner, cached[0].listings(),
+                                description="directory index")
     
     def _show_directory_tree(self, subdirs: List[DirectoryInfo], current_level: int = 0) -> None:
         """显示目录树结构"""
@@ -115,54 +387,59 @@ class EnhancedImageBrowser:
             if current_level < 3 and subdir.subdirs:
                 self._show_directory_tree(subdir.subdirs, current_level + 1)
     
-    def _create_multi_column_list(self, images: List[ImageInfo], selected_indices: set = None, start_idx: int = 0):
-        """多列简洁图片列表显示"""
+    def _list_view(self, images: ImageCatalog) -> ImageListView:
+        """同一图片列表复用同一个视图，翻页和重绘时不重复格式化"""
+        if self._view is None or self._view.images is not images:
+            self._view = ImageListView(images)
+        return self._view
+    
+    def _create_multi_column_list(self, images: ImageCatalog, selected_indices: set = None, start_idx: int = 0,
+                                  end_idx: int = None):
+        """多列简洁图片列表显示（images 为完整列表，只渲染 start_idx:end_idx）"""
         if selected_indices is None:
             selected_indices = set()
+        if end_idx is None:
+            end_idx = len(images)
         
-        # 每页显示数量和列数
-        display_count = min(24, len(images))  # 增加到24个，适合多列
+        # 计算列数 - 每列至少36个字符（含尺寸）
         terminal_width = self.console.size.width
+        cols = min(4, max(2, terminal_width // 36))
         
-        # 计算列数 - 每列至少25个字符
-        cols = min(4, max(2, terminal_width // 25))
-        rows = (display_count + cols - 1) // cols
+        self.console.print(self._list_view(images).render(start_idx, end_idx, selected_indices, cols))
+    
+    def _show_preview_grid(self, images: List[ImageInfo], selected_indices: set, start_idx: int,
+                           upcoming: List[ImageInfo] = None):
+        """缩略图网格预览（半块字符，每格两个像素）"""
+        tile_width, tile_height = 22, 8
+        cols = max(1, self.console.size.width // (tile_width + 2))
         
-        # 创建网格数据
-        for row in range(rows):
-            row_items = []
-            
-            for col in range(cols):
-                idx = row + col * rows
-                if idx < display_count and idx < len(images):
-                    img = images[idx]
-                    global_idx = start_idx + idx
-                    is_selected = global_idx in selected_indices
-                    
-                    # 简化文件名
-                    name = img.name
-                    max_name_len = 20  # 每列最多20字符
-                    if len(name) > max_name_len:
-                        name = name[:max_name_len-3] + "..."
-                    
-                    # 格式化显示
-                    if is_selected:
-                        item = f"[green]✓{idx + 1:2d}. {name:<{max_name_len}}[/green]"
-                    else:
-                        item = f" {idx + 1:2d}. {name:<{max_name_len}}"
-                    
-                    row_items.append(item)
-                else:
-                    row_items.append(" " * 25)  # 空白填充
-            
-            # 输出一行
-            self.console.print("  ".join(row_items))
+        paths = [img.path for img in images]
+        with self.console.status("[cyan]生成缩略图...[/cyan]"):
+            thumbnail_cache.ensure(paths)
+        if upcoming:
+            # 后台预取下一页缩略图，翻页时即可直接显示
+            thumbnail_cache.ensure([img.path for img in upcoming], block=False)
+        metas = image_probe.probe_many(paths)
         
-        # 翻页提示
-        if len(images) > display_count:
-            self.console.print(f"\\n[dim]... +{len(images) - display_count} more (n for next)[/dim]")
+        grid = Table.grid(padding=(0, 2))
+        for _ in range(cols):
+            grid.add_column(width=tile_width, no_wrap=True)
+        tiles = []
+        for idx, img in enumerate(images):
+            preview = thumbnail_cache.preview(img.path, tile_width, tile_height)
+            if preview is None:
+                preview = Text("(无预览)", style="dim")
+            meta = metas.get(img.path)
+            dims = f"{meta.width}x{meta.height}" if meta else "?"
+            selected = start_idx + idx in selected_indices
+            caption = Text(f"{'✓' if selected else ' '}{idx + 1:2d}. {img.name}",
+                           style="green" if selected else "", no_wrap=True, overflow="ellipsis")
+            tiles.append(Group(preview, caption, Text(dims, style="dim")))
+        for row in range(0, len(tiles), cols):
+            grid.add_row(*tiles[row:row + cols])
+        self.console.print(grid)
     
-    def _paginated_selection(self, images: List[ImageInfo], page_size: int = None) -> Optional[List[str]]:
+    def _paginated_selection(self, images: ImageCatalog, page_size: int = None) -> Optional[List[str]]:
         """分页选择图片 - 智能优化大量图片处理"""
         if not images:
             self.console.print("[yellow]未找到任何图片[/yellow]")
@@ -197,8 +474,12 @@ class EnhancedImageBrowser:
             self.console.print(f"\\n[bold cyan]Select Images - Page {current_page + 1}/{total_pages}[/bold cyan]")
             self.console.print()
             
-            # 多列简洁图片列表
-            self._create_multi_column_list(page_images, selected_indices, start_idx)
+            # 多列简洁图片列表，或缩略图预览
+            if self.show_previews:
+                self._show_preview_grid(page_images, selected_indices, start_idx,
+                                        images[end_idx:end_idx + page_size])
+            else:
+                self._create_multi_column_list(images, selected_indices, start_idx, end_idx)
             
             # 极简状态显示
             if selected_indices:
@@ -210,6 +491,9 @@ class EnhancedImageBrowser:
                 options.append("p=prev")
             if current_page < total_pages - 1:
                 options.append("n=next")
+            options.append("v=previews off" if self.show_previews else "v=previews")
+            options.append("s=smart")
+            options.append("/text=search")
             options.append("done=finish")
             
             if options:
@@ -228,7 +512,7 @@ class EnhancedImageBrowser:
                 return None
             elif result == "done":
                 if selected_indices:
-                    return [images[i].path for i in sorted(selected_indices)]
+                    return [images.path(i) for i in sorted(selected_indices)]
                 else:
                     self.console.print("[yellow]未选择任何图片，请至少选择一张图片[/yellow]")
                     self.console.input("按 Enter 继续...")
@@ -251,7 +535,7 @@ class EnhancedImageBrowser:
             return 1  # 窄屏幕保持单列
     
     
-    def _handle_selection_input(self, choice: str, all_images: List[ImageInfo], page_images: List[ImageInfo], 
+    def _handle_selection_input(self, choice: str, all_images: ImageCatalog, page_images: List[ImageInfo], 
                                selected_indices: set, current_page: int, total_pages: int, 
                                start_idx: int, end_idx: int) -> str:
         """处理选择输入并返回操作结果 - 简化版本"""
@@ -269,6 +553,15 @@ class EnhancedImageBrowser:
             return current_page - 1
         elif choice.lower() in ['n', 'next'] and current_page < total_pages - 1:
             return current_page + 1
+        elif choice.lower() in ['v', 'view']:
+            self.show_previews = not self.show_previews
+            return current_page
+        elif choice.lower() in ['s', 'smart']:
+            return self._smart_selection(all_images, selected_indices)
+        elif choice.startswith('/'):
+            self._search_selection(all_images, selected_indices, choice[1:])
+            self.console.input("按 Enter 继续...")
+            return current_page
         
         # 批量选择
         elif choice.lower() in ['all', 'page-all']:
@@ -283,7 +576,7 @@ class EnhancedImageBrowser:
             # 解析多选输入 (如: "1,3,5" 或 "1-3" 或 "1")
             return self._parse_multi_selection(choice, all_images, selected_indices, start_idx, end_idx, current_page)
     
-    def _parse_multi_selection(self, input_str: str, all_images: List[ImageInfo], 
+    def _parse_multi_selection(self, input_str: str, all_images: ImageCatalog, 
                               selected_indices: set, start_idx: int, end_idx: int, current_page: int) -> int:
         """解析多选输入，支持 1,3,5 和 1-3 格式"""
         try:
@@ -323,7 +616,7 @@ class EnhancedImageBrowser:
             for num in selected_numbers:
                 if 1 <= num <= (end_idx - start_idx):
                     global_idx = start_idx + num - 1
-                    valid_selections.append((num, global_idx, all_images[global_idx].name))
+                    valid_selections.append((num, global_idx, all_images.names[global_idx]))
                 else:
                     invalid_selections.append(num)
             
@@ -361,35 +654,32 @@ class EnhancedImageBrowser:
             self.console.input("按 Enter 继续...")
             return current_page
     
-    def _smart_selection(self, images: List[ImageInfo], selected_indices: set) -> int:
+    def _smart_selection(self, images: ImageCatalog, selected_indices: set) -> int:
         """智能选择图片"""
         self.console.print("\\n[bold]智能选择选项:[/bold]")
         self.console.print("[green]1.[/green] 选择最大的图片 (前10张)")
         self.console.print("[green]2.[/green] 选择最小的图片 (前10张)")
         self.console.print("[green]3.[/green] 选择特定格式 (jpg, png, etc.)")
-        self.console.print("[green]4.[/green] 按文件名包含关键词选择")
+        self.console.print("[green]4.[/green] 按文件名搜索 (关键词、通配符 * ? 或近似拼写)")
+        self.console.print("[green]5.[/green] 近似重复图片 (每组只保留一张)")
         
-        smart_choice = Prompt.ask("智能选择方式", choices=["1", "2", "3", "4"], default="1")
+        smart_choice = Prompt.ask("智能选择方式", choices=["1", "2", "3", "4", "5"], default="1")
         
         if smart_choice == "1":
-            # 按大小排序，选择最大的
-            sorted_images = sorted(enumerate(images), key=lambda x: x[1].size, reverse=True)
-            for i, (original_idx, img) in enumerate(sorted_images[:10]):
-                selected_indices.add(original_idx)
+            # 按大小选择最大的（直接使用大小列）
+            selected_indices.update(heapq.nlargest(10, range(len(images)), key=images.sizes.__getitem__))
             self.console.print("[green]已选择前10张最大的图片[/green]")
             
         elif smart_choice == "2":
             # 选择最小的
-            sorted_images = sorted(enumerate(images), key=lambda x: x[1].size)
-            for i, (original_idx, img) in enumerate(sorted_images[:10]):
-                selected_indices.add(original_idx)
+            selected_indices.update(heapq.nsmallest(10, range(len(images)), key=images.sizes.__getitem__))
             self.console.print("[green]已选择前10张最小的图片[/green]")
             
         elif smart_choice == "3":
             # 按格式选择
             formats = set()
-            for img in images:
-                ext = os.path.splitext(img.name)[1].lower()
+            for name in images.names:
+                ext = os.path.splitext(name)[1].lower()
                 if ext:
                     formats.add(ext)
             
@@ -400,44 +690,123 @@ class EnhancedImageBrowser:
                 target_format = '.' + target_format
             
             count = 0
-            for i, img in enumerate(images):
-                if os.path.splitext(img.name)[1].lower() == target_format:
+            for i, name in enumerate(images.names):
+                if os.path.splitext(name)[1].lower() == target_format:
                     selected_indices.add(i)
                     count += 1
             
             self.console.print(f"[green]已选择 {count} 张 {target_format} 格式的图片[/green]")
             
         elif smart_choice == "4":
-            # 按关键词选择
-            keyword = self.console.input("输入文件名关键词: ").strip().lower()
-            if keyword:
-                count = 0
-                for i, img in enumerate(images):
-                    if keyword in img.name.lower():
-                        selected_indices.add(i)
-                        count += 1
-                self.console.print(f"[green]已选择 {count} 张包含 '{keyword}' 的图片[/green]")
+            self._search_selection(images, selected_indices)
+            
+        elif smart_choice == "5":
+            self._select_near_duplicates(images, selected_indices)
         
         self.console.input("按 Enter 继续...")
         return 0  # 返回第一页
     
-    def _filter_selection(self, images: List[ImageInfo], selected_indices: set) -> int:
+    def _search_selection(self, images: ImageCatalog, selected_indices: set, query: str = None):
+        """按文件名搜索并选择：有完全匹配时全部选中，只有近似匹配时先确认"""
+        if query is None:
+            query = self.console.input("搜索文件名 (关键词、通配符或近似拼写): ")
+        query = query.strip()
+        if not query:
+            return
+        
+        started = time.perf_counter()
+        hits = images.search(query)
+        elapsed = (time.perf_counter() - started) * 1000
+        if not hits:
+            self.console.print(f"[yellow]未找到匹配 '{escape(query)}' 的图片[/yellow] [dim]({elapsed:.1f} ms)[/dim]")
+            return
+        
+        fuzzy = hits[0].score < 1
+        kind = "近似匹配" if fuzzy else "匹配"
+        self.console.print(f"[bold]找到 {len(hits)} 张{kind} '{escape(query)}' 的图片[/bold] [dim]({elapsed:.1f} ms)[/dim]")
+        for hit in hits[:10]:
+            relative_path = images.dir_prefixes[images.dir_ids[hit.index]] + images.names[hit.index]
+            self.console.print(f"  [dim]{'≈' if fuzzy else '•'}[/dim] {escape(relative_path)}")
+        if len(hits) > 10:
+            self.console.print(f"  [dim]... 另有 {len(hits) - 10} 张[/dim]")
+        
+        if fuzzy and not Confirm.ask(f"选择这 {len(hits)} 张近似匹配的图片?", default=False):
+            return
+        selected_indices.update(hit.index for hit in hits)
+        self.console.print(f"[green]已选择 {len(hits)} 张图片[/green]")
+    
+    def _select_near_duplicates(self, images: ImageCatalog, selected_indices: set):
+        """按感知哈希分组近似重复图片，每组只保留一张
+        
+        已有选择时在选择范围内去重；否则选中每组保留的那一张。
+        """
+        from .image_hash import find_near_duplicates
+        
+        scope = sorted(selected_indices) if selected_indices else list(range(len(images)))
+        index_of = {images.path(i): i for i in scope}
+        with self.console.status("[cyan]计算图片指纹...[/cyan]") as status:
+            groups = find_near_duplicates(
+                index_of,
+                on_progress=lambda done, total: status.update(f"[cyan]计算图片指纹... {done}/{total}[/cyan]")
+            )
+        if not groups:
+            self.console.print("[green]未发现近似重复图片[/green]")
+            return
+        
+        self.console.print(f"[bold]发现 {len(groups)} 组近似重复图片 (共 {sum(len(g) for g in groups)} 张)[/bold]")
+        for group in groups[:10]:
+            names = ", ".join(images[index_of[path]].relative_path for path in group[:4])
+            more = f" +{len(group) - 4}" if len(group) > 4 else ""
+            self.console.print(f"  [dim]•[/dim] {names}{more}")
+        if len(groups) > 10:
+            self.console.print(f"  [dim]... 另有 {len(groups) - 10} 组[/dim]")
+        
+        self.console.print("[green]1.[/green] 保留分辨率最高的  [green]2.[/green] 保留最新的文件  [green]3.[/green] 保留列表中第一张")
+        keep = Prompt.ask("每组保留", choices=["1", "2", "3"], default="1")
+        
+        def resolution(path: str) -> Tuple[int, int]:
+            # 分辨率相同时保留较大的文件（压缩损失较少）
+            meta = image_probe.try_probe(path)
+            return (meta.width * meta.height if meta else 0), images.sizes[index_of[path]]
+        
+        def mtime(path: str) -> int:
+            # 扫描时已记录修改时间，不再逐个 stat
+            return images.mtimes[index_of[path]]
+        
+        dedupe_selection = bool(selected_indices)
+        removed = 0
+        for group in groups:
+            if keep == "1":
+                keeper = max(group, key=resolution)
+            elif keep == "2":
+                keeper = max(group, key=mtime)
+            else:
+                keeper = group[0]
+            selected_indices.add(index_of[keeper])
+            if dedupe_selection:
+                for path in group:
+                    if path != keeper:
+                        selected_indices.discard(index_of[path])
+                        removed += 1
+        
+        if dedupe_selection:
+            self.console.print(f"[green]已从选择中移除 {removed} 张重复图片[/green]")
+        else:
+            self.console.print(f"[green]已选择 {len(groups)} 张图片 (每组一张)[/green]")
+    
+    def _filter_selection(self, images: ImageCatalog, selected_indices: set) -> int:
         """按模式筛选图片"""
         pattern = self.console.input("输入文件名模式 (如: IMG_*, *.jpg, *2024*): ").strip()
         
         if pattern:
-            import fnmatch
-            count = 0
-            for i, img in enumerate(images):
-                if fnmatch.fnmatch(img.name.lower(), pattern.lower()):
-                    selected_indices.add(i)
-                    count += 1
-            self.console.print(f"[green]已选择 {count} 张匹配模式 '{pattern}' 的图片[/green]")
+            hits = images.search_index().glob(pattern)
+            selected_indices.update(hit.index for hit in hits)
+            self.console.print(f"[green]已选择 {len(hits)} 张匹配模式 '{escape(pattern)}' 的图片[/green]")
         
         self.console.input("按 Enter 继续...")
         return 0
     
-    def _handle_range_selection(self, images: List[ImageInfo], selected_indices: set, start_idx: int, end_idx: int) -> int:
+    def _handle_range_selection(self, images: ImageCatalog, selected_indices: set, start_idx: int, end_idx: int) -> int:
         """处理范围选择"""
         range_input = self.console.input("输入范围 (如: 1-5 或 1,3,5): ").strip()
         try:
@@ -492,12 +861,11 @@ class EnhancedImageBrowser:
             self.console.clear()
             self.console.print(f"\\n[bold cyan]🔍 当前目录: {self.current_directory}[/bold cyan]")
             
-            # 扫描图片
-            with self.console.status("扫描图片中..."):
-                images, subdirs = self._scan_images_in_directory(self.current_directory, recursive=True)
+            # 扫描图片（同一目录只扫描一次，选择 r 重新扫描）
+            images, subdirs = self._scan_cached(self.current_directory)
             
             # 显示目录导航选项
-            self._show_directory_navigation_options()
+            self._show_directory_navigation_options(subdirs)
             
             if not images:
                 self.console.print("[red]在当前目录及子目录中未找到任何图片文件[/red]")
@@ -540,6 +908,8 @@ class EnhancedImageBrowser:
             if self.current_directory.parent != self.current_directory:
                 self.console.print("2. Go up")
                 choices.insert(-1, "2")
+            self.console.print("r. Rescan")
+            choices.insert(-1, "r")
             self.console.print("q. Quit")
             
             try:
@@ -550,6 +920,8 @@ class EnhancedImageBrowser:
             if method == "1":
                 # 开始交互式选择
                 result = self._paginated_selection(images)
+                # 保存索引，带上这次浏览时读取的图片尺寸
+                self._save_index(self.current_directory)
                 if result is not None:
                     return result
             elif method == "2":
@@ -562,13 +934,17 @@ class EnhancedImageBrowser:
                     self.console.print("[yellow]已经在根目录[/yellow]")
                     self.console.input("按 Enter 继续...")
                     continue
+            elif method == "r":
+                # 重新扫描当前目录
+                self._scan_cached(self.current_directory, refresh=True)
+                continue
             elif method.lower() == "q":
                 # 退出选择
                 return []
         
         return []
     
-    def _show_directory_navigation_options(self):
+    def _show_directory_navigation_options(self, subdirs: List[DirectoryInfo]):
         """显示目录导航选项"""
         parent = self.current_directory.parent
         
@@ -576,22 +952,12 @@ class EnhancedImageBrowser:
         if parent != self.current_directory:
             nav_info.append(f"⬆️  上级: [blue]{parent.name}[/blue]")
         
-        # 显示当前目录的子目录（只显示包含图片的）
-        try:
-            subdirs_with_images = []
-            for item in self.current_directory.iterdir():
-                if item.is_dir() and not item.name.startswith('.'):
-                    images, _ = self._scan_images_in_directory(item, recursive=True)
-                    if images:
-                        subdirs_with_images.append((item.name, len(images)))
-            
-            if subdirs_with_images:
-                nav_info.append("📁 子目录: " + " | ".join([f"[cyan]{name}[/cyan] ({count})" for name, count in subdirs_with_images[:5]]))
-                if len(subdirs_with_images) > 5:
-                    nav_info.append(f"[dim]... 以及其他 {len(subdirs_with_images) - 5} 个目录[/dim]")
-        
-        except (OSError, PermissionError):
-            nav_info.append("[red]无法读取目录信息[/red]")
+        # 显示当前目录的子目录（只显示包含图片的，数量取自本次扫描结果）
+        subdirs_with_images = [(subdir.name, subdir.image_count) for subdir in subdirs]
+        if subdirs_with_images:
+            nav_info.append("📁 子目录: " + " | ".join([f"[cyan]{name}[/cyan] ({count})" for name, count in subdirs_with_images[:5]]))
+            if len(subdirs_with_images) > 5:
+                nav_info.append(f"[dim]... 以及其他 {len(subdirs_with_images) - 5} 个目录[/dim]")
         
         if nav_info:
             self.console.print("[dim]" + " | ".join(nav_info) + "[/dim]\\n")
@@ -675,14 +1041,10 @@ class EnhancedImageBrowser:
         
         return False
     
-    def _browse_by_directory(self, subdirs: List[DirectoryInfo], all_images: List[ImageInfo]) -> Optional[List[str]]:
+    def _browse_by_directory(self, subdirs: List[DirectoryInfo], all_images: ImageCatalog) -> Optional[List[str]]:
         """按目录浏览选择图片"""
-        # 按目录分组图片
-        dir_images = {}
-        for img in all_images:
-            if img.directory not in dir_images:
-                dir_images[img.directory] = []
-            dir_images[img.directory].append(img)
+        # 按目录分组图片（下标）
+        dir_images = all_images.by_directory()
         
         selected_paths = []
         
@@ -731,7 +1093,7 @@ class EnhancedImageBrowser:
                     dir_idx = int(choice) - 1
                     if 0 <= dir_idx < len(directories):
                         selected_dir = directories[dir_idx]
-                        dir_selected = self._paginated_selection(dir_images[selected_dir])
+                        dir_selected = self._paginated_selection(all_images.subset(dir_images[selected_dir]))
                         if dir_selected:
                             selected_paths.extend(dir_selected)
                     else:
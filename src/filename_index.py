@@ -0,0 +1,265 @@
+"""Trigram index over image file names for instant search in the browser.
+
+Every lowercased file name is split into its three-character substrings
+(trigrams), and each trigram maps to the images whose name contains it.
+Directory paths get a small index of their own, so a directory's trigrams
+are stored once instead of once per image in it.
+
+A query only checks the images that contain its rarest trigrams: a keyword
+or glob pattern is then matched exactly, and images sharing at least half
+of the query's trigrams count as fuzzy matches (typos, missing or swapped
+letters). Trigrams containing a path separator are left out of the index
+lookups, since they could span a directory and a file name.
+
+Name postings are kept in one flat array with an offset per trigram, so they
+can be saved next to the directory index and loaded again without
+rebuilding them.
+"""
+
+import os
+import re
+import sys
+import json
+import fnmatch
+import hashlib
+from array import array
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from itertools import accumulate
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set
+
+FORMAT_VERSION = 1
+
+# Fraction of the query's trigrams an image must share to count as a fuzzy match
+FUZZY_MIN_SIMILARITY = 0.5
+
+_SEPARATORS = {"/", os.sep}
+_GLOB_SPECIAL = re.compile(r"\[[^\]]*\]|[*?]")
+
+class SearchHit(NamedTuple):
+    """An image matching a query.
+
+    ``score`` is 3 for a keyword at the start of the file name, 2 elsewhere
+    in the name or for a glob match, 1 for a keyword in the directory path,
+    and below 1 (the shared fraction of trigrams) for fuzzy matches.
+    """
+    index: int
+    score: float
+
+def trigrams(text: str) -> Set[str]:
+    return set(map("".join, zip(text, text[1:], text[2:])))
+
+def _query_grams(terms: Iterable[str]) -> Set[str]:
+    """Trigrams of the query terms usable for lookups (no path separators)."""
+    grams = set()
+    for term in terms:
+        grams.update(g for g in trigrams(term) if not _SEPARATORS.intersection(g))
+    return grams
+
+class _Postings:
+    """Sorted ids per trigram, stored in one flat array."""
+
+    def __init__(self, grams: Dict[str, int], offsets: array, ids: array):
+        self.grams = grams
+        self.offsets = offsets
+        self.ids = ids
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> '_Postings':
+        lists: Dict[str, List[int]] = defaultdict(list)
+        for i, text in enumerate(texts):
+            for gram in trigrams(text.lower()):
+                lists[gram].append(i)
+        grams: Dict[str, int] = {}
+        offsets = array('I', [0])
+        flat = array('I')
+        for k, (gram, ids) in enumerate(lists.items()):
+            grams[gram] = k
+            flat.extend(ids)
+            offsets.append(len(flat))
+        return cls(grams, offsets, flat)
+
+    def get(self, gram: str) -> array:
+        k = self.grams.get(gram)
+        if k is None:
+            return array('I')
+        return self.ids[self.offsets[k]:self.offsets[k + 1]]
+
+    def count(self, gram: str) -> int:
+        k = self.grams.get(gram)
+        return 0 if k is None else self.offsets[k + 1] - self.offsets[k]
+
+class FilenameIndex:
+    """Trigram index over the names and directories of a list of images.
+
+    Image ``i`` is ``directories[dir_ids[i]] + names[i]``, where each
+    directory is a relative path ending in a separator (or "").
+    """
+
+    def __init__(self, names: Sequence[str], dir_ids: Sequence[int], directories: Sequence[str],
+                 postings: Optional[_Postings] = None):
+        self.names = names
+        self.dir_ids = dir_ids
+        self.directories = directories
+        self._names = postings if postings is not None else _Postings.build(names)
+        self._dirs = _Postings.build(directories)
+        self._members: Optional[List[array]] = None
+        self._all_names: Optional[str] = None
+        self._name_starts = array('I')
+        self.saved = postings is not None
+
+    @staticmethod
+    def fingerprint(names: Sequence[str]) -> str:
+        """Identifies the list of names an index was built for."""
+        return hashlib.sha1("\0".join(names).encode("utf-8", "surrogateescape")).hexdigest()
+
+    def to_bytes(self) -> bytes:
+        """Serialized name postings (directory postings are cheap to rebuild)."""
+        header = {"version": FORMAT_VERSION, "fingerprint": self.fingerprint(self.names),
+                  "byteorder": sys.byteorder, "itemsize": self._names.ids.itemsize,
+                  "grams": list(self._names.grams), "ids": len(self._names.ids)}
+        return (json.dumps(header, ensure_ascii=False).encode("utf-8", "surrogateescape") + b"\n"
+                + self._names.offsets.tobytes() + self._names.ids.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes, names: Sequence[str], dir_ids: Sequence[int],
+                   directories: Sequence[str]) -> Optional['FilenameIndex']:
+        """Load serialized postings, or None if they don't belong to ``names``."""
+        try:
+            end = data.index(b"\n")
+            header = json.loads(data[:end].decode("utf-8", "surrogateescape"))
+            if (header.get("version") != FORMAT_VERSION or header["itemsize"] != array('I').itemsize
+                    or header["fingerprint"] != cls.fingerprint(names)):
+                return None
+            grams = {gram: k for k, gram in enumerate(header["grams"])}
+            offsets, ids = array('I'), array('I')
+            split = end + 1 + (len(grams) + 1) * offsets.itemsize
+            offsets.frombytes(data[end + 1:split])
+            ids.frombytes(data[split:])
+            if header["byteorder"] != sys.byteorder:
+                offsets.byteswap()
+                ids.byteswap()
+            if len(ids) != header["ids"] or offsets[-1] != len(ids):
+                return None
+        except (ValueError, KeyError, TypeError, IndexError):
+            return None
+        return cls(names, dir_ids, directories, _Postings(grams, offsets, ids))
+
+    def _dir_members(self) -> List[array]:
+        """Image ids per directory (built on first use)."""
+        if self._members is None:
+            members = [array('I') for _ in self.directories]
+            for i, dir_id in enumerate(self.dir_ids):
+                members[dir_id].append(i)
+            self._members = members
+        return self._members
+
+    def _count(self, gram: str, with_dirs: bool) -> int:
+        """Number of images containing ``gram`` in their name (or directory)."""
+        count = self._names.count(gram)
+        if with_dirs and gram in self._dirs.grams:
+            members = self._dir_members()
+            count += sum(len(members[d]) for d in self._dirs.get(gram))
+        return count
+
+    def _images(self, gram: str, with_dirs: bool) -> Iterator[int]:
+        """Images containing ``gram`` in their name (or directory); may repeat."""
+        yield from self._names.get(gram)
+        if with_dirs and gram in self._dirs.grams:
+            members = self._dir_members()
+            for dir_id in self._dirs.get(gram):
+                yield from members[dir_id]
+
+    def _narrow(self, grams: Set[str], with_dirs: bool) -> Set[int]:
+        """Images containing all of ``grams``, possibly with some extra ones.
+
+        Postings are intersected rarest first, and only while that is
+        cheaper than checking the remaining candidates directly.
+        """
+        ordered = sorted((self._count(g, with_dirs), g) for g in grams)
+        candidates = set(self._images(ordered[0][1], with_dirs))
+        for count, gram in ordered[1:]:
+            if not candidates or count > 8 * len(candidates):
+                break
+            candidates.intersection_update(self._images(gram, with_dirs))
+        return candidates
+
+    def _scan_names(self, term: str) -> Set[int]:
+        """Images whose name contains ``term``, found in one string of all lowercased names."""
+        if self._all_names is None:
+            lowered = [name.lower() for name in self.names]
+            self._name_starts = array('I', accumulate((len(name) + 1 for name in lowered[:-1]), initial=0))
+            self._all_names = "\n".join(lowered)
+        starts = self._name_starts
+        return {bisect_right(starts, match.start()) - 1
+                for match in re.finditer(re.escape(term), self._all_names)}
+
+    def _text(self, i: int) -> str:
+        return self.directories[self.dir_ids[i]] + self.names[i]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[SearchHit]:
+        """Images matching ``query``, best matches first.
+
+        A query with ``*``, ``?`` or ``[...]`` is a glob pattern, matched
+        against the file name (or the relative path if it contains a
+        separator). Otherwise its words must all appear in the relative
+        path; if no image has them all, images sharing at least half of the
+        query's trigrams are returned as fuzzy matches.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        if _GLOB_SPECIAL.search(query):
+            hits = self.glob(query)
+        else:
+            terms = query.split()
+            hits = self._keywords(terms) or self._fuzzy(_query_grams(terms))
+        # Stable, so equal scores keep the browser's order
+        hits.sort(key=itemgetter(1), reverse=True)
+        return hits[:limit] if limit is not None else hits
+
+    def glob(self, pattern: str) -> List[SearchHit]:
+        """Images whose name (or relative path, for patterns with a separator) matches ``pattern``."""
+        pattern = pattern.lower()
+        with_dirs = any(sep in pattern for sep in _SEPARATORS)
+        regex = re.compile(fnmatch.translate(pattern), re.IGNORECASE)
+        grams = _query_grams(_GLOB_SPECIAL.split(pattern))
+        candidates: Iterable[int] = sorted(self._narrow(grams, with_dirs)) if grams else range(len(self.names))
+        text = self._text if with_dirs else self.names.__getitem__
+        return [SearchHit(i, 2.0) for i in candidates if regex.match(text(i))]
+
+    def _keywords(self, terms: List[str]) -> List[SearchHit]:
+        grams = _query_grams(terms)
+        if grams:
+            candidates: Iterable[int] = sorted(self._narrow(grams, True))
+        else:
+            # Only words shorter than three letters: find the first one with a plain text search
+            candidates = self._scan_names(terms[0])
+            members = self._dir_members()
+            for dir_id, directory in enumerate(self.directories):
+                if terms[0] in directory.lower():
+                    candidates.update(members[dir_id])
+            candidates = sorted(candidates)
+
+        names, first, rest = self.names, terms[0], terms[1:]
+        hits = []
+        for i in candidates:
+            name = names[i].lower()
+            if first in name and (not rest or all(term in name for term in rest)):
+                hits.append(SearchHit(i, 3.0 if name.startswith(first) else 2.0))
+            elif all(term in self._text(i).lower() for term in terms):
+                hits.append(SearchHit(i, 1.0))
+        return hits
+
+    def _fuzzy(self, grams: Set[str]) -> List[SearchHit]:
+        """Images sharing at least ``FUZZY_MIN_SIMILARITY`` of ``grams``."""
+        if not grams:
+            return []
+        shared: Counter = Counter()
+        for gram in grams:
+            # A trigram in both the directory and the name is counted twice; capped below
+            shared.update(self._images(gram, True))
+        need = len(grams) * FUZZY_MIN_SIMILARITY
+        total = len(grams) + 1  # keeps fuzzy scores below exact ones
+        return [SearchHit(i, min(count, len(grams)) / total) for i, count in sorted(shared.items()) if count >= need]
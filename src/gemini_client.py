@@ -2,40 +2,65 @@
 
 import os
 import time
-from typing import List, Optional, Dict, Any, Tuple
+import asyncio
+import threading
+import weakref
+from typing import Callable, List, Optional, Dict, Any, Tuple
 from datetime import datetime
-from io import BytesIO
-
-import google.generativeai as genai
-from PIL import Image
 
 from .config import config
+from .backends import GenerationBackend, create_backend
+from .response_cache import ResponseCache
+from .rate_limiter import TokenBucket
+from .upload_policy import UploadPolicy
+from .image_probe import image_probe
+from .write_behind import write_behind
+from .output_codec import OutputCodec
+from .metrics import CallMetrics, metrics
+from .retry import (RetryPolicy, RetryStats, RetryTotals, call_with_retry, call_with_retry_async,
+                    classify_error, describe_error)
 
 class GeminiClient:
     """Client for interacting with Google's Gemini API."""
     
-    def __init__(self):
-        self.api_key = config.get_api_key()
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is required")
-        
-        genai.configure(api_key=self.api_key)
-        self._image_model = None
-        self._text_model = None
+    def __init__(self, backend: Optional[GenerationBackend] = None):
+        # Raises ValueError when the Gemini backend has no API key
+        self.backend = backend or create_backend()
+        self._response_cache = None
+        self.retry_totals = RetryTotals()
+        self._rate_limiter = None
+        self._init_lock = threading.Lock()  # Guards lazy creation shared by worker threads
+        self._local = threading.local()
     
     @property
-    def image_model(self):
-        """Get image generation model."""
-        if self._image_model is None:
-            self._image_model = genai.GenerativeModel(config.GEMINI_IMAGE_MODEL)
-        return self._image_model
+    def response_cache(self) -> Optional[ResponseCache]:
+        """Get the on-disk response cache, or None when caching is disabled."""
+        if not config.get("response_cache", False):
+            return None
+        with self._init_lock:
+            if self._response_cache is None:
+                max_bytes = int(config.get("response_cache_max_mb", 1024) * 1024 * 1024)
+                self._response_cache = ResponseCache(config.config_dir / "cache", max_bytes)
+        return self._response_cache
     
     @property
-    def text_model(self):
-        """Get text generation model."""
-        if self._text_model is None:
-            self._text_model = genai.GenerativeModel(config.GEMINI_TEXT_MODEL)
-        return self._text_model
+    def rate_limiter(self) -> Optional[TokenBucket]:
+        """Get the request rate limiter, or None when no RPM limit is configured."""
+        rpm = config.get("rate_limit_rpm", 0)
+        if not rpm or rpm <= 0:
+            return None
+        with self._init_lock:
+            if self._rate_limiter is None:
+                state_file = None
+                if config.get("rate_limit_shared", True):
+                    state_file = str(config.config_dir / "ratelimit.state")
+                self._rate_limiter = TokenBucket(rpm, config.get("rate_limit_burst", 1), state_file)
+        return self._rate_limiter
+    
+    @property
+    def last_call_stats(self) -> Optional[RetryStats]:
+        """Retry statistics of the last synchronous request made on this thread."""
+        return getattr(self._local, "last_call_stats", None)
     
     def validate_images(self, image_paths: List[str]) -> Tuple[bool, str]:
         """Validate input images."""
@@ -43,169 +68,280 @@ class GeminiClient:
             return False, "Maximum 3 images supported simultaneously"
         
         for path in image_paths:
-            if not os.path.exists(path):
-                return False, f"Image file not found: {path}"
-            
             try:
-                with Image.open(path) as img:
-                    # Check format
-                    if img.format not in ['PNG', 'JPEG', 'JPG']:
-                        return False, f"Unsupported image format: {img.format}. Only PNG and JPEG are supported."
-                    
-                    # Check size (optional - Gemini handles resizing)
-                    width, height = img.size
-                    if width < 32 or height < 32:
-                        return False, f"Image too small: {width}x{height}. Minimum 32x32 pixels required."
-                    
+                # Header-only probe; the result is cached for the upload step
+                meta = image_probe.probe(path)
+            except FileNotFoundError:
+                return False, f"Image file not found: {path}"
             except Exception as e:
                 return False, f"Invalid image file {path}: {str(e)}"
+            
+            # Check format
+            if meta.format not in ['PNG', 'JPEG', 'JPG']:
+                return False, f"Unsupported image format: {meta.format}. Only PNG and JPEG are supported."
+            
+            # Check size (optional - Gemini handles resizing)
+            if meta.width < 32 or meta.height < 32:
+                return False, f"Image too small: {meta.width}x{meta.height}. Minimum 32x32 pixels required."
         
         return True, ""
     
-    def generate_text_to_image(self, prompt: str, resolution: Optional[str] = None) -> Tuple[bool, str, Optional[List[bytes]]]:
-        """Generate images from text prompt."""
+    def generate_text_to_image(self, prompt: str, resolution: Optional[str] = None,
+                               cache_mode: str = "use") -> Tuple[bool, str, Optional[List[bytes]]]:
+        """Generate images from text prompt.
+        
+        ``cache_mode`` controls the response cache: "use" serves cached results,
+        "refresh" forces a fresh request and stores it, "off" bypasses the cache.
+        """
+        self._local.last_call_stats = None
         try:
-            # Add resolution instruction if specified
-            if resolution and resolution in config.RESOLUTION_PRESETS:
-                resolution_text = config.RESOLUTION_PRESETS[resolution]
-                prompt = f"{prompt} The output image should be exactly {resolution_text} pixels."
+            content = self._build_generate_content(prompt, resolution)
+            cache_key = self._cache_key(content[0], [], cache_mode)
             
             # Generate content
-            response = self.image_model.generate_content([prompt])
-            
-            # Extract images
-            images = []
-            text_response = None
-            
-            for part in response.candidates[0].content.parts:
-                if part.text:
-                    text_response = part.text
-                elif part.inline_data:
-                    images.append(part.inline_data.data)
-            
-            if not images:
-                return False, "No images generated in response", None
-            
-            return True, text_response or "Image generated successfully", images
+            text_response, images = self._request(content, cache_key, cache_mode, "text-to-image", resolution)
+            return self._generate_result(text_response, images)
             
         except Exception as e:
-            return False, f"Error generating image: {str(e)}", None
+            return self._error_result(e, "Error generating image")
     
-    def edit_image(self, prompt: str, image_paths: List[str], resolution: Optional[str] = None) -> Tuple[bool, str, Optional[List[bytes]]]:
+    def edit_image(self, prompt: str, image_paths: List[str], resolution: Optional[str] = None,
+                   cache_mode: str = "use") -> Tuple[bool, str, Optional[List[bytes]]]:
         """Edit images using text prompts."""
+        self._local.last_call_stats = None
         try:
             # Validate images
             is_valid, error_msg = self.validate_images(image_paths)
             if not is_valid:
                 return False, error_msg, None
             
-            # Prepare content
-            content = [prompt]
-            
-            # Add images
-            for image_path in image_paths:
-                img = Image.open(image_path)
-                content.append(img)
-            
-            # Add resolution instruction if specified
-            if resolution and resolution in config.RESOLUTION_PRESETS:
-                resolution_text = config.RESOLUTION_PRESETS[resolution]
-                content[0] = f"{content[0]} The output image should be exactly {resolution_text} pixels."
+            content = self._build_edit_content(prompt, image_paths, resolution)
+            cache_key = self._cache_key(content[0], image_paths, cache_mode)
             
             # Generate content
-            response = self.image_model.generate_content(content)
-            
-            # Extract images
-            images = []
-            text_response = None
-            
-            for part in response.candidates[0].content.parts:
-                if part.text:
-                    text_response = part.text
-                elif part.inline_data:
-                    images.append(part.inline_data.data)
+            text_response, images = self._request(content, cache_key, cache_mode, "image-editing", resolution)
+            return self._edit_result(text_response, images)
             
-            if not images:
-                return False, "No images generated in response", None
-            
-            return True, text_response or "Image edited successfully", images
-            
-        except FileNotFoundError as e:
-            return False, f"Image file not found: {str(e)}", None
-        except PermissionError as e:
-            return False, f"Permission denied accessing image file: {str(e)}", None
         except Exception as e:
-            # Provide more specific error messages based on error type
-            error_msg = str(e).lower()
-            if "quota" in error_msg or "limit" in error_msg:
-                return False, f"API quota exceeded or rate limit hit: {str(e)}", None
-            elif "network" in error_msg or "connection" in error_msg:
-                return False, f"Network connection error: {str(e)}", None
-            elif "authentication" in error_msg or "unauthorized" in error_msg:
-                return False, f"API authentication failed: {str(e)}", None
-            elif "safety" in error_msg or "blocked" in error_msg:
-                return False, f"Content blocked by safety filters: {str(e)}", None
-            else:
-                return False, f"Error editing image: {str(e)}", None
+            return self._error_result(e, "Error editing image")
     
     def chat_about_image(self, messages: List[Dict[str, Any]]) -> Tuple[bool, str]:
         """Have a conversation about images."""
+        self._local.last_call_stats = None
         try:
-            # Convert messages to Gemini format
-            content = []
-            for msg in messages:
-                if msg['type'] == 'text':
-                    content.append(msg['content'])
-                elif msg['type'] == 'image':
-                    if isinstance(msg['content'], str):
-                        # Image path
-                        img = Image.open(msg['content'])
-                        content.append(img)
-                    else:
-                        # Assume PIL Image
-                        content.append(msg['content'])
+            text_response, images = self._request(self._build_chat_content(messages), mode="chat-image")
+            return self._chat_result(text_response, images)
             
-            response = self.image_model.generate_content(content)
-            
-            # Handle response
-            images = []
-            text_response = None
+        except Exception as e:
+            return self._error_result(e, "Error in chat")
+    
+    def _cache_key(self, final_prompt: str, image_paths: List[str], cache_mode: str = "use") -> Optional[str]:
+        """Build the response cache key, or None when the cache won't be used."""
+        if cache_mode == "off" or self.response_cache is None:
+            return None
+        image_hashes = [ResponseCache.hash_file(path) for path in image_paths]
+        return ResponseCache.make_key(self.backend.model_name, final_prompt, image_hashes)
+    
+    def _request(self, content: List[Any], cache_key: Optional[str] = None, cache_mode: str = "use",
+                 mode: str = "chat-image", resolution: Optional[str] = None) -> Tuple[Optional[str], List[bytes]]:
+        """Send a request, consulting the response cache when a key is given."""
+        call = self._new_call_metrics(content, mode, resolution)
+        started = time.perf_counter()
+        stats = RetryStats()
+        try:
+            cache = self.response_cache if cache_key else None
+            if cache and cache_mode == "use":
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    call.outcome = "cache_hit"
+                    call.bytes_down = self._response_bytes(*cached)
+                    return cached
             
-            for part in response.candidates[0].content.parts:
-                if part.text:
-                    text_response = part.text
-                elif part.inline_data:
-                    images.append(part.inline_data.data)
+            self._local.last_call_stats = stats
+            def attempt():
+                # Every attempt, including retries, spends a token
+                queued = time.perf_counter()
+                limiter = self.rate_limiter
+                if limiter is not None:
+                    limiter.acquire()
+                sent = time.perf_counter()
+                call.queue_wait += sent - queued
+                try:
+                    return self.backend.fetch(content)
+                finally:
+                    call.network_time += time.perf_counter() - sent
             
-            return True, text_response or "Response generated", images if images else None
+            response = call_with_retry(
+                attempt,
+                RetryPolicy.from_config(),
+                stats,
+                self.retry_totals
+            )
+            decode_started = time.perf_counter()
+            text_response, images = self.backend.decode(response)
+            call.decode_time = time.perf_counter() - decode_started
+            call.bytes_down = self._response_bytes(text_response, images)
             
+            if cache and images:
+                cache.put(cache_key, text_response, images)
+            return text_response, images
         except Exception as e:
-            return False, f"Error in chat: {str(e)}", None
+            call.outcome = classify_error(e)
+            raise
+        finally:
+            call.retries = stats.retries
+            call.total_time = time.perf_counter() - started
+            metrics.record_call(call)
+    
+    def _new_call_metrics(self, content: List[Any], mode: str, resolution: Optional[str]) -> CallMetrics:
+        """Start the metrics record of one request."""
+        bytes_up = 0
+        for part in content:
+            if isinstance(part, str):
+                bytes_up += len(part.encode("utf-8"))
+            elif isinstance(part, dict) and "data" in part:
+                bytes_up += len(part["data"])
+        return CallMetrics(mode=mode, model=self.backend.model_name,
+                           resolution=resolution or "none", bytes_up=bytes_up)
+    
+    @staticmethod
+    def _response_bytes(text_response: Optional[str], images: List[bytes]) -> int:
+        """Size of a response's text and image payloads."""
+        return len((text_response or "").encode("utf-8")) + sum(len(data) for data in images or [])
+    
+    def _apply_resolution(self, prompt: str, resolution: Optional[str]) -> str:
+        """Append the resolution instruction to a prompt if a known preset is given."""
+        if resolution and resolution in config.RESOLUTION_PRESETS:
+            resolution_text = config.RESOLUTION_PRESETS[resolution]
+            return f"{prompt} The output image should be exactly {resolution_text} pixels."
+        return prompt
+    
+    def _build_generate_content(self, prompt: str, resolution: Optional[str]) -> List[Any]:
+        """Build request content for text-to-image generation."""
+        return [self._apply_resolution(prompt, resolution)]
+    
+    def _build_edit_content(self, prompt: str, image_paths: List[str], resolution: Optional[str]) -> List[Any]:
+        """Build request content for image editing."""
+        content = [self._apply_resolution(prompt, resolution)]
+        policy = UploadPolicy.from_config()
+        for image_path in image_paths:
+            image_content, _ = policy.prepare_path(image_path)
+            content.append(image_content)
+        return content
+    
+    def _build_chat_content(self, messages: List[Dict[str, Any]]) -> List[Any]:
+        """Convert chat messages to Gemini request content."""
+        content = []
+        policy = UploadPolicy.from_config()
+        for msg in messages:
+            if msg['type'] == 'text':
+                content.append(msg['content'])
+            elif msg['type'] == 'image':
+                if isinstance(msg['content'], str):
+                    # Image path
+                    image_content, _ = policy.prepare_path(msg['content'])
+                elif isinstance(msg['content'], bytes):
+                    # Encoded image data, e.g. a previously generated image
+                    image_content, _ = policy.prepare_bytes(msg['content'])
+                else:
+                    # Assume PIL Image
+                    image_content, _ = policy.prepare_image(msg['content'])
+                content.append(image_content)
+        return content
+    
+    def _generate_result(self, text_response: Optional[str], images: List[bytes]) -> Tuple[bool, str, Optional[List[bytes]]]:
+        """Convert a text-to-image response into the client result tuple."""
+        if not images:
+            return False, "No images generated in response", None
+        return True, text_response or "Image generated successfully", images
+    
+    def _edit_result(self, text_response: Optional[str], images: List[bytes]) -> Tuple[bool, str, Optional[List[bytes]]]:
+        """Convert an image editing response into the client result tuple."""
+        if not images:
+            return False, "No images generated in response", None
+        return True, text_response or "Image edited successfully", images
+    
+    def _chat_result(self, text_response: Optional[str], images: List[bytes]) -> Tuple[bool, str, Optional[List[bytes]]]:
+        """Convert a chat response into the client result tuple."""
+        return True, text_response or "Response generated", images if images else None
     
-    def save_images(self, images: List[bytes], prefix: str = "generated_image") -> List[str]:
-        """Save generated images to disk."""
-        saved_files = []
+    def _error_result(self, e: Exception, fallback: str,
+                      stats: Optional[RetryStats] = None) -> Tuple[bool, str, None]:
+        """Map an exception to a user-facing failure tuple (stats default to the thread's last call)."""
+        message = describe_error(e, fallback)
+        if stats is None:
+            stats = self.last_call_stats
+        if stats is not None and stats.retries:
+            message = f"{message} (after {stats.attempts} attempts)"
+        return False, message, None
+    
+    def save_images(self, images: List[bytes], prefix: str = "generated_image",
+                    on_complete: Optional[Callable[[List[str], List[str]], None]] = None) -> List[str]:
+        """Queue generated images for saving and return their paths right away.
+        
+        Files are written by the shared write-behind queue, so call
+        ``write_behind.flush()`` before reading them. ``on_complete`` is called
+        with the saved paths and any error messages once every image is written;
+        errors handed to it are not reported again by ``write_behind.flush()``.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        codec = OutputCodec.from_config()
+        os.makedirs(config.IMAGES_DIR, exist_ok=True)
+        filepaths = []
         
         for i, image_data in enumerate(images):
-            # Create filename
+            # Create filename; the extension follows the bytes that will be written
+            extension = codec.extension(image_data)
             if len(images) == 1:
-                filename = f"{prefix}_{timestamp}.png"
+                filename = f"{prefix}_{timestamp}{extension}"
             else:
-                filename = f"{prefix}_{timestamp}_{i+1}.png"
-            
-            filepath = os.path.join(config.IMAGES_DIR, filename)
-            
+                filename = f"{prefix}_{timestamp}_{i+1}{extension}"
+            filepaths.append(os.path.join(config.IMAGES_DIR, filename))
+        
+        remaining = [len(images)]
+        saved: Dict[int, str] = {}
+        errors: List[str] = []
+        lock = threading.Lock()
+        
+        def write(i: int, image_data: bytes, filepath: str):
             try:
-                # Save image
-                img = Image.open(BytesIO(image_data))
-                img.save(filepath, "PNG")
-                saved_files.append(filepath)
-                
+                write_started = time.perf_counter()
+                self._write_image(codec.encode(image_data), filepath)
+                metrics.observe("nanobanana_save_seconds", time.perf_counter() - write_started,
+                                help_text="Time to encode and write one image", codec=codec.codec)
+                with lock:
+                    saved[i] = filepath
             except Exception as e:
-                print(f"Error saving image {i+1}: {e}")
+                with lock:
+                    errors.append(f"Error saving image {i+1}: {e}")
+                if on_complete is None:
+                    raise
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    done = remaining[0] == 0
+                if done and on_complete is not None:
+                    on_complete([saved[k] for k in sorted(saved)], errors)
+        
+        for i, (image_data, filepath) in enumerate(zip(images, filepaths)):
+            write_behind.submit(write, i, image_data, filepath, description=f"save {filepath}")
         
-        return saved_files
+        if not images and on_complete is not None:
+            on_complete([], [])
+        return filepaths
+    
+    def _write_image(self, data: bytes, filepath: str):
+        """Write encoded image bytes to ``filepath``."""
+        # Write to a temporary name so readers never see a partial file
+        tmp_path = f"{filepath}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, filepath)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
     
     def estimate_tokens(self, text: str) -> int:
         """Rough estimate of token count."""
@@ -223,12 +359,139 @@ class GeminiClient:
         
         return True, ""
 
+class AsyncGeminiClient(GeminiClient):
+    """Gemini client with coroutine variants of the generation calls.
+    
+    Requests are issued through the SDK's ``generate_content_async`` and at most
+    ``max_concurrency`` of them are in flight at once (per event loop, so the
+    shared client works across separate ``asyncio.run`` calls). Results use the
+    same ``(success, message, images)`` contract as the synchronous methods.
+    """
+    
+    def __init__(self, max_concurrency: Optional[int] = None, backend: Optional[GenerationBackend] = None):
+        super().__init__(backend)
+        if max_concurrency is None:
+            max_concurrency = config.get("max_concurrent_requests", 4)
+        self.max_concurrency = max(1, int(max_concurrency))
+        # A semaphore is bound to the loop it is first used on; keep one per loop
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary())
+    
+    @property
+    def _semaphore(self) -> asyncio.Semaphore:
+        """The concurrency limit of the running event loop (created on first use)."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+    
+    async def _request_async(self, content: List[Any], cache_key: Optional[str] = None, cache_mode: str = "use",
+                             mode: str = "chat-image", resolution: Optional[str] = None,
+                             stats: Optional[RetryStats] = None) -> Tuple[Optional[str], List[bytes]]:
+        """Send a request while holding a concurrency slot, consulting the response cache.
+        
+        ``stats`` collects the retries of this request (coroutines share a thread,
+        so ``last_call_stats`` can't tell them apart).
+        """
+        call = self._new_call_metrics(content, mode, resolution)
+        started = time.perf_counter()
+        stats = stats if stats is not None else RetryStats()
+        try:
+            cache = self.response_cache if cache_key else None
+            if cache and cache_mode == "use":
+                cached = await asyncio.to_thread(cache.get, cache_key)
+                if cached is not None:
+                    call.outcome = "cache_hit"
+                    call.bytes_down = self._response_bytes(*cached)
+                    return cached
+            
+            async def attempt():
+                # Release the slot while backing off so other requests can proceed
+                queued = time.perf_counter()
+                async with self._semaphore:
+                    limiter = self.rate_limiter
+                    if limiter is not None:
+                        await limiter.acquire_async()
+                    sent = time.perf_counter()
+                    call.queue_wait += sent - queued
+                    try:
+                        return await self.backend.fetch_async(content)
+                    finally:
+                        call.network_time += time.perf_counter() - sent
+            
+            response = await call_with_retry_async(attempt, RetryPolicy.from_config(), stats, self.retry_totals)
+            decode_started = time.perf_counter()
+            text_response, images = self.backend.decode(response)
+            call.decode_time = time.perf_counter() - decode_started
+            call.bytes_down = self._response_bytes(text_response, images)
+            
+            if cache and images:
+                await asyncio.to_thread(cache.put, cache_key, text_response, images)
+            return text_response, images
+        except Exception as e:
+            call.outcome = classify_error(e)
+            raise
+        finally:
+            call.retries = stats.retries
+            call.total_time = time.perf_counter() - started
+            metrics.record_call(call)
+    
+    async def generate_text_to_image_async(self, prompt: str, resolution: Optional[str] = None,
+                                           cache_mode: str = "use") -> Tuple[bool, str, Optional[List[bytes]]]:
+        """Generate images from text prompt without blocking the event loop."""
+        stats = RetryStats()
+        try:
+            content = self._build_generate_content(prompt, resolution)
+            cache_key = self._cache_key(content[0], [], cache_mode)
+            text_response, images = await self._request_async(content, cache_key, cache_mode,
+                                                              "text-to-image", resolution, stats)
+            return self._generate_result(text_response, images)
+        except Exception as e:
+            return self._error_result(e, "Error generating image", stats)
+    
+    async def edit_image_async(self, prompt: str, image_paths: List[str], resolution: Optional[str] = None,
+                               cache_mode: str = "use") -> Tuple[bool, str, Optional[List[bytes]]]:
+        """Edit images using text prompts without blocking the event loop."""
+        stats = RetryStats()
+        try:
+            # File validation, hashing and decoding stay off the event loop
+            is_valid, error_msg = await asyncio.to_thread(self.validate_images, image_paths)
+            if not is_valid:
+                return False, error_msg, None
+            
+            content = await asyncio.to_thread(self._build_edit_content, prompt, image_paths, resolution)
+            cache_key = await asyncio.to_thread(self._cache_key, content[0], image_paths, cache_mode)
+            text_response, images = await self._request_async(content, cache_key, cache_mode,
+                                                              "image-editing", resolution, stats)
+            return self._edit_result(text_response, images)
+        except Exception as e:
+            return self._error_result(e, "Error editing image", stats)
+    
+    async def chat_about_image_async(self, messages: List[Dict[str, Any]]) -> Tuple[bool, str]:
+        """Have a conversation about images without blocking the event loop."""
+        stats = RetryStats()
+        try:
+            content = await asyncio.to_thread(self._build_chat_content, messages)
+            text_response, images = await self._request_async(content, mode="chat-image", stats=stats)
+            return self._chat_result(text_response, images)
+        except Exception as e:
+            return self._error_result(e, "Error in chat", stats)
+
 # Global client instance (lazy initialization)
 _client = None
+_async_client = None
 
 def get_client() -> GeminiClient:
     """Get global Gemini client instance."""
     global _client
     if _client is None:
         _client = GeminiClient()
-    return _client
\ No newline at end of file
+    return _client
+
+def get_async_client() -> AsyncGeminiClient:
+    """Get global async Gemini client instance."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncGeminiClient()
+    return _async_client
\ No newline at end of file
@@ -7,7 +7,12 @@
 import argparse
 import sys
 from pathlib import Path
-from PIL import Image
+
+try:
+    from .image_probe import image_probe
+except ImportError:
+    # Run as a standalone script from the src directory
+    from image_probe import image_probe
 
 
 def get_image_size(image_path: str) -> tuple[int, int]:
@@ -32,8 +37,8 @@ def get_image_size(image_path: str) -> tuple[int, int]:
     if not path.is_file():
         raise ValueError(f"路径不是文件: {image_path}")
     
-    with Image.open(path) as img:
-        return img.size
+    # Only the header is read; repeated lookups are served from the probe cache
+    return image_probe.probe(str(path)).dimensions
 
 
 def main():
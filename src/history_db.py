@@ -0,0 +1,293 @@
+"""SQLite generation history with full-text prompt search.
+
+An optional alternative to the JSONL log in ``history_store.py`` (set
+``history_backend`` to ``"sqlite"``). Entries live in ``history.db`` with
+indexed timestamp, mode, theme/feature and resolution columns, output paths
+in their own indexed table, and prompts in an FTS5 trigram index. Pages are
+fetched with keyset queries on the row id, so the first page of a search
+over millions of entries returns in milliseconds.
+
+The trigram tokenizer matches any substring of three or more characters, so
+searches behave like ``HistoryQuery.matches``: ``cat`` finds "cats" and
+Chinese prompts, which have no spaces between words, can be searched for
+any part. Shorter terms (a single Chinese character, for example) can't use
+the index and are matched with ``LIKE``.
+
+On first open the existing ``history.jsonl`` (or legacy ``history.json``) is
+imported once and renamed with a ``.migrated`` suffix.
+"""
+
+import os
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .history_store import HistoryQuery, HistoryStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL DEFAULT '',
+    mode TEXT,
+    theme_or_feature TEXT,
+    resolution TEXT,
+    prompt TEXT NOT NULL DEFAULT '',
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_timestamp ON history(timestamp);
+CREATE INDEX IF NOT EXISTS history_mode ON history(mode, id);
+CREATE INDEX IF NOT EXISTS history_theme ON history(theme_or_feature, id);
+CREATE INDEX IF NOT EXISTS history_resolution ON history(resolution, id);
+CREATE TABLE IF NOT EXISTS history_files (
+    history_id INTEGER NOT NULL REFERENCES history(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_files_path ON history_files(path);
+CREATE INDEX IF NOT EXISTS history_files_name ON history_files(name);
+CREATE INDEX IF NOT EXISTS history_files_entry ON history_files(history_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(prompt, content='history', content_rowid='id',
+                                                          tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, prompt) VALUES (new.id, new.prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+END;
+"""
+
+# Shortest search term the trigram index can match
+FTS_MIN_TERM = 3
+
+class SQLiteHistoryStore:
+    """Newest-first history in a SQLite database; same interface as ``HistoryStore``."""
+
+    def __init__(self, path: Path, import_paths: Tuple[Path, ...] = ()):
+        self.path = Path(path)
+        self.import_paths = tuple(Path(p) for p in import_paths)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.fts = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use (lock held)."""
+        if self._conn is not None:
+            return self._conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Appends come from the write-behind threads, reads from the UI thread
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        with conn:
+            conn.executescript(SCHEMA)
+        try:
+            with conn:
+                self._create_fts(conn)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5 or the trigram tokenizer (3.34+): search falls back to LIKE
+            logger.info("FTS5 trigram index unavailable, prompt search uses LIKE: %s", e)
+        self._conn = conn
+        self._import_existing()
+        return conn
+
+    @staticmethod
+    def _create_fts(conn: sqlite3.Connection):
+        """Create the prompt index, rebuilding one made with an older tokenizer."""
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'history_fts'").fetchone()
+        rebuild = row is not None and "trigram" not in row[0]
+        if rebuild:
+            conn.executescript("DROP TRIGGER IF EXISTS history_fts_insert; "
+                               "DROP TRIGGER IF EXISTS history_fts_delete; DROP TABLE history_fts;")
+        conn.executescript(FTS_SCHEMA)
+        if rebuild:
+            conn.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+
+    def _import_existing(self):
+        """Import the JSONL log or legacy JSON history once."""
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'imported'").fetchone():
+            return
+
+        for source in self.import_paths:
+            if not source.exists():
+                continue
+            if source.suffix == ".jsonl":
+                entries = list(HistoryStore(source).iter_newest())
+            else:
+                try:
+                    with open(source, 'r', encoding='utf-8') as f:
+                        entries = [e for e in json.load(f) if isinstance(e, dict)]
+                except (json.JSONDecodeError, IOError, TypeError) as e:
+                    logger.warning("Could not import %s: %s", source, e)
+                    continue
+            # Both sources are newest first; insert oldest first so row ids follow the original order
+            self._insert(entries[::-1])
+            logger.info("Imported history from %s", source)
+            try:
+                source.rename(source.with_name(source.name + ".migrated"))
+            except OSError as e:
+                logger.warning("Could not rename %s after import: %s", source, e)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('imported', '1')")
+
+    def _insert(self, entries: List[Dict[str, Any]]):
+        conn = self._conn
+        with conn:
+            for entry in entries:
+                cursor = conn.execute(
+                    "INSERT INTO history(timestamp, mode, theme_or_feature, resolution, prompt, entry) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (str(entry.get("timestamp", "")), entry.get("mode"), entry.get("theme_or_feature"),
+                     entry.get("resolution"), str(entry.get("prompt", "")),
+                     json.dumps(entry, ensure_ascii=False)))
+                files = entry.get("generated_files") or []
+                conn.executemany("INSERT INTO history_files(history_id, path, name) VALUES (?, ?, ?)",
+                                 [(cursor.lastrowid, str(path), os.path.basename(str(path))) for path in files])
+
+    def append(self, entries: List[Dict[str, Any]]):
+        """Append entries, oldest first."""
+        if not entries:
+            return
+        with self._lock:
+            self._connect()
+            self._insert(entries)
+
+    def iter_newest(self, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Yield entries newest first, one page at a time."""
+        cursor, yielded = None, 0
+        while limit is None or yielded < limit:
+            size = 500 if limit is None else min(500, limit - yielded)
+            page, cursor = self.query(cursor=cursor, limit=size)
+            yield from page
+            yielded += len(page)
+            if cursor is None:
+                return
+
+    def query(self, query: Optional[HistoryQuery] = None, cursor: Any = None, limit: int = 10,
+              max_items: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Any]:
+        """One page of matching entries, newest first, and the cursor of the next page (or None).
+
+        The cursor is the id of the last row returned; rows beyond the newest
+        ``max_items`` are left out.
+        """
+        terms = query.terms if query is not None else []
+        fts_terms = [term for term in terms if len(term) >= FTS_MIN_TERM] if self.fts else []
+        like_terms = [term for term in terms if term not in fts_terms]
+        use_fts = bool(fts_terms)
+        # With a search, order and bound by the FTS rowid so FTS5 streams matches newest first
+        key = "history_fts.rowid" if use_fts else "h.id"
+        where, params = [], []
+        if use_fts:
+            # Quote each term so FTS syntax characters are taken literally
+            where.append("history_fts MATCH ?")
+            params.append(" ".join('"' + term.replace('"', '""') + '"' for term in fts_terms))
+        if cursor is not None:
+            where.append(f"{key} < ?")
+            params.append(cursor)
+        if query is not None:
+            for term in like_terms:
+                where.append("h.prompt LIKE ? ESCAPE '\\'")
+                params.append(f"%{self._escape_like(term)}%")
+            if query.mode:
+                where.append("h.mode = ?")
+                params.append(query.mode)
+            if query.since:
+                where.append("h.timestamp >= ?")
+                params.append(query.since)
+            if query.file:
+                where.append("h.id IN (SELECT history_id FROM history_files WHERE path = ? OR name GLOB ?)")
+                params += [query.file, self._escape_glob(query.file) + "*"]
+
+        with self._lock:
+            conn = self._connect()
+            if max_items is not None:
+                floor = self._floor_id(max_items)
+                if floor is not None:
+                    where.append(f"{key} > ?")
+                    params.append(floor)
+
+            source = "history_fts JOIN history h ON h.id = history_fts.rowid" if use_fts else "history h"
+            sql = f"SELECT h.id, h.entry FROM {source}"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += f" ORDER BY {key} DESC LIMIT ?"
+            rows = conn.execute(sql, params + [limit + 1]).fetchall()
+
+        entries = [json.loads(entry) for _, entry in rows[:limit]]
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return entries, next_cursor
+
+    @staticmethod
+    def _escape_like(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    @staticmethod
+    def _escape_glob(text: str) -> str:
+        """Escape GLOB wildcards; a literal prefix lets SQLite use the name index."""
+        return "".join(f"[{c}]" if c in "*?[" else c for c in text)
+
+    def _id_range(self) -> Tuple[Optional[int], Optional[int]]:
+        """Oldest and newest row id (lock held).
+
+        Rows are only ever deleted oldest first (or all at once), so ids are
+        contiguous and the range gives the row count without a table scan.
+        """
+        # Separate subqueries: SQLite only answers a lone MIN() or MAX() from the index
+        return self._conn.execute(
+            "SELECT (SELECT MIN(id) FROM history), (SELECT MAX(id) FROM history)").fetchone()
+
+    def _floor_id(self, max_items: int) -> Optional[int]:
+        """Id just below the newest ``max_items`` rows, or None if there are fewer (lock held)."""
+        low, high = self._id_range()
+        if high is None or high - low + 1 <= max_items:
+            return None
+        return high - max_items
+
+    def count(self) -> int:
+        """Number of stored entries (may exceed the retention limit until compaction)."""
+        with self._lock:
+            self._connect()
+            low, high = self._id_range()
+            return 0 if high is None else high - low + 1
+
+    def needs_compaction(self, max_items: int) -> bool:
+        """Check whether the table has grown far enough past ``max_items`` to prune it."""
+        slack = max(100, max_items // 4)
+        with self._lock:
+            self._connect()
+            return self._floor_id(max_items + slack) is not None
+
+    def compact(self, max_items: int):
+        """Delete all but the newest ``max_items`` entries."""
+        with self._lock:
+            conn = self._connect()
+            floor = self._floor_id(max_items)
+            if floor is None:
+                return
+            with conn:
+                conn.execute("DELETE FROM history WHERE id <= ?", (floor,))
+
+    def clear(self):
+        """Delete every entry."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM history")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
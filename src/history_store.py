@@ -0,0 +1,260 @@
+"""Append-only generation history log.
+
+Each entry is one JSON line appended to ``history.jsonl``, so adding an entry
+costs the same no matter how long the history is. Readers stream the file
+backwards from its end to get the newest entries first. The retention limit
+is enforced by compaction, which rewrites the file with only the newest
+entries once it has grown a fair bit past the limit.
+
+A ``history.json`` written by older versions is migrated on first use.
+The optional SQLite backend in ``history_db.py`` offers the same interface.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+
+_RELATIVE_SINCE = re.compile(r"^(\d+)([hdw])$")
+
+@dataclass
+class HistoryQuery:
+    """Filters for browsing history.
+
+    Parsed from text such as ``search cat hat mode:text-to-image since:7d``:
+    ``mode:`` matches the mode exactly, ``since:`` takes a date, a datetime or
+    a relative ``Nh``/``Nd``/``Nw``, ``file:`` matches an output path or the
+    start of an output file name, and remaining words must all appear in the
+    prompt.
+    """
+    terms: List[str] = field(default_factory=list)
+    mode: Optional[str] = None
+    since: Optional[str] = None  # ISO timestamp prefix, compared as text
+    file: Optional[str] = None
+
+    @classmethod
+    def parse(cls, text: str) -> 'HistoryQuery':
+        """Parse a filter string; raises ValueError for an unreadable ``since:``."""
+        query = cls()
+        words = text.split()
+        if words and words[0].lower() == "search":
+            words = words[1:]
+        for word in words:
+            key, sep, value = word.partition(":")
+            key = key.lower()
+            if sep and value and key == "mode":
+                query.mode = value
+            elif sep and value and key == "since":
+                query.since = cls._parse_since(value)
+            elif sep and value and key == "file":
+                query.file = value
+            else:
+                query.terms.append(word)
+        return query
+
+    @staticmethod
+    def _parse_since(value: str) -> str:
+        match = _RELATIVE_SINCE.match(value.lower())
+        if match:
+            amount, unit = int(match.group(1)), match.group(2)
+            delta = {"h": timedelta(hours=amount), "d": timedelta(days=amount), "w": timedelta(weeks=amount)}[unit]
+            return (datetime.now() - delta).isoformat()
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            raise ValueError(f"Invalid since: value {value!r} (use YYYY-MM-DD or e.g. 7d)")
+
+    @property
+    def empty(self) -> bool:
+        return not (self.terms or self.mode or self.since or self.file)
+
+    def matches(self, entry: Dict[str, Any]) -> bool:
+        """Check one entry against the filters."""
+        if self.mode and entry.get("mode") != self.mode:
+            return False
+        if self.since and str(entry.get("timestamp", "")) < self.since:
+            return False
+        if self.file and not any(str(path) == self.file or os.path.basename(str(path)).startswith(self.file)
+                                 for path in entry.get("generated_files", [])):
+            return False
+        prompt = str(entry.get("prompt", "")).lower()
+        return all(term.lower() in prompt for term in self.terms)
+
+    def describe(self) -> str:
+        """Short human-readable form of the active filters."""
+        parts = [" ".join(self.terms)] if self.terms else []
+        parts += [f"{key}:{value}" for key, value in
+                  (("mode", self.mode), ("since", self.since), ("file", self.file)) if value]
+        return " ".join(parts)
+
+class HistoryStore:
+    """Newest-first history backed by an append-only JSONL file."""
+
+    def __init__(self, path: Path, legacy_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._lock = threading.RLock()
+        self._count: Optional[int] = None  # lines in the file, counted on first need
+        self._migrated = False
+
+    def _migrate(self):
+        """Convert a legacy ``history.json`` (a newest-first JSON array) once."""
+        if self._migrated:
+            return
+        self._migrated = True
+        if self.legacy_path is None or not self.legacy_path.exists():
+            return
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning("Could not migrate %s: %s", self.legacy_path, e)
+            return
+        if not isinstance(legacy, list):
+            return
+
+        existing = self._read_all() if self.path.exists() else []
+        # Legacy entries are older than anything already in the log
+        entries = list(reversed([e for e in legacy if isinstance(e, dict)])) + existing
+        self._rewrite(entries)
+        self.legacy_path.unlink()
+
+    def append(self, entries: List[Dict[str, Any]]):
+        """Append entries, oldest first."""
+        if not entries:
+            return
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        with self._lock:
+            self._migrate()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+            if self._count is not None:
+                self._count += len(entries)
+
+    def iter_newest(self, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Yield entries newest first, reading the file backwards in blocks."""
+        with self._lock:
+            self._migrate()
+        if limit is not None and limit <= 0:
+            return
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+
+        yielded = 0
+        with f:
+            position = f.seek(0, os.SEEK_END)
+            tail = b""
+            while position > 0:
+                step = min(BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                lines = (f.read(step) + tail).split(b"\n")
+                # The first piece may be the end of a line that starts in an earlier block
+                tail = lines.pop(0)
+                for line in reversed(lines):
+                    entry = self._parse(line)
+                    if entry is not None:
+                        yield entry
+                        yielded += 1
+                        if limit is not None and yielded >= limit:
+                            return
+            entry = self._parse(tail)
+            if entry is not None:
+                yield entry
+
+    def query(self, query: Optional[HistoryQuery] = None, cursor: Any = None, limit: int = 10,
+              max_items: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Any]:
+        """One page of matching entries, newest first, and the cursor of the next page (or None).
+
+        The log has no index, so the cursor is the number of matches already returned.
+        """
+        skip = cursor or 0
+        matching = (entry for entry in self.iter_newest(max_items)
+                    if query is None or query.matches(entry))
+        page = list(islice(matching, skip, skip + limit + 1))
+        if len(page) > limit:
+            return page[:limit], skip + limit
+        return page, None
+
+    @staticmethod
+    def _parse(line: bytes) -> Optional[Dict[str, Any]]:
+        """Decode one line; blank or torn lines (e.g. from a crash mid-write) are skipped."""
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            entry = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    def _read_all(self) -> List[Dict[str, Any]]:
+        """All entries, oldest first."""
+        entries = list(self.iter_newest())
+        entries.reverse()
+        return entries
+
+    def count(self) -> int:
+        """Number of lines in the log (may exceed the retention limit until compaction)."""
+        with self._lock:
+            self._migrate()
+            if self._count is None:
+                self._count = 0
+                try:
+                    with open(self.path, 'rb') as f:
+                        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+                            self._count += block.count(b"\n")
+                except FileNotFoundError:
+                    pass
+            return self._count
+
+    def needs_compaction(self, max_items: int) -> bool:
+        """Check whether the log has grown far enough past ``max_items`` to rewrite it."""
+        slack = max(100, max_items // 4)
+        return self.count() > max_items + slack
+
+    def compact(self, max_items: int):
+        """Rewrite the log keeping only the newest ``max_items`` entries."""
+        with self._lock:
+            if self.count() <= max_items:
+                return
+            entries = list(self.iter_newest(max_items))
+            entries.reverse()
+            self._rewrite(entries)
+
+    def _rewrite(self, entries: List[Dict[str, Any]]):
+        """Atomically replace the log with ``entries`` (oldest first)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+        self._count = len(entries)
+
+    def clear(self):
+        """Delete the log (and any legacy history file)."""
+        with self._lock:
+            for path in (self.path, self.legacy_path):
+                if path is not None and path.exists():
+                    path.unlink()
+            self._count = 0
+            self._migrated = True
@@ -10,7 +10,7 @@ class ImageEditor:
     """Handles image editing with different features."""
     
     def __init__(self):
-        self.client = get_client()
+        self._client = None
         self.feature_map = {
             "1": "add_remove",
             "2": "inpainting", 
@@ -19,6 +19,13 @@ class ImageEditor:
             "5": "detail_preservation"
         }
     
+    @property
+    def client(self):
+        """Gemini client, created on first use."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+    
     def run(self):
         """Run image editing flow."""
         while True:
@@ -107,26 +114,25 @@ class ImageEditor:
             except Exception as e:
                 success, message, images = False, f"Unexpected error: {str(e)}", None
         
+        ui.show_retry_stats(self.client.last_call_stats)
+        
         if success and images:
             # Save images
             try:
-                saved_files = self.client.save_images(images, f"edited_{feature_key}")
+                ui.show_success(message)
                 
-                ui.show_success(message, saved_files)
-                
-                # Add to history
-                config.add_to_history({
+                # Only files actually written are added to history
+                saved_files = ui.save_generated_images(self.client, images, f"edited_{feature_key}", {
                     "mode": "image-editing",
                     "theme_or_feature": template.name,
                     "prompt": prompt,
                     "input_images": image_paths,
-                    "resolution": resolution or "original",
-                    "generated_files": saved_files
+                    "resolution": resolution or "original"
                 })
                 
                 # Ask if user wants to open images
-                if config.get("auto_open_images") or \
-                   ui.console.input("Open edited images? [Y/n]: ").lower() in ['', 'y', 'yes']:
+                if saved_files and (config.get("auto_open_images") or
+                                    ui.console.input("Open edited images? [Y/n]: ").lower() in ['', 'y', 'yes']):
                     self._open_images(saved_files)
                     
             except Exception as e:
@@ -159,6 +165,9 @@ class ImageEditor:
         
         system = platform.system()
         
+        # Images are written in the background; wait until they are on disk
+        ui.wait_for_saves()
+        
         for path in image_paths:
             try:
                 if system == "Darwin":  # macOS
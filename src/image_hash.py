@@ -0,0 +1,278 @@
+"""Perceptual hashes and near-duplicate grouping.
+
+dHash compares neighbouring pixels of a 9x8 grayscale image; pHash keeps
+the signs of the lowest 8x8 DCT frequencies of a 32x32 one. Both are 64-bit
+fingerprints whose Hamming distance stays small for resized, recompressed
+or lightly edited copies. Hashes are computed from the browser's cached
+thumbnails, a batch at a time with NumPy when it is installed (pure Python
+otherwise, dHash only).
+
+Images are grouped with multi-index hashing (see ``MultiIndex``), so each
+image is only compared against the few candidates that share a nearly
+identical part of its hash, not against every other image. A BK-tree
+would degrade to a near-linear scan here: 64-bit hash distances cluster
+around 32, so a threshold of 8 prunes almost nothing.
+"""
+
+import math
+from itertools import combinations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from .config import config
+from .thumbnail_cache import ThumbnailCache, thumbnail_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Default Hamming distance (out of 64 bits) for two images to count as near duplicates
+DEFAULT_THRESHOLDS = {"dhash": 10, "phash": 8}
+
+HASH_SIZES = {"dhash": (9, 8), "phash": (32, 32)}
+
+BATCH_SIZE = 256
+
+# (content key, method) -> hash; content keys change whenever the file does
+_hash_cache: Dict[Tuple[str, str], int] = {}
+
+def default_method() -> str:
+    """pHash needs NumPy for the DCT; fall back to dHash without it."""
+    method = str(config.get("duplicate_hash", "auto")).lower()
+    if method == "phash" and np is None:
+        return "dhash"
+    if method in HASH_SIZES:
+        return method
+    return "phash" if np is not None else "dhash"
+
+def _pack(bits) -> List[int]:
+    """Rows of 64 booleans to ints, first bit most significant."""
+    packed = np.packbits(bits.reshape(-1, 64), axis=1)
+    return [int(value) for value in packed.view(">u8").ravel()]
+
+def dhash_pixels(batch: List[bytes]) -> List[int]:
+    """dHash of 9x8 grayscale pixel buffers."""
+    if np is not None:
+        pixels = np.frombuffer(b"".join(batch), dtype=np.uint8).reshape(-1, 8, 9)
+        return _pack(pixels[:, :, 1:] > pixels[:, :, :-1])
+    hashes = []
+    for pixels in batch:
+        value = 0
+        for row in range(0, 72, 9):
+            for col in range(row, row + 8):
+                value = (value << 1) | (pixels[col + 1] > pixels[col])
+        hashes.append(value)
+    return hashes
+
+_dct_matrix = None
+
+def phash_pixels(batch: List[bytes]) -> List[int]:
+    """pHash of 32x32 grayscale pixel buffers (requires NumPy)."""
+    global _dct_matrix
+    if np is None:
+        raise RuntimeError("pHash requires numpy")
+    if _dct_matrix is None:
+        k = np.arange(32)[:, None]
+        i = np.arange(32)[None, :]
+        matrix = np.cos(np.pi * (2 * i + 1) * k / 64) * math.sqrt(2 / 32)
+        matrix[0] /= math.sqrt(2)
+        _dct_matrix = matrix.astype(np.float32)
+
+    pixels = np.frombuffer(b"".join(batch), dtype=np.uint8).reshape(-1, 32, 32).astype(np.float32)
+    # 2-D DCT of the whole batch at once: D @ X @ D.T broadcast over the first axis
+    low = (_dct_matrix @ pixels @ _dct_matrix.T)[:, :8, :8].reshape(-1, 64)
+    median = np.median(low[:, 1:], axis=1, keepdims=True)  # the DC term would skew the median
+    return _pack(low > median)
+
+HASH_FUNCTIONS = {"dhash": dhash_pixels, "phash": phash_pixels}
+
+def chunk_layout(radius: int, chunks: Optional[int] = None) -> List[Tuple[int, int, List[int]]]:
+    """Split 64 bits into substrings: ``(shift, mask, flip masks)`` per substring.
+
+    The flip masks are every way of flipping up to ``radius // chunks``
+    bits of the substring.
+    """
+    chunks = min(64, chunks or radius // 2 + 1)
+    widths = [64 // chunks + (1 if i < 64 % chunks else 0) for i in range(chunks)]
+    layout = []
+    shift = 64
+    for width in widths:
+        shift -= width
+        flips = [0]
+        for bits in range(1, radius // chunks + 1):
+            flips.extend(sum(1 << b for b in combo) for combo in combinations(range(width), bits))
+        layout.append((shift, (1 << width) - 1, flips))
+    return layout
+
+class MultiIndex:
+    """Multi-index hashing for Hamming-distance range queries over 64-bit hashes.
+
+    Each hash is split into ``chunks`` substrings, each indexed in its own
+    table. Two hashes within distance ``radius`` differ in at most
+    ``radius // chunks`` bits of at least one substring (pigeonhole), so a
+    query only looks up each of its substrings with that many bits flipped
+    and compares the few candidates it finds in full.
+    """
+
+    def __init__(self, radius: int, chunks: Optional[int] = None):
+        self.radius = radius
+        self._chunks = chunk_layout(radius, chunks)
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._chunks]
+        self._items: Dict[int, List[Any]] = {}
+
+    def add(self, value: int, item: Any):
+        items = self._items.get(value)
+        if items is not None:
+            items.append(item)
+            return
+        self._items[value] = [item]
+        for (shift, mask, _), table in zip(self._chunks, self._tables):
+            table.setdefault((value >> shift) & mask, []).append(value)
+
+    def search(self, value: int, radius: Optional[int] = None) -> List[Tuple[int, Any]]:
+        """``(distance, item)`` for every item within ``radius`` (at most the index radius) of ``value``."""
+        radius = self.radius if radius is None else min(radius, self.radius)
+        matches = set()
+        for (shift, mask, flips), table in zip(self._chunks, self._tables):
+            chunk = (value >> shift) & mask
+            for flip in flips:
+                bucket = table.get(chunk ^ flip)
+                if bucket:
+                    # Cheaper to re-check a candidate found via several chunks than to dedupe them all
+                    matches.update(c for c in bucket if (c ^ value).bit_count() <= radius)
+        return [((candidate ^ value).bit_count(), item) for candidate in matches for item in self._items[candidate]]
+
+def _popcount(values):
+    if hasattr(np, "bitwise_count"):  # NumPy 2.0+
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+def close_pairs(values: List[int], radius: int) -> Iterator[Tuple[int, int]]:
+    """Index pairs ``(i, j)``, ``i < j``, of hashes within ``radius`` (requires NumPy).
+
+    The same multi-index lookup as ``MultiIndex``, done for all hashes at
+    once: hashes are sorted by substring, and per flip mask every hash's
+    range of matching substrings is read from a bucket offset table (at
+    least 4 substrings, so tables have at most 2**16 entries). The candidate
+    pairs are checked in one vectorized popcount. Pairs may repeat.
+    """
+    hashes = np.array(values, dtype=np.uint64)
+    positions = np.arange(len(hashes))
+
+    def cost(chunks: int) -> float:
+        # Lookups plus expected candidates for uniformly spread hashes
+        layout = chunk_layout(radius, chunks)
+        return sum(len(flips) * (1 + len(hashes) / (mask + 1)) for _, mask, flips in layout)
+
+    chunks = min(range(4, max(4, radius + 1) + 1), key=cost)
+    for shift, mask, flips in chunk_layout(radius, chunks):
+        keys = ((hashes >> np.uint64(shift)) & np.uint64(mask)).astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        sizes = np.bincount(keys, minlength=mask + 1)
+        offsets = np.cumsum(sizes) - sizes
+        for flip in flips:
+            targets = keys ^ flip
+            low = offsets[targets]
+            matches = sizes[targets]
+            total = int(matches.sum())
+            if not total:
+                continue
+            # Expand each query's range of matching positions into explicit pairs
+            first = np.repeat(positions, matches)
+            starts = np.repeat(low - (np.cumsum(matches) - matches), matches)
+            second = order[starts + np.arange(total)]
+            candidates = first < second
+            first, second = first[candidates], second[candidates]
+            close = _popcount(hashes[first] ^ hashes[second]) <= radius
+            yield from zip(first[close].tolist(), second[close].tolist())
+
+def group_near_duplicates(hashes: Dict[str, int], threshold: int) -> List[List[str]]:
+    """Groups (in input order) of paths connected by hashes within ``threshold``."""
+    parent = {path: path for path in hashes}
+
+    def find(path: str) -> str:
+        while parent[path] != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    def union(path: str, other: str):
+        root, other_root = find(path), find(other)
+        if root != other_root:
+            parent[root] = other_root
+
+    if np is not None:
+        paths = list(hashes)
+        for i, j in close_pairs(list(hashes.values()), threshold):
+            union(paths[i], paths[j])
+    else:
+        # Each image is matched against the ones before it, so every pair is checked once
+        index = MultiIndex(threshold)
+        for path, value in hashes.items():
+            for _, other in index.search(value):
+                union(path, other)
+            index.add(value, path)
+
+    groups: Dict[str, List[str]] = {}
+    for path in hashes:
+        groups.setdefault(find(path), []).append(path)
+    return [group for group in groups.values() if len(group) > 1]
+
+def _load_pixels(thumb: str, size: Tuple[int, int]) -> Optional[bytes]:
+    try:
+        with Image.open(thumb) as img:
+            return img.convert("L").resize(size, Image.Resampling.BILINEAR).tobytes()
+    except (OSError, ValueError):
+        return None
+
+def compute_hashes(paths: Iterable[str], method: Optional[str] = None, cache: ThumbnailCache = thumbnail_cache,
+                   on_progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+    """Perceptual hashes of ``paths`` from their thumbnails; unreadable images are left out."""
+    method = method or default_method()
+    hash_function = HASH_FUNCTIONS[method]
+    size = HASH_SIZES[method]
+    paths = list(paths)
+    hashes: Dict[str, int] = {}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for start in range(0, len(paths), BATCH_SIZE):
+            chunk = paths[start:start + BATCH_SIZE]
+            todo = []
+            for path in chunk:
+                key = cache.key(path)
+                if key is None:
+                    continue
+                cached = _hash_cache.get((key, method))
+                if cached is not None:
+                    hashes[path] = cached
+                else:
+                    todo.append((path, key))
+
+            if todo:
+                thumbs = cache.ensure([path for path, _ in todo])
+
+                def load(item: Tuple[str, str]) -> Optional[bytes]:
+                    thumb = thumbs[item[0]]
+                    return _load_pixels(str(thumb), size) if thumb is not None else None
+
+                pixels = executor.map(load, todo)
+                loaded = [(path, key, data) for (path, key), data in zip(todo, pixels) if data]
+                if loaded:
+                    for (path, key, _), value in zip(loaded, hash_function([data for _, _, data in loaded])):
+                        _hash_cache[(key, method)] = value
+                        hashes[path] = value
+
+            if on_progress is not None:
+                on_progress(min(start + BATCH_SIZE, len(paths)), len(paths))
+    return hashes
+
+def find_near_duplicates(paths: Iterable[str], method: Optional[str] = None, threshold: Optional[int] = None,
+                         on_progress: Optional[Callable[[int, int], None]] = None) -> List[List[str]]:
+    """Groups of near-duplicate images among ``paths``."""
+    method = method or default_method()
+    if threshold is None:
+        threshold = int(config.get("duplicate_threshold") or DEFAULT_THRESHOLDS[method])
+    return group_near_duplicates(compute_hashes(paths, method, on_progress=on_progress), threshold)
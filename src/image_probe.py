@@ -0,0 +1,163 @@
+"""Header-only image probing with a shared metadata cache.
+
+``Image.open`` only parses the file header, so probing reads format,
+dimensions, mode and EXIF orientation without decoding pixels. Results are
+cached per path and invalidated when the file's size or mtime changes.
+
+This module only depends on Pillow so the standalone scripts in ``src`` can
+import it directly.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+EXIF_ORIENTATION = 0x0112
+
+@dataclass(frozen=True)
+class ImageMeta:
+    """Header metadata of an image file."""
+    path: str
+    format: Optional[str]
+    width: int
+    height: int
+    mode: str
+    orientation: int
+    file_size: int
+    mtime_ns: int
+
+    @property
+    def dimensions(self) -> Tuple[int, int]:
+        """Stored pixel size as ``(width, height)``."""
+        return self.width, self.height
+
+    @property
+    def display_dimensions(self) -> Tuple[int, int]:
+        """Pixel size after applying EXIF orientation."""
+        if self.orientation in (5, 6, 7, 8):
+            return self.height, self.width
+        return self.width, self.height
+
+class FileStat(NamedTuple):
+    """The parts of ``os.stat_result`` the probe uses, e.g. taken from a directory scan."""
+    st_size: int
+    st_mtime_ns: int
+
+class ImageProbe:
+    """Thread-safe LRU cache of image header metadata."""
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, ImageMeta]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, path: str, stat_result: Optional[os.stat_result] = None) -> ImageMeta:
+        """Return header metadata for ``path``.
+
+        Pass ``stat_result`` when the caller already has one (e.g. from
+        ``os.scandir``) to avoid another ``stat`` call.
+
+        Raises:
+            FileNotFoundError: The file does not exist
+            PIL.UnidentifiedImageError: The file is not a readable image
+        """
+        key = os.path.abspath(path)
+        st = stat_result if stat_result is not None else os.stat(key)
+
+        with self._lock:
+            meta = self._cache.get(key)
+            if meta is not None and meta.file_size == st.st_size and meta.mtime_ns == st.st_mtime_ns:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return meta
+            self.misses += 1
+
+        with Image.open(key) as img:
+            orientation = 1
+            # Only JPEG/WebP/TIFF expose EXIF from the header; other formats would need a decode
+            if "exif" in img.info or img.format == "TIFF":
+                try:
+                    orientation = int(img.getexif().get(EXIF_ORIENTATION, 1))
+                except Exception:
+                    orientation = 1
+            meta = ImageMeta(
+                path=key,
+                format=img.format,
+                width=img.width,
+                height=img.height,
+                mode=img.mode,
+                orientation=orientation,
+                file_size=st.st_size,
+                mtime_ns=st.st_mtime_ns
+            )
+
+        with self._lock:
+            self._cache[key] = meta
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return meta
+
+    def try_probe(self, path: str, stat_result: Optional[os.stat_result] = None) -> Optional[ImageMeta]:
+        """Like ``probe`` but returns None for missing or unreadable files."""
+        try:
+            return self.probe(path, stat_result)
+        except Exception:
+            return None
+
+    def probe_many(self, paths: Iterable[str], max_workers: int = 8,
+                   stats: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[ImageMeta]]:
+        """Probe many files concurrently; header reads are I/O bound.
+
+        ``stats`` maps paths to stat results (or ``FileStat``) the caller
+        already has; cached entries are then validated without any file access.
+        """
+        paths = list(paths)
+        stats = stats or {}
+        result: Dict[str, Optional[ImageMeta]] = {}
+        missing = []
+        with self._lock:
+            for path in paths:
+                st = stats.get(path)
+                meta = self._cache.get(os.path.abspath(path)) if st is not None else None
+                if meta is not None and meta.file_size == st.st_size and meta.mtime_ns == st.st_mtime_ns:
+                    self.hits += 1
+                    result[path] = meta
+                else:
+                    missing.append(path)
+        if len(missing) <= 1:
+            result.update((path, self.try_probe(path, stats.get(path))) for path in missing)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                result.update(zip(missing, executor.map(lambda path: self.try_probe(path, stats.get(path)), missing)))
+        return {path: result[path] for path in paths}
+
+    def cached(self, path: str) -> Optional[ImageMeta]:
+        """Cached metadata for ``path`` without touching the file (may be stale)."""
+        with self._lock:
+            return self._cache.get(os.path.abspath(path))
+
+    def prime(self, metas: Iterable[ImageMeta]):
+        """Seed the cache with metadata probed earlier (e.g. loaded from an index).
+
+        Entries are still checked against the file's size and mtime on use.
+        """
+        with self._lock:
+            for meta in metas:
+                if meta.path not in self._cache and len(self._cache) < self.max_entries:
+                    self._cache[meta.path] = meta
+
+    def clear(self):
+        """Forget all cached metadata."""
+        with self._lock:
+            self._cache.clear()
+
+# Global probe instance shared by the client, browser and utilities
+image_probe = ImageProbe()
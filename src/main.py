@@ -2,6 +2,7 @@
 
 import sys
 import os
+import logging
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -9,11 +10,11 @@ load_dotenv()
 
 from .ui import ui
 from .config import config
-from .text_to_image import text_to_image_generator
-from .image_editing import image_editor
-from .chat_image import chat_image_generator
-from .settings import settings_manager
+from .history_store import HistoryQuery
 from .i18n import i18n, Language
+from .write_behind import write_behind
+from .backends import backend_name
+from .metrics import metrics, start_export_from_config
 
 class NanoBananaApp:
     """Main application class for NanoBanana Pro."""
@@ -24,6 +25,8 @@ class NanoBananaApp:
     def run(self):
         """Run the main application."""
         try:
+            config.ensure_dirs()
+            
             # Load saved language preference (default to Chinese)
             saved_language = config.get("language", "zh")
             if saved_language == "en":
@@ -31,8 +34,8 @@ class NanoBananaApp:
             else:
                 i18n.set_language(Language.CHINESE)
             
-            # Check for API key
-            if not config.get_api_key():
+            # Check for API key (the local fake backend doesn't need one)
+            if backend_name() == "gemini" and not config.get_api_key():
                 ui.show_error(
                     "GEMINI_API_KEY environment variable is required",
                     "Please set your Gemini API key in the .env file"
@@ -67,18 +70,23 @@ class NanoBananaApp:
         """Handle main menu choice."""
         if choice == "1":
             # Text-to-Image Generation
+            # Mode modules (and the Gemini SDK behind them) load on first use
+            from .text_to_image import text_to_image_generator
             text_to_image_generator.run()
         
         elif choice == "2":
             # Image Editing & Enhancement
+            from .image_editing import image_editor
             image_editor.run()
         
         elif choice == "3":
             # Chat-Image (Conversational)
+            from .chat_image import chat_image_generator
             chat_image_generator.run()
         
         elif choice == "4":
             # Settings & Configuration
+            from .settings import settings_manager
             settings_manager.run()
         
         elif choice == "5":
@@ -101,43 +109,66 @@ class NanoBananaApp:
         """Show generation history."""
         ui.console.print("\n[bold cyan]📊 Generation History[/bold cyan]\n")
         
-        history = config.get_history()
+        total = config.history_count()
         
-        if not history:
+        if not total:
             ui.show_info("No generation history found.")
+            if metrics.has_data():
+                ui.show_session_metrics(metrics)
             ui.pause()
             return
         
-        # Show history with pagination
+        # Page through the history store; cursors[i] is where page i starts
         page_size = 10
-        total_pages = (len(history) + page_size - 1) // page_size
+        query = None
+        cursors = [None]
         current_page = 0
         
+        from rich.prompt import Prompt
         while True:
-            start_idx = current_page * page_size
-            end_idx = min(start_idx + page_size, len(history))
-            page_history = history[start_idx:end_idx]
+            page_history, next_cursor = config.query_history(query, cursors[current_page], page_size)
+            if next_cursor is not None and len(cursors) == current_page + 1:
+                cursors.append(next_cursor)
+            
+            if page_history:
+                ui.show_history(page_history)
+            else:
+                ui.show_info("No history entries match the filter.")
             
-            ui.show_history(page_history)
+            if query is None:
+                ui.console.print(f"[dim]Page {current_page + 1} of {(total + page_size - 1) // page_size}[/dim]")
+            else:
+                ui.console.print(f"[dim]Page {current_page + 1} · Filter: {query.describe()}[/dim]")
+            ui.console.print("[dim]Commands: \\[n]ext, \\[p]revious, search <terms>, mode:<mode>, since:<date|7d>, "
+                             "file:<name>, \\[c]lear filter, \\[s]ession stats, \\[q]uit[/dim]\n")
+            
+            command = Prompt.ask("Navigation", default="n" if next_cursor is not None else "q").strip()
+            nav = command.lower()
             
-            if total_pages > 1:
-                ui.console.print(f"[dim]Page {current_page + 1} of {total_pages}[/dim]")
-                ui.console.print("[dim]Commands: [n]ext, [p]revious, [q]uit[/dim]\n")
-                
-                from rich.prompt import Prompt
-                nav = Prompt.ask("Navigation", 
-                               choices=["n", "p", "q"], 
-                               default="q" if current_page == total_pages - 1 else "n")
-                
-                if nav == "n" and current_page < total_pages - 1:
+            if nav == "n":
+                if next_cursor is not None:
                     current_page += 1
-                elif nav == "p" and current_page > 0:
+            elif nav == "p":
+                if current_page > 0:
                     current_page -= 1
-                elif nav == "q":
-                    break
-            else:
+            elif nav == "s":
+                ui.show_session_metrics(metrics)
                 ui.pause()
+            elif nav == "q":
                 break
+            elif nav == "c" or command:
+                if nav == "c":
+                    query = None
+                else:
+                    try:
+                        query = HistoryQuery.parse(command)
+                    except ValueError as e:
+                        ui.show_error(str(e))
+                        continue
+                    if query.empty:
+                        query = None
+                cursors = [None]
+                current_page = 0
     
     def _show_help(self):
         """Show help and templates."""
@@ -357,11 +388,34 @@ class NanoBananaApp:
     
     def _cleanup(self):
         """Cleanup before exit."""
+        # Finish writing images and history entries still in the background queue
+        if write_behind.pending:
+            with ui.show_progress("💾 Saving...") as progress:
+                progress.add_task("Saving...", total=None)
+                errors = write_behind.flush()
+        else:
+            errors = write_behind.flush()
+        for error in errors:
+            ui.show_warning(error)
+        
         ui.console.print(f"\n[bold green]{i18n.t('goodbye')}[/bold green]")
         ui.console.print(f"[dim]{i18n.t('images_saved_info')}[/dim]\n")
 
 def main():
     """Main entry point."""
+    # NANOBANANA_DEBUG=1 shows upload and request details on stderr
+    if os.environ.get("NANOBANANA_DEBUG"):
+        logging.basicConfig(format="%(levelname)s %(name)s: %(message)s")
+        logging.getLogger(__package__).setLevel(logging.DEBUG)
+    
+    # Prometheus textfile / JSONL summaries when configured
+    start_export_from_config()
+    
+    # Headless subcommands bypass the interactive menus
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from .batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+    
     app = NanoBananaApp()
     app.run()
 
@@ -0,0 +1,269 @@
+"""In-process request metrics for NanoBanana Pro.
+
+``GeminiClient`` records one ``CallMetrics`` per request into the global
+``metrics`` registry: a set of labelled histograms and counters. The registry
+can be exported as a Prometheus textfile (for node_exporter's textfile
+collector), appended to a JSONL file as periodic summaries, and queried for
+p50/p95/p99 of the current session.
+"""
+
+import os
+import json
+import time
+import atexit
+import math
+import bisect
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 256 * 1024, 512 * 1024, 1024 ** 2, 2 * 1024 ** 2,
+                4 * 1024 ** 2, 8 * 1024 ** 2, 16 * 1024 ** 2)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+@dataclass
+class CallMetrics:
+    """Measurements of one client request."""
+    mode: str
+    model: str
+    resolution: str = "none"
+    outcome: str = "success"  # "success", "cache_hit" or an error category
+    queue_wait: float = 0.0  # rate limiter and concurrency slot waits
+    network_time: float = 0.0  # time inside the backend, summed over attempts
+    decode_time: float = 0.0  # extracting text and images from the response
+    total_time: float = 0.0
+    bytes_up: int = 0
+    bytes_down: int = 0
+    retries: int = 0
+
+class Histogram:
+    """Cumulative bucket counts plus a bounded window of raw samples for quantiles."""
+
+    def __init__(self, buckets: Iterable[float], window: int = 10000):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.samples.append(value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile of the recent samples (nearest rank), or None when empty."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+def _number(value: float) -> str:
+    """Format a sample value without losing precision to exponent notation."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class MetricsRegistry:
+    """Thread-safe registry of labelled histograms and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._help: Dict[str, str] = {}
+        self._started = time.time()
+        self._exporter: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, value: float, buckets: Iterable[float] = LATENCY_BUCKETS,
+                help_text: str = "", **labels):
+        """Add a sample to the histogram ``name`` with the given labels."""
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+                self._help.setdefault(name, help_text)
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels):
+        """Increase the counter ``name`` with the given labels."""
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._help.setdefault(name, help_text)
+
+    def record_call(self, call: CallMetrics):
+        """Record the measurements of one request."""
+        labels = {"mode": call.mode, "model": call.model}
+        self.inc("nanobanana_requests_total", help_text="Requests by mode, model, resolution and outcome",
+                 resolution=call.resolution, outcome=call.outcome, **labels)
+        if call.retries:
+            self.inc("nanobanana_retries_total", call.retries, help_text="Retried attempts", **labels)
+        self.inc("nanobanana_bytes_total", call.bytes_up, help_text="Payload bytes sent and received",
+                 direction="up", **labels)
+        self.inc("nanobanana_bytes_total", call.bytes_down, direction="down", **labels)
+
+        self.observe("nanobanana_request_seconds", call.total_time,
+                     help_text="End-to-end request time", outcome=call.outcome, **labels)
+        if call.outcome == "cache_hit":
+            return
+        for phase, seconds in (("queue", call.queue_wait), ("network", call.network_time),
+                               ("decode", call.decode_time)):
+            self.observe("nanobanana_request_phase_seconds", seconds,
+                         help_text="Request time by phase", phase=phase, **labels)
+        self.observe("nanobanana_request_bytes", call.bytes_up, SIZE_BUCKETS,
+                     help_text="Request and response payload sizes", direction="up", **labels)
+        self.observe("nanobanana_request_bytes", call.bytes_down, SIZE_BUCKETS, direction="down", **labels)
+
+    def quantiles(self, name: str, qs: Iterable[float] = (0.5, 0.95, 0.99),
+                  **label_filter) -> Dict[Labels, Dict[str, Any]]:
+        """Quantiles per label set of histogram ``name`` matching ``label_filter``."""
+        wanted = set(self._labels(label_filter))
+        result = {}
+        with self._lock:
+            for (hist_name, labels), histogram in self._histograms.items():
+                if hist_name != name or not wanted.issubset(labels):
+                    continue
+                stats: Dict[str, Any] = {f"p{int(q * 100)}": histogram.quantile(q) for q in qs}
+                stats["count"] = histogram.count
+                stats["sum"] = histogram.sum
+                result[labels] = stats
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-friendly snapshot of every counter and histogram."""
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), "count": h.count, "sum": round(h.sum, 6),
+                           "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99)}
+                          for (name, labels), h in sorted(self._histograms.items())]
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "uptime_seconds": round(time.time() - self._started, 3),
+            "counters": counters,
+            "histograms": histograms
+        }
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        def fmt(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+            return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self._counters})
+            for name in counter_names:
+                lines.append(f"# HELP {name} {self._help.get(name, '')}")
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{fmt(labels)} {_number(value)}")
+
+            histogram_names = sorted({name for name, _ in self._histograms})
+            for name in histogram_names:
+                lines.append(f"# HELP {name} {self._help.get(name, '')}")
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), h in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self._bounds(h.buckets), h.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{fmt(labels, (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{fmt(labels)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{fmt(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _bounds(buckets: Tuple[float, ...]) -> List[str]:
+        """Bucket upper bounds as Prometheus ``le`` label values."""
+        return [_number(bound) for bound in buckets] + ["+Inf"]
+
+    def write_textfile(self, path: str):
+        """Atomically write the Prometheus textfile (node_exporter reads it on scrape)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def append_summary(self, path: str):
+        """Append one summary line to a JSONL file."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.summary(), ensure_ascii=False) + "\n")
+
+    def export(self, textfile: Optional[str], summary_file: Optional[str]):
+        """Write the configured exports, logging instead of raising on failure."""
+        try:
+            if textfile:
+                self.write_textfile(textfile)
+            if summary_file:
+                self.append_summary(summary_file)
+        except OSError as e:
+            logger.warning("Metrics export failed: %s", e)
+
+    def start_exporter(self, interval: float, textfile: Optional[str], summary_file: Optional[str]):
+        """Export every ``interval`` seconds on a daemon thread and once more at exit."""
+        if self._exporter is not None or not (textfile or summary_file):
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.export(textfile, summary_file)
+
+        if interval > 0:
+            self._exporter = threading.Thread(target=loop, name="metrics-exporter", daemon=True)
+            self._exporter.start()
+        atexit.register(self.stop_exporter, textfile, summary_file)
+
+    def stop_exporter(self, textfile: Optional[str] = None, summary_file: Optional[str] = None):
+        """Stop the periodic export and write a final one."""
+        self._stop.set()
+        if self._exporter is not None:
+            self._exporter.join(timeout=5)
+            self._exporter = None
+        if self.has_data():
+            self.export(textfile, summary_file)
+
+    def has_data(self) -> bool:
+        """Check whether anything has been recorded."""
+        with self._lock:
+            return bool(self._counters or self._histograms)
+
+    def reset(self):
+        """Forget all recorded metrics."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._started = time.time()
+
+def start_export_from_config():
+    """Start exporting metrics as configured by ``metrics_textfile`` and ``metrics_summary_file``."""
+    metrics.start_exporter(
+        float(config.get("metrics_export_interval", 60)),
+        config.get("metrics_textfile"),
+        config.get("metrics_summary_file")
+    )
+
+# Global registry shared by every client in the process
+metrics = MetricsRegistry()
@@ -0,0 +1,138 @@
+"""Output codec for saved images.
+
+By default generated images are written exactly as the API returned them.
+An output codec can be configured to re-encode them instead (optimized PNG,
+lossless WebP, or lossy WebP/JPEG). Encoding is CPU bound, so it runs in a
+process pool rather than on the write-behind threads.
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+# codec name -> (Pillow format, file extension)
+CODECS = {
+    "original": (None, None),
+    "png": ("PNG", ".png"),
+    "png-optimized": ("PNG", ".png"),
+    "webp-lossless": ("WEBP", ".webp"),
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg")
+}
+
+# Leading bytes of the formats the API returns
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "PNG", ".png"),
+    (b"\xff\xd8\xff", "JPEG", ".jpg")
+)
+
+def sniff_format(data: bytes):
+    """Return ``(format, extension)`` of encoded image bytes, or ``(None, None)``."""
+    for signature, image_format, extension in SIGNATURES:
+        if data.startswith(signature):
+            return image_format, extension
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "WEBP", ".webp"
+    return None, None
+
+def encode_image(data: bytes, codec: str, quality: int) -> bytes:
+    """Decode image bytes and encode them with ``codec`` (runs in a worker process)."""
+    image_format = CODECS[codec][0]
+    img = Image.open(BytesIO(data))
+
+    if image_format == "JPEG":
+        if img.mode in ("RGBA", "LA", "P"):
+            # Flatten transparency onto white like convert_2_jpg does
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        save_args = {"quality": quality, "optimize": True}
+    elif codec == "png-optimized":
+        save_args = {"optimize": True}
+    elif codec == "webp-lossless":
+        save_args = {"lossless": True, "quality": 100, "method": 4}
+    elif codec == "webp":
+        save_args = {"quality": quality, "method": 4}
+    else:
+        save_args = {}
+
+    buffer = BytesIO()
+    img.save(buffer, image_format, **save_args)
+    return buffer.getvalue()
+
+@dataclass
+class OutputCodec:
+    """How generated images are written to disk."""
+    codec: str = "original"
+    quality: int = 90
+
+    @classmethod
+    def from_config(cls) -> 'OutputCodec':
+        """Create a codec from the user configuration."""
+        codec = str(config.get("output_codec", "original")).lower()
+        if codec == "jpg":
+            codec = "jpeg"
+        if codec not in CODECS:
+            codec = "original"
+        return cls(codec=codec, quality=int(config.get("output_quality", 90)))
+
+    def passthrough(self, data: bytes) -> bool:
+        """Check whether ``data`` can be written as-is."""
+        image_format, _ = sniff_format(data)
+        if self.codec == "original":
+            return image_format is not None
+        # Plain PNG output of PNG bytes needs no transformation either
+        return self.codec == "png" and image_format == "PNG"
+
+    def extension(self, data: bytes) -> str:
+        """File extension for ``data`` written with this codec."""
+        if self.passthrough(data):
+            return sniff_format(data)[1]
+        return CODECS[self.codec][1] or ".png"
+
+    def encode(self, data: bytes) -> bytes:
+        """Return the bytes to write for one image."""
+        if self.passthrough(data):
+            return data
+        # Unknown bytes with the original codec are normalized to PNG
+        codec = "png" if self.codec == "original" else self.codec
+
+        pool = _get_pool()
+        if pool is not None:
+            try:
+                return pool.submit(encode_image, data, codec, self.quality).result()
+            except RuntimeError as e:
+                # The pool shuts itself down at interpreter exit, possibly before
+                # write-behind has flushed the images queued for encoding (or it broke)
+                logger.debug("Encoder process pool unusable, encoding in-thread: %s", e)
+        return encode_image(data, codec, self.quality)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """Lazily create the shared encoder process pool (None if unavailable)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(config.get("output_encode_workers", 0)) or min(4, os.cpu_count() or 1)
+            try:
+                _pool = ProcessPoolExecutor(max_workers=workers)
+            except (OSError, NotImplementedError) as e:
+                # e.g. no working multiprocessing on this platform; encode in-thread
+                logger.debug("Encoder process pool unavailable: %s", e)
+                return None
+        return _pool
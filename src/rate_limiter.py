@@ -0,0 +1,93 @@
+"""Client-side token-bucket rate limiting for Gemini requests."""
+
+import os
+import time
+import struct
+import asyncio
+import threading
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    # File locking is unavailable on Windows; limiting stays per process
+    fcntl = None
+
+class TokenBucket:
+    """Token bucket that paces requests to ``rate_per_minute`` with bursts of ``burst``.
+
+    Callers reserve a token and wait until it becomes available, so concurrent
+    callers are queued into evenly spaced slots instead of all firing at once.
+    When ``state_file`` is given, the bucket state lives in that file and is
+    updated under an exclusive ``flock``, sharing one budget between every
+    process on the host that uses the same file.
+    """
+
+    _STATE = struct.Struct("dd")  # tokens, last refill timestamp
+
+    def __init__(self, rate_per_minute: float, burst: int = 1, state_file: Optional[str] = None):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, int(burst))
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._last = time.time()
+        self._fd = None
+        self.wait_seconds = 0.0
+        self.requests = 0
+
+        if state_file and fcntl is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(state_file)), exist_ok=True)
+            self._fd = os.open(state_file, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _take(self, tokens: float, last: float, now: float):
+        """Refill and take one token; return new state and the wait time."""
+        if last > now:
+            last = now
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate) - 1.0
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens, now, wait
+
+    def reserve(self) -> float:
+        """Reserve the next token and return how long to wait before using it."""
+        with self._lock:
+            now = time.time()
+            if self._fd is None:
+                self._tokens, self._last, wait = self._take(self._tokens, self._last, now)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+                try:
+                    data = os.pread(self._fd, self._STATE.size, 0)
+                    if len(data) == self._STATE.size:
+                        tokens, last = self._STATE.unpack(data)
+                    else:
+                        tokens, last = float(self.burst), now
+                    tokens, last, wait = self._take(tokens, last, now)
+                    os.pwrite(self._fd, self._STATE.pack(tokens, last), 0)
+                finally:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+            self.requests += 1
+            self.wait_seconds += wait
+            return wait
+
+    def acquire(self) -> float:
+        """Block until a token is available; return the time spent waiting."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Wait for a token without blocking the event loop."""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def close(self):
+        """Release the shared state file."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
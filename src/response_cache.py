@@ -0,0 +1,159 @@
+"""Content-addressed on-disk cache for Gemini image responses."""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple, Dict, Any
+
+class ResponseCache:
+    """Size-bounded LRU cache of model responses stored under a directory.
+
+    Each entry is a single file named after its key: a JSON header line with
+    the response text and image sizes, followed by the raw ``inline_data``
+    bytes of every image. Entry mtimes record recency, so LRU order survives
+    restarts and is shared by processes using the same directory.
+    """
+
+    SUFFIX = ".bin"
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Optional[OrderedDict] = None  # key -> size, oldest first
+        self._total_bytes = 0
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """Return the SHA-256 hex digest of a file's contents."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, image_hashes: List[str] = None) -> str:
+        """Build a cache key from the model, final prompt and input image hashes."""
+        payload = json.dumps([model, prompt, list(image_hashes or [])], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.SUFFIX}"
+
+    def _load_index(self):
+        """Build the in-memory LRU index from the cache directory (lock held)."""
+        if self._entries is not None:
+            return
+
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        found = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, entry.name[:-len(self.SUFFIX)], stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def get(self, key: str) -> Optional[Tuple[Optional[str], List[bytes]]]:
+        """Return ``(text, images)`` for a cached response, or ``None`` on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                images = [f.read(size) for size in header["sizes"]]
+            if any(len(data) != size for data, size in zip(images, header["sizes"])):
+                raise ValueError("truncated cache entry")
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._load_index()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return header.get("text"), images
+
+    def put(self, key: str, text: Optional[str], images: List[bytes]):
+        """Store a response, evicting least recently used entries over the size limit."""
+        header = json.dumps({"text": text, "sizes": [len(data) for data in images]}, ensure_ascii=False)
+        path = self._path(key)
+
+        with self._lock:
+            self._load_index()
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(header.encode('utf-8') + b"\n")
+                    for data in images:
+                        f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Error writing response cache entry: {e}")
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+                return
+
+            size = path.stat().st_size
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        """Drop the oldest entries until the cache fits its budget (lock held)."""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._load_index()
+            for key in list(self._entries):
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current cache size."""
+        with self._lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,209 @@
+"""Error classification and retry with backoff for Gemini API calls."""
+
+import time
+import random
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    from google.api_core import exceptions as api_exceptions
+except ImportError:
+    api_exceptions = None
+
+from .config import config
+
+# Error categories
+RATE_LIMIT = "rate_limit"
+NETWORK = "network"
+SERVER = "server"
+AUTH = "auth"
+SAFETY = "safety"
+FILE = "file"
+UNKNOWN = "unknown"
+
+# Only transient failures are worth another attempt
+RETRYABLE_CATEGORIES = {RATE_LIMIT, NETWORK, SERVER}
+
+def _api_exception_categories() -> Dict[type, str]:
+    """Map google.api_core exception types to categories."""
+    if api_exceptions is None:
+        return {}
+    return {
+        api_exceptions.TooManyRequests: RATE_LIMIT,
+        api_exceptions.ResourceExhausted: RATE_LIMIT,
+        api_exceptions.ServiceUnavailable: SERVER,
+        api_exceptions.InternalServerError: SERVER,
+        api_exceptions.BadGateway: SERVER,
+        api_exceptions.GatewayTimeout: SERVER,
+        api_exceptions.DeadlineExceeded: SERVER,
+        api_exceptions.Unauthenticated: AUTH,
+        api_exceptions.PermissionDenied: AUTH,
+    }
+
+_API_CATEGORIES = _api_exception_categories()
+
+def classify_error(e: Exception) -> str:
+    """Classify an exception raised while calling the API."""
+    if isinstance(e, (FileNotFoundError, PermissionError, IsADirectoryError)):
+        return FILE
+    if isinstance(e, (ConnectionError, TimeoutError)):
+        return NETWORK
+
+    for exc_type, category in _API_CATEGORIES.items():
+        if isinstance(e, exc_type):
+            return category
+
+    type_name = type(e).__name__.lower()
+    if "blocked" in type_name or "stopcandidate" in type_name:
+        return SAFETY
+
+    # Fall back to matching the message text
+    error_msg = str(e).lower()
+    if "quota" in error_msg or "limit" in error_msg or "429" in error_msg:
+        return RATE_LIMIT
+    elif "network" in error_msg or "connection" in error_msg or "timed out" in error_msg:
+        return NETWORK
+    elif "authentication" in error_msg or "unauthorized" in error_msg or "api key" in error_msg:
+        return AUTH
+    elif "safety" in error_msg or "blocked" in error_msg:
+        return SAFETY
+    elif "503" in error_msg or "500" in error_msg or "unavailable" in error_msg or "internal error" in error_msg:
+        return SERVER
+    return UNKNOWN
+
+def is_retryable(e: Exception) -> bool:
+    """Check whether an exception is worth retrying."""
+    return classify_error(e) in RETRYABLE_CATEGORIES
+
+def describe_error(e: Exception, fallback: str) -> str:
+    """Build a user-facing message for an exception based on its category."""
+    category = classify_error(e)
+    if category == FILE:
+        if isinstance(e, PermissionError):
+            return f"Permission denied accessing image file: {str(e)}"
+        return f"Image file not found: {str(e)}"
+    elif category == RATE_LIMIT:
+        return f"API quota exceeded or rate limit hit: {str(e)}"
+    elif category == NETWORK:
+        return f"Network connection error: {str(e)}"
+    elif category == SERVER:
+        return f"Gemini service unavailable: {str(e)}"
+    elif category == AUTH:
+        return f"API authentication failed: {str(e)}"
+    elif category == SAFETY:
+        return f"Content blocked by safety filters: {str(e)}"
+    return f"{fallback}: {str(e)}"
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by attempts and total time."""
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    deadline: float = 120.0
+
+    @classmethod
+    def from_config(cls) -> 'RetryPolicy':
+        """Create a policy from the user configuration."""
+        return cls(
+            max_attempts=max(1, int(config.get("retry_max_attempts", 4))),
+            base_delay=float(config.get("retry_base_delay", 1.0)),
+            max_delay=float(config.get("retry_max_delay", 30.0)),
+            deadline=float(config.get("retry_deadline", 120.0))
+        )
+
+    def backoff(self, retry_number: int) -> float:
+        """Delay before the given retry (0-based), using full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry_number)))
+
+@dataclass
+class RetryStats:
+    """Retry accounting for one call."""
+    attempts: int = 0
+    retries: int = 0
+    backoff_seconds: float = 0.0
+    last_category: Optional[str] = None
+
+class RetryTotals:
+    """Thread-safe running totals of retries across calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.retries_by_category: Dict[str, int] = {}
+
+    def record(self, stats: RetryStats, categories: Dict[str, int]):
+        with self._lock:
+            self.calls += 1
+            self.retries += stats.retries
+            self.backoff_seconds += stats.backoff_seconds
+            for category, count in categories.items():
+                self.retries_by_category[category] = self.retries_by_category.get(category, 0) + count
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "retries_by_category": dict(self.retries_by_category)
+            }
+
+def _next_delay(e: Exception, policy: RetryPolicy, stats: RetryStats,
+                started: float, categories: Dict[str, int]) -> Optional[float]:
+    """Decide whether to retry after a failure; return the delay or None to give up."""
+    category = classify_error(e)
+    stats.last_category = category
+    if category not in RETRYABLE_CATEGORIES or stats.attempts >= policy.max_attempts:
+        return None
+
+    delay = policy.backoff(stats.retries)
+    if time.monotonic() - started + delay > policy.deadline:
+        return None
+
+    stats.retries += 1
+    stats.backoff_seconds += delay
+    categories[category] = categories.get(category, 0) + 1
+    return delay
+
+def call_with_retry(func: Callable[[], Any], policy: RetryPolicy, stats: RetryStats,
+                    totals: Optional[RetryTotals] = None) -> Any:
+    """Call ``func`` and retry retryable failures according to ``policy``."""
+    started = time.monotonic()
+    categories: Dict[str, int] = {}
+    try:
+        while True:
+            stats.attempts += 1
+            try:
+                return func()
+            except Exception as e:
+                delay = _next_delay(e, policy, stats, started, categories)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+    finally:
+        if totals is not None:
+            totals.record(stats, categories)
+
+async def call_with_retry_async(func: Callable[[], Awaitable[Any]], policy: RetryPolicy,
+                                stats: RetryStats, totals: Optional[RetryTotals] = None) -> Any:
+    """Await ``func()`` and retry retryable failures according to ``policy``."""
+    started = time.monotonic()
+    categories: Dict[str, int] = {}
+    try:
+        while True:
+            stats.attempts += 1
+            try:
+                return await func()
+            except Exception as e:
+                delay = _next_delay(e, policy, stats, started, categories)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+    finally:
+        if totals is not None:
+            totals.record(stats, categories)
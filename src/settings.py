@@ -172,19 +172,19 @@ class SettingsManager:
     
     def _change_max_history(self):
         """Change maximum history items setting."""
-        current = config.get("max_history_items", 100)
+        current = config.get("max_history_items", 10000)
         ui.console.print(f"\nCurrent maximum history items: [green]{current}[/green]")
         
         from rich.prompt import IntPrompt
-        new_value = IntPrompt.ask("Enter new maximum (1-1000)", 
+        new_value = IntPrompt.ask("Enter new maximum (1-1000000)", 
                                  default=current, 
                                  show_default=True)
         
-        if 1 <= new_value <= 1000:
+        if 1 <= new_value <= 1000000:
             config.set("max_history_items", new_value)
             ui.show_success(f"Maximum history items changed to: {new_value}")
         else:
-            ui.show_error("Value must be between 1 and 1000")
+            ui.show_error("Value must be between 1 and 1000000")
         
         ui.pause()
     
@@ -10,7 +10,7 @@ class TextToImageGenerator:
     """Handles text-to-image generation with different themes."""
     
     def __init__(self):
-        self.client = get_client()
+        self._client = None
         self.theme_map = {
             "1": "photorealistic",
             "2": "stylized", 
@@ -20,6 +20,13 @@ class TextToImageGenerator:
             "6": "sequential_art"
         }
     
+    @property
+    def client(self):
+        """Gemini client, created on first use."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+    
     def run(self):
         """Run text-to-image generation flow."""
         while True:
@@ -102,24 +109,22 @@ class TextToImageGenerator:
             
             success, message, images = self.client.generate_text_to_image(prompt, resolution)
         
+        ui.show_retry_stats(self.client.last_call_stats)
+        
         if success and images:
-            # Save images
-            saved_files = self.client.save_images(images, f"text2img_{theme_key}")
+            ui.show_success(message)
             
-            ui.show_success(message, saved_files)
-            
-            # Add to history
-            config.add_to_history({
+            # Save images; only files actually written are added to history
+            saved_files = ui.save_generated_images(self.client, images, f"text2img_{theme_key}", {
                 "mode": "text-to-image",
                 "theme_or_feature": template.name if use_template else "custom",
                 "prompt": prompt,
-                "resolution": resolution,
-                "generated_files": saved_files
+                "resolution": resolution
             })
             
             # Ask if user wants to open images
-            if config.get("auto_open_images") or \
-               ui.console.input("Open generated images? [Y/n]: ").lower() in ['', 'y', 'yes']:
+            if saved_files and (config.get("auto_open_images") or
+                                ui.console.input("Open generated images? [Y/n]: ").lower() in ['', 'y', 'yes']):
                 self._open_images(saved_files)
         else:
             ui.show_error("Generation failed", message)
@@ -133,6 +138,9 @@ class TextToImageGenerator:
         
         system = platform.system()
         
+        # Images are written in the background; wait until they are on disk
+        ui.wait_for_saves()
+        
         for path in image_paths:
             try:
                 if system == "Darwin":  # macOS
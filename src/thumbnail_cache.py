@@ -0,0 +1,257 @@
+"""Persistent thumbnail cache and half-block terminal previews.
+
+Thumbnails are keyed by file content (a fingerprint of the size and the
+first, middle and last 64KB), so copies and renamed files share one thumbnail, and
+stored as small JPEGs under ``.nanobanana/thumbs/``. Missing thumbnails are
+built in a process pool; JPEGs are decoded with Pillow's draft mode, which
+lets libjpeg scale down by up to 8x while decoding instead of decoding the
+full-size photo first.
+
+Previews are drawn with the upper half block character: each terminal cell
+shows two pixels, the top one as foreground and the bottom one as
+background colour.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image, ImageOps
+from rich.color import Color
+from rich.style import Style
+from rich.text import Text
+
+from .config import config
+from .write_behind import write_behind
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = 128  # longest edge in pixels
+FINGERPRINT_BYTES = 64 * 1024
+MAX_KEYS = 65536  # memoized fingerprints (by path, size and mtime)
+PRUNE_EVERY = 1000  # new thumbnails between size checks of the cache directory
+
+def make_thumbnail(source: str, dest: str, size: int = THUMBNAIL_SIZE) -> bool:
+    """Write a JPEG thumbnail of ``source`` to ``dest`` (runs in a worker process)."""
+    tmp_path = f"{dest}.{os.getpid()}.tmp"
+    try:
+        with Image.open(source) as img:
+            # Only affects JPEG: decode at the smallest 1/2..1/8 scale still >= size
+            img.draft("RGB", (size, size))
+            img = ImageOps.exif_transpose(img)
+            if img.mode in ("RGBA", "LA", "P"):
+                # Flatten transparency onto white like convert_2_jpg does
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+            img.thumbnail((size, size), Image.Resampling.BILINEAR)
+            img.save(tmp_path, "JPEG", quality=85)
+        os.replace(tmp_path, dest)
+        return True
+    except Exception as e:
+        logger.debug("Could not create thumbnail for %s: %s", source, e)
+        # prune() only sees finished *.jpg files, so don't leave a partial one behind
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+
+@lru_cache(maxsize=65536)
+def _cell_style(top: Tuple[int, int, int], bottom: Tuple[int, int, int]) -> Style:
+    return Style(color=Color.from_rgb(*top), bgcolor=Color.from_rgb(*bottom))
+
+def render_half_blocks(img: Image.Image, width: int, height: int) -> Text:
+    """Render an image into at most ``width`` x ``height`` terminal cells."""
+    img = img.convert("RGB")
+    img.thumbnail((width, height * 2), Image.Resampling.BILINEAR)
+    w, h = img.size
+    data = iter(img.tobytes())
+    pixels = list(zip(data, data, data))
+    if h % 2:
+        pixels.extend(pixels[-w:])  # repeat the last row under an odd height
+        h += 1
+
+    text = Text(no_wrap=True, overflow="crop")
+    for y in range(0, h, 2):
+        if y:
+            text.append("\n")
+        top_row = pixels[y * w:(y + 1) * w]
+        bottom_row = pixels[(y + 1) * w:(y + 2) * w]
+        # Merge runs of identical cells into one span
+        run_style, run_length = None, 0
+        for top, bottom in zip(top_row, bottom_row):
+            style = _cell_style(top, bottom)
+            if style is run_style:
+                run_length += 1
+                continue
+            if run_length:
+                text.append("▀" * run_length, run_style)
+            run_style, run_length = style, 1
+        if run_length:
+            text.append("▀" * run_length, run_style)
+    return text
+
+class ThumbnailCache:
+    """Content-keyed thumbnails on disk, plus an LRU of rendered previews."""
+
+    def __init__(self, cache_dir: Path, size: int = THUMBNAIL_SIZE, max_previews: int = 512):
+        self.cache_dir = Path(cache_dir)
+        self.size = size
+        self.max_previews = max_previews
+        self._keys: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._previews: "OrderedDict[Tuple[str, int, int], Text]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._written = 0
+
+    def key(self, path: str) -> Optional[str]:
+        """Content fingerprint of ``path``, or None if it can't be read."""
+        try:
+            path = os.path.abspath(path)
+            st = os.stat(path)
+            memo = (path, st.st_size, st.st_mtime_ns)
+            with self._lock:
+                key = self._keys.get(memo)
+                if key is not None:
+                    self._keys.move_to_end(memo)
+                    return key
+            digest = hashlib.sha1(str(st.st_size).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read(FINGERPRINT_BYTES))
+                if st.st_size > 2 * FINGERPRINT_BYTES:
+                    # Uncompressed formats (BMP, TIFF) can differ only in the middle
+                    f.seek(st.st_size // 2 - FINGERPRINT_BYTES // 2)
+                    digest.update(f.read(FINGERPRINT_BYTES))
+                    f.seek(-FINGERPRINT_BYTES, os.SEEK_END)
+                    digest.update(f.read(FINGERPRINT_BYTES))
+        except OSError:
+            return None
+        key = digest.hexdigest()
+        # Called from several threads (e.g. image_hash.compute_hashes)
+        with self._lock:
+            self._keys[memo] = key
+            while len(self._keys) > MAX_KEYS:
+                self._keys.popitem(last=False)
+        return key
+
+    def thumbnail_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}-{self.size}.jpg"
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Lazily create the thumbnail process pool (None if unavailable)."""
+        with self._lock:
+            if self._pool is None:
+                workers = int(config.get("thumbnail_workers", 0)) or min(4, os.cpu_count() or 1)
+                try:
+                    self._pool = ProcessPoolExecutor(max_workers=workers)
+                except (OSError, NotImplementedError) as e:
+                    logger.debug("Thumbnail process pool unavailable: %s", e)
+                    return None
+            return self._pool
+
+    def ensure(self, paths: Iterable[str], block: bool = True) -> Dict[str, Optional[Path]]:
+        """Thumbnail paths for ``paths``, building missing ones in the process pool.
+
+        With ``block=False`` missing thumbnails are only queued (e.g. to
+        prefetch the next page) and reported as None.
+        """
+        result: Dict[str, Optional[Path]] = {}
+        missing: Dict[Path, str] = {}
+        for path in paths:
+            key = self.key(path)
+            if key is None:
+                result[path] = None
+                continue
+            thumb = self.thumbnail_path(key)
+            result[path] = thumb
+            if not thumb.exists():
+                missing.setdefault(thumb, path)
+        if not missing:
+            return result
+
+        for thumb in missing:
+            thumb.parent.mkdir(parents=True, exist_ok=True)
+        pool = self._get_pool()
+        if pool is None:
+            built = {thumb: block and make_thumbnail(source, str(thumb), self.size)
+                     for thumb, source in missing.items()}
+        else:
+            futures = {thumb: pool.submit(make_thumbnail, source, str(thumb), self.size)
+                       for thumb, source in missing.items()}
+            if block:
+                wait(futures.values())
+            built = {thumb: block and future.result() for thumb, future in futures.items()}
+
+        self._written += len(missing)
+        if self._written >= PRUNE_EVERY:
+            self._written = 0
+            write_behind.submit(self.prune, description="thumbnail prune")
+        failed = {thumb for thumb, ok in built.items() if not ok}
+        return {path: None if thumb in failed else thumb for path, thumb in result.items()}
+
+    def preview(self, path: str, width: int, height: int) -> Optional[Text]:
+        """Half-block preview of ``path`` from its cached thumbnail, or None if there is none yet."""
+        key = self.key(path)
+        if key is None:
+            return None
+        cache_key = (key, width, height)
+        with self._lock:
+            text = self._previews.get(cache_key)
+            if text is not None:
+                self._previews.move_to_end(cache_key)
+                return text
+        try:
+            with Image.open(self.thumbnail_path(key)) as img:
+                text = render_half_blocks(img, width, height)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._previews[cache_key] = text
+            while len(self._previews) > self.max_previews:
+                self._previews.popitem(last=False)
+        return text
+
+    def prune(self, max_bytes: Optional[int] = None):
+        """Delete the least recently written thumbnails beyond ``max_bytes`` (default ``thumbnail_cache_mb``)."""
+        if max_bytes is None:
+            max_bytes = int(config.get("thumbnail_cache_mb", 256)) * 1024 * 1024
+        entries = []
+        for thumb in self.cache_dir.glob("*/*.jpg"):
+            try:
+                st = thumb.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, thumb))
+        total = sum(size for _, size, _ in entries)
+        for _, size, thumb in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                thumb.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """Delete all stored thumbnails and rendered previews."""
+        with self._lock:
+            self._previews.clear()
+            self._keys.clear()
+        for thumb in self.cache_dir.glob("*/*.jpg"):
+            try:
+                thumb.unlink()
+            except OSError:
+                pass
+
+# Global cache shared by browser instances
+thumbnail_cache = ThumbnailCache(Path(config.CONFIG_DIR) / "thumbs")
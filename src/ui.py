@@ -1,7 +1,6 @@
 """User interface components for NanoBanana Pro using Rich."""
 
 import os
-import glob
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 from rich.console import Console
@@ -11,15 +10,11 @@ from rich.prompt import Prompt, Confirm, IntPrompt
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.text import Text
 from rich.columns import Columns
-from rich.syntax import Syntax
-from rich.markdown import Markdown
-from rich.live import Live
-from rich.layout import Layout
 
 from .config import config
 from .templates import template_manager, PromptTemplate
-from .enhanced_image_browser import create_enhanced_browser
 from .i18n import i18n, Language
+from .write_behind import write_behind
 
 class NanoBananaUI:
     """Rich-based UI for NanoBanana Pro."""
@@ -27,6 +22,8 @@ class NanoBananaUI:
     def __init__(self):
         self.console = Console()
         self.history_shown = False
+        self._image_count = None  # background count of the last image scan
+        self._image_sizes: Dict[str, int] = {}  # file sizes known from scans
     
     def show_welcome(self):
         """Show welcome screen."""
@@ -425,45 +422,42 @@ class NanoBananaUI:
         choice = Prompt.ask("Select resolution", choices=choices, default=str(default_idx))
         return resolutions[int(choice) - 1]
     
-    def _scan_for_images(self, directory: str = ".", recursive: bool = True) -> List[str]:
-        """Scan directory for image files."""
-        image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.heic', '.webp'}
-        images = []
+    def _scan_for_images(self, directory: str = ".", recursive: bool = True, limit: int = 50,
+                         keep_counting: bool = True) -> List[str]:
+        """Scan directory for image files.
+
+        Walks the tree once, nearest directories first, and stops after
+        ``limit`` images. With ``keep_counting`` the rest of the tree is
+        counted in the background for the selection menu.
+        """
+        from itertools import islice
+        from .image_scanner import DEFAULT_IGNORE, BackgroundCounter, ImageScanner
         
+        self._image_count = None
+        scanner = ImageScanner(max_depth=None if recursive else 0,
+                               ignore=config.get("browser_ignore", DEFAULT_IGNORE), max_workers=1)
         try:
-            if recursive:
-                # Search current directory and subdirectories
-                for ext in image_extensions:
-                    pattern = os.path.join(directory, "**", f"*{ext}")
-                    images.extend(glob.glob(pattern, recursive=True))
-                    pattern = os.path.join(directory, "**", f"*{ext.upper()}")
-                    images.extend(glob.glob(pattern, recursive=True))
-            else:
-                # Search only current directory
-                for ext in image_extensions:
-                    pattern = os.path.join(directory, f"*{ext}")
-                    images.extend(glob.glob(pattern))
-                    pattern = os.path.join(directory, f"*{ext.upper()}")
-                    images.extend(glob.glob(pattern))
-            
-            # Remove duplicates and sort
-            images = sorted(list(set(images)))
+            files = scanner.iter_files(directory)
+            images = list(islice(files, limit))
+            if keep_counting and len(images) == limit:
+                self._image_count = BackgroundCounter(files, start=limit)
             
             # Convert to relative paths for better display
             current_dir = os.getcwd()
             relative_images = []
-            for img in images:
+            for img, scanned in images:
                 try:
                     rel_path = os.path.relpath(img, current_dir)
                     if len(rel_path) < len(img):
-                        relative_images.append(rel_path)
-                    else:
-                        relative_images.append(img)
+                        img = rel_path
                 except ValueError:
                     # Can't make relative path, use absolute
-                    relative_images.append(img)
+                    pass
+                relative_images.append(img)
+                # Sizes from the scan, so the menus don't stat every row
+                self._image_sizes[img] = scanned.size
             
-            return relative_images[:50]  # Limit to 50 images for performance
+            return relative_images
             
         except Exception as e:
             self.console.print(f"[red]Error scanning for images: {e}[/red]")
@@ -476,7 +470,14 @@ class NanoBananaUI:
             return None
         
         self.console.print(f"\n[bold cyan]📸 {title}[/bold cyan]")
-        self.console.print(f"[dim]Found {len(images)} image(s) in current directory and subdirectories[/dim]\n")
+        counter = self._image_count
+        if counter is None:
+            self.console.print(f"[dim]Found {len(images)} image(s) in current directory and subdirectories[/dim]\n")
+        elif counter.wait(0.2):
+            self.console.print(f"[dim]Showing the nearest {len(images)} of {counter.count} image(s)[/dim]\n")
+        else:
+            self.console.print(f"[dim]Showing the nearest {len(images)} image(s); "
+                               f"{counter.count}+ found so far, still counting[/dim]\n")
         
         # Show images in a table format
         table = Table(show_header=True, header_style="bold cyan")
@@ -487,12 +488,7 @@ class NanoBananaUI:
         # Add images to table (show first 20, then paginate if needed)
         display_images = images[:20]
         for i, img_path in enumerate(display_images, 1):
-            try:
-                # Get file size
-                size = os.path.getsize(img_path)
-                size_str = self._format_file_size(size)
-            except:
-                size_str = "Unknown"
+            size_str = self._image_size_text(img_path)
             
             # Truncate long paths for display
             display_path = img_path
@@ -564,11 +560,7 @@ class NanoBananaUI:
             table.add_column("Size", style="dim", width=10)
             
             for i, img_path in enumerate(page_images, start_idx + 1):
-                try:
-                    size = os.path.getsize(img_path)
-                    size_str = self._format_file_size(size)
-                except:
-                    size_str = "Unknown"
+                size_str = self._image_size_text(img_path)
                 
                 display_path = img_path
                 if len(display_path) > 60:
@@ -647,11 +639,26 @@ class NanoBananaUI:
         
         images = self._scan_for_images(directory)
         if images:
-            return self._show_image_selection_menu(images, f"Select from {directory}")
+            try:
+                return self._show_image_selection_menu(images, f"Select from {directory}")
+            finally:
+                if self._image_count is not None:
+                    self._image_count.cancel()
         else:
             self.console.print(f"[yellow]No images found in {directory}[/yellow]")
             return None
     
+    def _image_size_text(self, img_path: str) -> str:
+        """Formatted size of an image, from the scan when known."""
+        size = self._image_sizes.get(img_path)
+        if size is None:
+            try:
+                size = os.path.getsize(img_path)
+            except OSError:
+                return "Unknown"
+            self._image_sizes[img_path] = size
+        return self._format_file_size(size)
+    
     def _format_file_size(self, size_bytes: int) -> str:
         """Format file size in human readable format."""
         if size_bytes < 1024:
@@ -676,6 +683,7 @@ class NanoBananaUI:
         if method == "1":
             # 使用增强版浏览器
             try:
+                from .enhanced_image_browser import create_enhanced_browser
                 browser = create_enhanced_browser(self.console)
                 selected_paths = browser.browse_and_select_images(max_images=max_images)
                 
@@ -774,6 +782,39 @@ class NanoBananaUI:
         
         self.console.print()
     
+    def show_retry_stats(self, stats) -> None:
+        """Mention retries of the last request, if there were any."""
+        if stats and stats.retries:
+            self.show_info(f"Retried {stats.retries} time(s), {stats.backoff_seconds:.1f}s spent backing off")
+    
+    def wait_for_saves(self):
+        """Wait until images and history entries queued in the background are written; show failures."""
+        for error in write_behind.flush():
+            self.show_warning(error)
+    
+    def save_generated_images(self, client, images: List[bytes], prefix: str,
+                              history_entry: Dict[str, Any]) -> List[str]:
+        """Save images and show, then record in history, the files actually written.
+        
+        Returns the written files; images that failed to save are reported as warnings.
+        """
+        saved: List[str] = []
+        failed: List[str] = []
+        
+        def on_saved(files: List[str], errors: List[str]):
+            saved.extend(files)
+            failed.extend(errors)
+            if files:
+                config.add_to_history({**history_entry, "generated_files": files})
+        
+        client.save_images(images, prefix, on_complete=on_saved)
+        self.wait_for_saves()
+        for error in failed:
+            self.show_warning(error)
+        if saved:
+            self.show_success(f"Saved {len(saved)} image(s)", saved)
+        return saved
+    
     def show_error(self, message: str, details: str = None):
         """Show error message."""
         error_text = Text()
@@ -835,6 +876,38 @@ class NanoBananaUI:
         self.console.print(table)
         self.console.print()
     
+    def show_session_metrics(self, registry):
+        """Show latency percentiles of the requests made in this session."""
+        def fmt(seconds: Optional[float]) -> str:
+            if seconds is None:
+                return "-"
+            return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.2f}s"
+        
+        table = Table(title="Session Metrics")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Labels", style="green")
+        table.add_column("Count", justify="right")
+        table.add_column("p50", justify="right")
+        table.add_column("p95", justify="right")
+        table.add_column("p99", justify="right", style="yellow")
+        
+        rows = [("Request", "nanobanana_request_seconds", {}),
+                ("Queue wait", "nanobanana_request_phase_seconds", {"phase": "queue"}),
+                ("Network", "nanobanana_request_phase_seconds", {"phase": "network"}),
+                ("Decode", "nanobanana_request_phase_seconds", {"phase": "decode"}),
+                ("Save", "nanobanana_save_seconds", {})]
+        for title, name, label_filter in rows:
+            for labels, stats in sorted(registry.quantiles(name, **label_filter).items()):
+                shown = ", ".join(value for key, value in labels if key not in ("model", "phase"))
+                table.add_row(title, shown, str(stats["count"]),
+                              fmt(stats["p50"]), fmt(stats["p95"]), fmt(stats["p99"]))
+        
+        if not table.rows:
+            self.show_info("No requests made in this session yet.")
+            return
+        self.console.print(table)
+        self.console.print()
+    
     def show_settings(self):
         """Show current settings."""
         settings_table = Table(title="Current Settings")
@@ -847,6 +920,7 @@ class NanoBananaUI:
             ("default_theme", config.get("default_theme"), "Default text-to-image theme"),
             ("save_history", config.get("save_history"), "Save generation history"),
             ("max_history_items", config.get("max_history_items"), "Maximum history entries"),
+            ("history_backend", config.get("history_backend"), "History storage (jsonl or sqlite)"),
             ("auto_open_images", config.get("auto_open_images"), "Auto-open generated images")
         ]
         
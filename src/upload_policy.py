@@ -0,0 +1,176 @@
+"""Input image upload policy for NanoBanana Pro.
+
+The image model works at roughly 1-2 megapixels, so camera-sized inputs are
+downscaled and re-encoded before upload instead of being sent at full size.
+Inputs that already fit and use a format the API accepts are sent as their
+original bytes without being decoded.
+"""
+
+import os
+import mmap
+import logging
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from .config import config
+from .image_probe import image_probe
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp"
+}
+
+@dataclass
+class UploadInfo:
+    """What the policy did with one input image."""
+    source: str
+    original_size: Tuple[int, int]
+    uploaded_size: Tuple[int, int]
+    original_bytes: int
+    uploaded_bytes: int
+    path: str  # "passthrough", "reencoded" or "resized"
+
+@dataclass
+class UploadPolicy:
+    """Limits applied to input images before they are sent to the model."""
+    max_long_edge: int = 2048
+    max_megapixels: float = 4.0
+    format: str = "JPEG"
+    quality: int = 90
+
+    @classmethod
+    def from_config(cls) -> 'UploadPolicy':
+        """Create a policy from the user configuration."""
+        upload_format = str(config.get("upload_format", "JPEG")).upper()
+        if upload_format == "JPG":
+            upload_format = "JPEG"
+        if upload_format not in MIME_TYPES:
+            upload_format = "JPEG"
+        return cls(
+            max_long_edge=int(config.get("upload_max_edge", 2048)),
+            max_megapixels=float(config.get("upload_max_megapixels", 4.0)),
+            format=upload_format,
+            quality=int(config.get("upload_quality", 90))
+        )
+
+    def target_size(self, width: int, height: int) -> Optional[Tuple[int, int]]:
+        """Return the downscaled size for an image, or None if it already fits."""
+        scale = 1.0
+        if self.max_long_edge > 0 and max(width, height) > self.max_long_edge:
+            scale = self.max_long_edge / max(width, height)
+        if self.max_megapixels > 0 and width * height * scale * scale > self.max_megapixels * 1_000_000:
+            scale = (self.max_megapixels * 1_000_000 / (width * height)) ** 0.5
+
+        if scale >= 1.0:
+            return None
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    def prepare_path(self, image_path: str) -> Tuple[Any, UploadInfo]:
+        """Prepare an image file for upload; returns request content and what was done."""
+        # Header metadata is usually cached already from validation
+        meta = image_probe.probe(image_path)
+        target = self.target_size(meta.width, meta.height)
+
+        if target is None and meta.format in MIME_TYPES:
+            info = UploadInfo(image_path, meta.dimensions, meta.dimensions,
+                              meta.file_size, meta.file_size, "passthrough")
+            blob = {"mime_type": MIME_TYPES[meta.format], "data": self._read_mapped(image_path)}
+            self._log(info)
+            return blob, info
+
+        with Image.open(image_path) as img:
+            return self._resize_and_encode(img, target or img.size, image_path, meta.file_size)
+
+    def prepare_bytes(self, data: bytes, source: str = "<memory>") -> Tuple[Any, UploadInfo]:
+        """Prepare encoded image bytes (e.g. a previous response) for upload."""
+        with Image.open(BytesIO(data)) as img:
+            target = self.target_size(*img.size)
+            if target is None and img.format in MIME_TYPES:
+                info = UploadInfo(source, img.size, img.size, len(data), len(data), "passthrough")
+                self._log(info)
+                return {"mime_type": MIME_TYPES[img.format], "data": data}, info
+
+            return self._resize_and_encode(img, target or img.size, source, len(data))
+
+    def prepare_image(self, img: Image.Image, source: str = "<memory>") -> Tuple[Any, UploadInfo]:
+        """Prepare a PIL image for upload; it is always encoded as it is now.
+
+        Pass files to ``prepare_path`` instead so they can be sent as their original bytes.
+        """
+        target = self.target_size(*img.size)
+        return self._resize_and_encode(img, target or img.size, source, 0)
+
+    def _read_mapped(self, image_path: str) -> bytes:
+        """Read a file's bytes through a read-only memory map."""
+        with open(image_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # The SDK's Blob proto needs a bytes object, so this is the only copy
+                return mapped[:]
+
+    def _resize_and_encode(self, img: Image.Image, target: Tuple[int, int],
+                           source: str, original_bytes: int) -> Tuple[Dict[str, Any], UploadInfo]:
+        """Downscale with Pillow's fast paths and encode with the target codec."""
+        original_size = img.size
+        reducing_gap = 2.0
+        needs_resize = target != img.size
+
+        # JPEG can decode directly at 1/2, 1/4 or 1/8 scale, never below the target
+        # (no-op once the image has been loaded)
+        if img.format == "JPEG" and needs_resize:
+            img.draft("RGB", target)
+
+        # Palette and exotic modes don't resample well
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode == "PA" else "RGB")
+
+        # Cheap integer box reduction down to ~2x the target, then a quality resize
+        if needs_resize:
+            factor = min(img.width // int(target[0] * reducing_gap), img.height // int(target[1] * reducing_gap))
+            if factor >= 2:
+                img = img.reduce(factor)
+            img = img.resize(target, Image.Resampling.LANCZOS)
+
+        # Orientation is lost on re-encode, so bake it into the pixels
+        img = ImageOps.exif_transpose(img)
+        img = self._convert_mode(img)
+
+        buffer = BytesIO()
+        save_args = {"quality": self.quality} if self.format in ("JPEG", "WEBP") else {}
+        img.save(buffer, self.format, **save_args)
+        data = buffer.getvalue()
+
+        info = UploadInfo(source, original_size, img.size, original_bytes, len(data),
+                          "resized" if needs_resize else "reencoded")
+        self._log(info)
+        return {"mime_type": MIME_TYPES[self.format], "data": data}, info
+
+    def _convert_mode(self, img: Image.Image) -> Image.Image:
+        """Convert the image to a mode the target encoder supports."""
+        if self.format == "JPEG":
+            if img.mode in ("RGBA", "LA", "P"):
+                # Flatten transparency onto white like convert_2_jpg does
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                return background
+            if img.mode != "RGB":
+                return img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L", "LA"):
+            return img.convert("RGBA")
+        return img
+
+    def _log(self, info: UploadInfo):
+        """Log original vs. uploaded size and the upload path for an input image."""
+        logger.debug(
+            "Upload %s: %dx%d (%d bytes) -> %dx%d (%d bytes) [%s]",
+            info.source, info.original_size[0], info.original_size[1], info.original_bytes,
+            info.uploaded_size[0], info.uploaded_size[1], info.uploaded_bytes, info.path
+        )
@@ -0,0 +1,112 @@
+"""Background write-behind queue for generated images and history entries.
+
+Saving images and rewriting the history file happen on a small thread pool,
+so the UI and batch runner can move on as soon as the response arrives. The
+number of queued writes is bounded, so submitting blocks once too many
+payloads are waiting and memory stays in check. Writes queued from inside
+another write never wait for a free slot (the slot may only free up once the
+calling write finishes); they run right away on the calling worker instead.
+"""
+
+import atexit
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """Bounded thread pool that runs disk writes in the background."""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 16):
+        self.max_workers = max(1, max_workers)
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending: Set[Future] = set()
+        self._errors: List[str] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+
+    def in_worker(self) -> bool:
+        """Whether the calling thread is running a queued write."""
+        return getattr(self._local, "active", False)
+
+    def _run(self, func: Callable[..., Any], args: tuple) -> Any:
+        self._local.active = True
+        try:
+            return func(*args)
+        finally:
+            self._local.active = False
+
+    def submit(self, func: Callable[..., Any], *args, description: str = "write") -> Future:
+        """Queue ``func(*args)``; blocks while the queue is full.
+
+        Called from a queued write with the queue full, ``func`` runs
+        immediately instead, so workers never wait on each other.
+        """
+        if not self._slots.acquire(blocking=not self.in_worker()):
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                logger.warning("Background %s failed: %s", description, e)
+                with self._lock:
+                    self._errors.append(f"{description}: {e}")
+                future.set_exception(e)
+            return future
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="write-behind")
+                future = self._executor.submit(self._run, func, args)
+                self._pending.add(future)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda f: self._done(f, description))
+        return future
+
+    def _done(self, future: Future, description: str):
+        """Record a finished write and release its slot."""
+        error = future.exception()
+        with self._lock:
+            self._pending.discard(future)
+            if error is not None:
+                logger.warning("Background %s failed: %s", description, error)
+                self._errors.append(f"{description}: {error}")
+            self._idle.notify_all()
+        self._slots.release()
+
+    @property
+    def pending(self) -> int:
+        """Number of writes that have not finished yet."""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, timeout: Optional[float] = None) -> List[str]:
+        """Wait for every queued write; return and clear the errors seen so far.
+
+        Must not be called from inside a queued write.
+        """
+        with self._lock:
+            self._idle.wait_for(lambda: not self._pending, timeout=timeout)
+            errors, self._errors = self._errors, []
+        return errors
+
+    def shutdown(self):
+        """Flush and stop the worker threads."""
+        self.flush()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+# Global queue shared by the client, config and batch runner
+write_behind = WriteBehindQueue()
+
+# Never lose queued writes on a normal interpreter exit
+atexit.register(write_behind.shutdown)
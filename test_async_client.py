@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for the async Gemini client (no API calls are made).
+"""
+
+import sys
+import os
+import asyncio
+import time
+from types import SimpleNamespace
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+
+class SlowImageModel:
+    """Stand-in for the Gemini model that sleeps instead of calling the API."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+
+    async def generate_content_async(self, content):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        part = SimpleNamespace(text=None, inline_data=SimpleNamespace(data=b"png-bytes"))
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+def _run_batch(max_concurrency: int, count: int, delay: float):
+    from src.gemini_client import AsyncGeminiClient
+
+    client = AsyncGeminiClient(max_concurrency=max_concurrency)
+    model = SlowImageModel(delay)
+    client.backend._image_model = model
+
+    async def run():
+        return await asyncio.gather(*[
+            client.generate_text_to_image_async(f"prompt {i}", "square-small") for i in range(count)
+        ])
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    return results, model.peak, time.perf_counter() - start
+
+
+def test_async_concurrency_limit():
+    """In-flight requests never exceed the configured limit."""
+    print("Testing async concurrency limit...")
+
+    results, peak, _ = _run_batch(max_concurrency=3, count=9, delay=0.02)
+
+    assert all(success for success, _, _ in results)
+    assert all(images == [b"png-bytes"] for _, _, images in results)
+    assert peak == 3, f"expected 3 in-flight requests, saw {peak}"
+    print(f"✓ Peak in-flight requests: {peak}")
+
+
+def test_async_throughput_scales():
+    """Wall time shrinks as the concurrency limit grows."""
+    print("Testing async throughput scaling...")
+
+    _, _, serial = _run_batch(max_concurrency=1, count=8, delay=0.02)
+    _, _, parallel = _run_batch(max_concurrency=8, count=8, delay=0.02)
+
+    assert parallel < serial / 2, f"parallel {parallel:.3f}s vs serial {serial:.3f}s"
+    print(f"✓ Serial {serial:.3f}s, parallel {parallel:.3f}s")
+
+
+def test_async_client_survives_new_event_loops():
+    """The shared client keeps limiting concurrency across separate asyncio.run calls."""
+    from src.gemini_client import AsyncGeminiClient
+
+    client = AsyncGeminiClient(max_concurrency=2)
+    model = SlowImageModel(0.01)
+    client.backend._image_model = model
+
+    async def run():
+        return await asyncio.gather(*[
+            client.generate_text_to_image_async(f"prompt {i}", "square-small") for i in range(6)
+        ])
+
+    for _ in range(2):
+        results = asyncio.run(run())
+        assert all(success for success, _, _ in results), results
+    assert model.peak == 2
+    print("✓ Concurrency limit works on a second event loop")
+
+
+def test_async_errors_report_attempts():
+    """Failed async requests mention the retries, like the synchronous client."""
+    from src.backends import FakeBackend
+    from src.config import config
+    from src.gemini_client import AsyncGeminiClient
+
+    original = dict(config.settings)
+    config.settings.update({"retry_base_delay": 0.0, "retry_max_attempts": 3, "rate_limit_rpm": 0})
+    try:
+        backend = FakeBackend(latency_mean=0, server_error_rate=1.0, default_size="16x16", seed=1)
+        client = AsyncGeminiClient(backend=backend)
+        success, message, _ = asyncio.run(client.generate_text_to_image_async("prompt", "square-small"))
+        assert not success and message.endswith("(after 3 attempts)"), message
+        assert client.generate_text_to_image("prompt", "square-small")[1] == message
+        print(f"✓ Async error: {message}")
+    finally:
+        config.settings.clear()
+        config.settings.update(original)
+
+
+if __name__ == "__main__":
+    test_async_concurrency_limit()
+    test_async_throughput_scales()
+    test_async_client_survives_new_event_loops()
+    test_async_errors_report_attempts()
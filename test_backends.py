@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the local fake generation backend.
+"""
+
+import sys
+import os
+from io import BytesIO
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def test_fake_backend_returns_sized_pngs():
+    """The fake backend honours the resolution preset and payload size."""
+    print("Testing fake backend output...")
+    from PIL import Image
+    from src.backends import FakeBackend
+
+    backend = FakeBackend(latency_mean=0, payload_kb=64)
+    text, images = backend.generate(["a cat The output image should be exactly 640x360 pixels."])
+    img = Image.open(BytesIO(images[0]))
+    img.load()
+    assert img.format == "PNG" and img.size == (640, 360)
+    assert abs(len(images[0]) - 64 * 1024) < 16 and text.startswith("Fake image")
+
+    _, images = backend.generate(["no size given"])
+    assert Image.open(BytesIO(images[0])).size == (1024, 1024)
+    print("✓ Synthetic PNGs match the requested size and payload")
+
+
+def test_fake_backend_failures_are_classified():
+    """Simulated failures map onto the client's error categories deterministically."""
+    print("Testing fake backend failures...")
+    from src.backends import FakeBackend
+    from src.retry import classify_error
+
+    def outcomes(seed):
+        backend = FakeBackend(latency_mean=0, rate_limit_rate=0.2, server_error_rate=0.2,
+                              safety_rate=0.2, default_size="8x8", seed=seed)
+        results = []
+        for _ in range(200):
+            try:
+                backend.generate(["x"])
+                results.append("ok")
+            except Exception as e:
+                results.append(classify_error(e))
+        return results
+
+    results = outcomes(seed=7)
+    assert results == outcomes(seed=7)
+    assert set(results) == {"ok", "rate_limit", "server", "safety"}
+    print(f"✓ Outcomes: { {kind: results.count(kind) for kind in set(results)} }")
+
+
+def test_client_uses_injected_backend():
+    """GeminiClient requests, retries and returns results through its backend."""
+    print("Testing client with fake backend...")
+    from src.backends import FakeBackend
+    from src.config import config
+    from src.gemini_client import GeminiClient
+
+    original = dict(config.settings)
+    config.settings.update({"retry_base_delay": 0.0, "retry_max_attempts": 10, "rate_limit_rpm": 0})
+    try:
+        client = GeminiClient(backend=FakeBackend(latency_mean=0, server_error_rate=0.5,
+                                                  default_size="16x16", seed=1))
+        for i in range(5):
+            success, _, images = client.generate_text_to_image(f"prompt {i}", "square-small")
+            assert success and len(images) == 1
+        assert client.retry_totals.snapshot()["retries_by_category"].get("server", 0) > 0
+        print("✓ Server errors from the fake backend were retried")
+    finally:
+        config.settings.clear()
+        config.settings.update(original)
+
+
+if __name__ == "__main__":
+    test_fake_backend_returns_sized_pngs()
+    test_fake_backend_failures_are_classified()
+    test_client_uses_injected_backend()
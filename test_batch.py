@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test the headless batch runner with a stub client (no API calls are made).
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+class StubClient:
+    """Minimal client that records calls instead of talking to Gemini."""
+
+    def __init__(self, fail_prompts=()):
+        self.fail_prompts = set(fail_prompts)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def validate_prompt(self, prompt):
+        return (True, "") if prompt.strip() else (False, "Prompt cannot be empty")
+
+    def generate_text_to_image(self, prompt, resolution=None, cache_mode="use"):
+        with self._lock:
+            self.calls.append(prompt)
+        if prompt in self.fail_prompts:
+            return False, "Error generating image: boom", None
+        return True, "ok", [b"png"]
+
+    def edit_image(self, prompt, image_paths, resolution=None, cache_mode="use"):
+        return self.generate_text_to_image(prompt, resolution)
+
+    def save_images(self, images, prefix="generated_image", on_complete=None):
+        files = [f"images/{prefix}.png"]
+        if on_complete is not None:
+            on_complete(files, [])
+        return files
+
+
+def _write_jobs(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write((json.dumps(record) if isinstance(record, dict) else record) + "\n")
+
+
+def test_batch_resume():
+    """Finished jobs are skipped when the batch is re-run."""
+    print("Testing batch resume...")
+    from src.batch import BatchRunner, load_manifest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = os.path.join(tmp, "jobs.jsonl")
+        manifest = os.path.join(tmp, "jobs.manifest.jsonl")
+        _write_jobs(jobs, [
+            {"id": "a", "prompt": "a red apple", "resolution": "square-small"},
+            {"id": "b", "prompt": "will fail"},
+            {"template": "photorealistic", "parameters": {"subject": "a lighthouse"}},
+            "{not json",
+        ])
+
+        client = StubClient(fail_prompts={"will fail"})
+        stats = BatchRunner(client, manifest, workers=2, save_history=False, quiet=True).run(jobs)
+        assert stats == {"success": 2, "failed": 1, "skipped": 0, "invalid": 1}, stats
+        assert any("a lighthouse" in prompt for prompt in client.calls)
+
+        statuses = load_manifest(manifest)
+        assert statuses["a"] == "success" and statuses["b"] == "failed"
+        print("✓ First run recorded 3 jobs in the manifest")
+
+        # Second run: everything already in the manifest is skipped
+        client = StubClient()
+        stats = BatchRunner(client, manifest, workers=2, save_history=False, quiet=True).run(jobs)
+        assert stats["skipped"] == 3 and not client.calls
+        print("✓ Re-run skipped all recorded jobs")
+
+        # --retry-failed only re-runs the failed job
+        stats = BatchRunner(client, manifest, workers=2, retry_failed=True,
+                            save_history=False, quiet=True).run(jobs)
+        assert client.calls == ["will fail"] and stats["success"] == 1
+        print("✓ Retry re-ran only the failed job")
+
+
+class BackgroundSavingClient(StubClient):
+    """Reports saved files from a write-behind worker, like the real client."""
+
+    def save_images(self, images, prefix="generated_image", on_complete=None):
+        from src.write_behind import write_behind
+
+        files = [f"images/{prefix}.png"]
+        write_behind.submit(on_complete, files, [], description=f"save {prefix}")
+        return files
+
+
+def test_batch_history_does_not_deadlock_write_behind():
+    """More jobs than the write-behind queue holds finish, each with a history entry."""
+    print("Testing batch history with a full write-behind queue...")
+    from src import batch
+    from src.config import Config
+    from src.write_behind import write_behind
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original_cwd, original_config = os.getcwd(), batch.config
+        os.chdir(tmp)
+        try:
+            batch.config = Config()
+            batch.config.settings.update({"save_history": True})
+            jobs = os.path.join(tmp, "jobs.jsonl")
+            count = write_behind._slots._initial_value * 10
+            _write_jobs(jobs, [{"id": f"job{n}", "prompt": f"banana {n}"} for n in range(count)])
+
+            result = {}
+            runner = batch.BatchRunner(BackgroundSavingClient(), jobs + ".manifest", workers=16,
+                                       save_history=True, quiet=True)
+            thread = threading.Thread(target=lambda: result.update(runner.run(jobs)), daemon=True)
+            thread.start()
+            thread.join(timeout=60)
+            assert not thread.is_alive(), "batch deadlocked on the write-behind queue"
+            assert result["success"] == count
+            assert batch.config.history_count() == count
+        finally:
+            batch.config = original_config
+            os.chdir(original_cwd)
+    print(f"✓ {count} jobs recorded without blocking the queue")
+
+
+def test_batch_interrupt_keeps_finished_jobs():
+    """Jobs whose images were saved are in the manifest even when the run is interrupted."""
+    print("Testing batch interrupt...")
+    import time
+    from src import batch
+    from src.write_behind import write_behind
+
+    class SlowSavingClient(StubClient):
+        def save_images(self, images, prefix="generated_image", on_complete=None):
+            def saved():
+                time.sleep(0.2)  # still queued when the run is interrupted
+                on_complete([f"images/{prefix}.png"], [])
+            write_behind.submit(saved, description=f"save {prefix}")
+            return [f"images/{prefix}.png"]
+
+    def interrupted_jobs(path):
+        for n in range(2):
+            yield batch.BatchJob.from_record({"id": f"job{n}", "prompt": f"banana {n}"}, n + 1), None, n + 1
+        time.sleep(0.05)
+        raise KeyboardInterrupt
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = os.path.join(tmp, "jobs.manifest.jsonl")
+        original = batch.iter_jobs
+        batch.iter_jobs = interrupted_jobs
+        try:
+            runner = batch.BatchRunner(SlowSavingClient(), manifest, workers=2, save_history=False, quiet=True)
+            try:
+                runner.run(os.path.join(tmp, "jobs.jsonl"))
+                assert False, "the interrupt should propagate"
+            except KeyboardInterrupt:
+                pass
+        finally:
+            batch.iter_jobs = original
+        assert batch.load_manifest(manifest) == {"job0": "success", "job1": "success"}
+        assert write_behind.flush() == []
+    print("✓ Interrupted run recorded its finished jobs")
+
+
+if __name__ == "__main__":
+    test_batch_resume()
+    test_batch_history_does_not_deadlock_write_behind()
+    test_batch_interrupt_keeps_finished_jobs()
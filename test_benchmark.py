@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Test the benchmark regression check.
+"""
+
+import sys
+import os
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_benchmark_threshold_flags_regressions():
+    """Only stages slower than the threshold are reported as regressions."""
+    print("Testing benchmark comparison...")
+    from benchmark import compare
+
+    baseline = {"stages": {"save_images": {"median": 0.010}, "fill_template": {"median": 0.001}}}
+    results = {"stages": {"save_images": {"median": 0.013}, "fill_template": {"median": 0.00105},
+                          "directory_scan": {"median": 0.05}}}
+
+    assert compare(results, baseline, threshold=20) == ["save_images"]
+    assert compare(results, baseline, threshold=50) == []
+    assert compare(results, baseline, threshold=None) == []
+    print("✓ Regressions above the threshold are reported")
+
+
+if __name__ == "__main__":
+    test_benchmark_threshold_flags_regressions()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test recording and replaying generation responses with a cassette.
+"""
+
+import sys
+import os
+import time
+import tempfile
+import zipfile
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def test_record_then_replay():
+    """Recorded responses, errors and latencies are served back from the cassette."""
+    print("Testing cassette record/replay...")
+    from src.backends import FakeBackend
+    from src.cassette import RecordingBackend, ReplayBackend
+    from src.retry import classify_error
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.cassette")
+        inner = FakeBackend(latency_distribution="constant", latency_mean=0.05,
+                            default_size="32x32", seed=3)
+        recorder = RecordingBackend(inner, path)
+        blob = {"mime_type": "image/png", "data": b"input"}
+        first = recorder.generate(["a cat", blob])
+        second = recorder.generate(["a dog"])
+        recorder.generate(["a cat", blob])  # identical response image is stored once
+        inner.safety_rate = 1.0
+        try:
+            recorder.generate(["something unsafe"])
+        except Exception:
+            pass
+        recorder.close()
+
+        with zipfile.ZipFile(path) as archive:
+            assert len([n for n in archive.namelist() if n.startswith("blobs/")]) == 2
+        print("✓ Interactions recorded with deduplicated images")
+
+        replay = ReplayBackend(path, timing_scale=0.5)
+        start = time.perf_counter()
+        assert replay.generate(["a cat", blob]) == first
+        assert 0.02 <= time.perf_counter() - start < 0.05
+        assert replay.generate(["a dog"]) == second
+        try:
+            replay.generate(["something unsafe"])
+            assert False, "expected the recorded safety block"
+        except Exception as e:
+            assert classify_error(e) == "safety"
+        try:
+            replay.generate(["never recorded"])
+            assert False, "expected a missing recording"
+        except LookupError:
+            pass
+        print("✓ Replay serves recorded responses with scaled timing")
+
+        sequential = ReplayBackend(path, timing_scale=0, match="sequential")
+        assert sequential.generate(["anything"]) == first
+        assert sequential.generate(["anything"]) == second
+
+
+if __name__ == "__main__":
+    test_record_then_replay()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test the trigram file name index used by the browser's search.
+"""
+
+import sys
+import os
+import random
+import fnmatch
+import tempfile
+from array import array
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def _make_names(count: int, seed: int = 7):
+    """Random photo-like names spread over a few dated directories."""
+    rng = random.Random(seed)
+    words = ["Sunset", "beach", "family", "vacation", "portrait", "garden", "snow", "river", "dog", "cat"]
+    directories = [""] + [os.path.join(str(year), f"{month:02d}_{rng.choice(words)}", "")
+                          for year in range(2019, 2024) for month in range(1, 13)]
+    names, dir_ids = [], array('I')
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.5:
+            name = f"IMG_{rng.randrange(10000):04d}.JPG"
+        elif kind < 0.7:
+            name = f"dsc{rng.randrange(1000):03d}.jpg"
+        else:
+            name = f"{rng.choice(words)}_{rng.choice(words)}_{rng.randrange(100)}.png"
+        names.append(name)
+        dir_ids.append(rng.randrange(len(directories)))
+    return names, dir_ids, directories
+
+
+def test_search_matches_a_linear_scan():
+    """Keyword and glob results are exactly what a scan of every path finds, best matches first."""
+    from src.filename_index import FilenameIndex
+
+    names, dir_ids, directories = _make_names(5000)
+    index = FilenameIndex(names, dir_ids, directories)
+    paths = [(directories[d] + n).lower() for n, d in zip(names, dir_ids)]
+
+    for query in ["img_12", "sunset", "beach 2021", "Dog", "g_", "2020 cat", ".png"]:
+        terms = query.lower().split()
+        expected = {i for i, path in enumerate(paths) if all(term in path for term in terms)}
+        hits = index.search(query)
+        assert {hit.index for hit in hits} == expected, query
+        scores = [hit.score for hit in hits]
+        assert scores == sorted(scores, reverse=True)
+
+    for pattern in ["IMG_1*", "*.png", "dsc?0?.jpg", "*[0-9]_sunset_*", "2022/*"]:
+        target = paths if "/" in pattern else [n.lower() for n in names]
+        expected = {i for i, text in enumerate(target) if fnmatch.fnmatchcase(text, pattern.lower())}
+        assert {hit.index for hit in index.search(pattern)} == expected, pattern
+
+    # A keyword at the start of the name ranks before one in the middle or in the directory
+    top = index.search("sunset", limit=1)[0]
+    assert names[top.index].lower().startswith("sunset") and top.score == 3.0
+    print("✓ Search matches a linear scan")
+
+
+def test_fuzzy_search_and_persistence():
+    """Misspelled queries fall back to ranked fuzzy matches; stored postings load only for the same names."""
+    from src.directory_index import DirectoryIndex
+    from src.filename_index import FilenameIndex
+
+    names = ["beach_party.jpg", "holiday_sunset.png", "sunset.jpg", "IMG_0001.JPG", "garden.png"]
+    dir_ids = array('I', [0, 0, 1, 1, 0])
+    directories = ["", os.path.join("trips", "")]
+    index = FilenameIndex(names, dir_ids, directories)
+
+    hits = index.search("sunst")
+    assert [names[hit.index] for hit in hits] == ["holiday_sunset.png", "sunset.jpg"]
+    assert all(0 < hit.score < 1 for hit in hits)
+    assert [names[hit.index] for hit in index.search("trips img")] == ["IMG_0001.JPG"]
+    assert index.search("xyzzy") == []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DirectoryIndex(Path(tmp))
+        assert store.load_search_index(tmp, names, dir_ids, directories) is None
+        store.save_search_index(tmp, index)
+        assert index.saved
+
+        loaded = store.load_search_index(tmp, names, dir_ids, directories)
+        assert loaded is not None and loaded.saved
+        for query in ["sunst", "*.png", "img", "trips"]:
+            assert loaded.search(query) == index.search(query)
+        # Different names: the stored postings don't apply
+        assert store.load_search_index(tmp, names[:-1] + ["other.png"], dir_ids, directories) is None
+    print("✓ Fuzzy search and stored index")
+
+
+if __name__ == "__main__":
+    test_search_matches_a_linear_scan()
+    test_fuzzy_search_and_persistence()
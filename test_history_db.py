@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite history backend: import, keyset paging, search and compaction.
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def _entry(n: int) -> dict:
+    return {
+        "mode": "image-editing" if n % 3 == 0 else "text-to-image",
+        "theme_or_feature": "photorealistic",
+        "prompt": f"a {'red panda' if n % 2 else 'banana'} number {n}",
+        "resolution": "square-medium",
+        "generated_files": [f"images/text2img_{n:06d}.png"],
+        "timestamp": f"2025-01-{1 + n // 1000:02d}T00:00:{n % 60:02d}"
+    }
+
+
+def test_sqlite_history_imports_pages_and_searches():
+    """Existing history is imported once; filtered pages follow keyset cursors."""
+    print("Testing SQLite history...")
+    from src.history_db import SQLiteHistoryStore
+    from src.history_store import HistoryQuery, HistoryStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = Path(tmp) / "history.jsonl"
+        HistoryStore(jsonl).append([_entry(n) for n in range(5000)])
+
+        store = SQLiteHistoryStore(Path(tmp) / "history.db", import_paths=(jsonl,))
+        assert store.count() == 5000
+        assert not jsonl.exists() and Path(f"{jsonl}.migrated").exists()
+        assert [e["prompt"] for e in store.iter_newest(2)] == ["a red panda number 4999", "a banana number 4998"]
+
+        # Keyset paging visits every match exactly once
+        query = HistoryQuery.parse("search red panda mode:text-to-image")
+        seen, cursor = [], None
+        while True:
+            page, cursor = store.query(query, cursor, limit=100)
+            seen += [int(e["prompt"].split()[-1]) for e in page]
+            if cursor is None:
+                break
+        expected = [n for n in range(4999, -1, -1) if n % 2 and n % 3]
+        assert seen == expected
+
+        page, _ = store.query(HistoryQuery.parse("since:2025-01-05"), limit=3)
+        assert all(e["timestamp"] >= "2025-01-05" for e in page)
+        page, cursor = store.query(HistoryQuery.parse("file:text2img_000042"))
+        assert [e["prompt"] for e in page] == ["a banana number 42"] and cursor is None
+        # FTS syntax characters in terms are taken literally
+        page, _ = store.query(HistoryQuery.parse('search 100%" OR'))
+        assert page == []
+        page, _ = store.query(HistoryQuery.parse('search "100"'))
+        assert page == []
+        page, _ = store.query(HistoryQuery.parse("search number 4100"))
+        assert [e["prompt"] for e in page] == ["a banana number 4100"]
+
+        # Only the newest max_items are visible, and compaction deletes the rest
+        page, _ = store.query(limit=10, max_items=5)
+        assert len(page) == 5
+        assert store.needs_compaction(1000)
+        store.compact(1000)
+        assert store.count() == 1000
+        assert store.query(HistoryQuery.parse("number 3999"))[0] == []
+
+        started = time.perf_counter()
+        store.query(HistoryQuery.parse("search panda"), limit=10)
+        print(f"  first search page in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+        store.clear()
+        assert store.count() == 0 and store.query(HistoryQuery.parse("panda"))[0] == []
+        store.close()
+    print("✓ SQLite history imports, pages and searches")
+
+
+def test_sqlite_history_imports_legacy_json():
+    """A legacy newest-first history.json is imported in order."""
+    from src.history_db import SQLiteHistoryStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Path(tmp) / "history.json"
+        legacy.write_text(json.dumps([_entry(2), _entry(1), _entry(0)]), encoding="utf-8")
+        store = SQLiteHistoryStore(Path(tmp) / "history.db", import_paths=(legacy,))
+        store.append([_entry(3)])
+        assert [e["prompt"][-1] for e in store.iter_newest()] == ["3", "2", "1", "0"]
+        store.close()
+
+        # The import is one-shot: reopening doesn't import again
+        legacy.write_text(json.dumps([_entry(9)]), encoding="utf-8")
+        store = SQLiteHistoryStore(Path(tmp) / "history.db", import_paths=(legacy,))
+        assert store.count() == 4
+        store.close()
+    print("✓ Legacy history imported once")
+
+
+def test_sqlite_search_matches_jsonl_search():
+    """Substrings, Chinese prompts and short terms find the same entries as the JSONL log."""
+    import sqlite3
+    from src.history_db import SQLiteHistoryStore
+    from src.history_store import HistoryQuery, HistoryStore
+
+    prompts = ["two cats playing", "一只戴帽子的猫", "猫和狗", "a dog in a hat", "Catalog cover"]
+    entries = [{"mode": "text-to-image", "prompt": p, "timestamp": f"2025-01-01T00:00:0{n}"}
+               for n, p in enumerate(prompts)]
+    with tempfile.TemporaryDirectory() as tmp:
+        # A database created with the old word tokenizer is reindexed on open
+        db = Path(tmp) / "history.db"
+        conn = sqlite3.connect(str(db))
+        conn.execute("CREATE VIRTUAL TABLE history_fts USING fts5(prompt, content='history', content_rowid='id')")
+        conn.close()
+
+        jsonl = HistoryStore(Path(tmp) / "history.jsonl")
+        jsonl.append(entries)
+        store = SQLiteHistoryStore(db)
+        store.append(entries)
+        for text in ["search 猫", "search 戴帽子", "search cat", "search CAT playing", "search 狗 猫",
+                     "search at", "search hat", "search 帽子的猫 一只"]:
+            query = HistoryQuery.parse(text)
+            expected = [e["prompt"] for e in jsonl.query(query, limit=10)[0]]
+            assert expected, text
+            assert [e["prompt"] for e in store.query(query, limit=10)[0]] == expected, text
+        store.close()
+    print("✓ SQLite search matches the JSONL search")
+
+
+if __name__ == "__main__":
+    test_sqlite_history_imports_pages_and_searches()
+    test_sqlite_history_imports_legacy_json()
+    test_sqlite_search_matches_jsonl_search()
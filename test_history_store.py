@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test the append-only history log: reverse reading, compaction and migration.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def test_history_store_reads_newest_first_and_compacts():
+    """Entries stream newest first across block boundaries; compaction keeps the newest."""
+    print("Testing history store...")
+    from src import history_store
+    from src.history_store import HistoryStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(Path(tmp) / "history.jsonl")
+        assert list(store.iter_newest()) == []
+        assert store.count() == 0
+
+        padding = "x" * 300  # spread entries over several read blocks
+        for start in range(0, 1000, 100):
+            store.append([{"n": n, "prompt": padding} for n in range(start, start + 100)])
+        assert os.path.getsize(store.path) > 3 * history_store.BLOCK_SIZE
+
+        assert [e["n"] for e in store.iter_newest(5)] == [999, 998, 997, 996, 995]
+        assert [e["n"] for e in store.iter_newest()] == list(range(999, -1, -1))
+        assert store.count() == 1000
+
+        # A line torn by a crash mid-append is skipped
+        with open(store.path, "a", encoding="utf-8") as f:
+            f.write('{"n": 1000, "pro')
+        assert next(store.iter_newest())["n"] == 999
+
+        assert store.needs_compaction(500)
+        assert not store.needs_compaction(900)
+        store.compact(500)
+        assert store.count() == 500
+        assert [e["n"] for e in store.iter_newest()] == list(range(999, 499, -1))
+
+        store.clear()
+        assert list(store.iter_newest()) == []
+    print("✓ History store reads newest first and compacts")
+
+
+def test_history_store_migrates_legacy_json():
+    """A newest-first history.json is converted to the log once."""
+    from src.history_store import HistoryStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Path(tmp) / "history.json"
+        legacy.write_text(json.dumps([{"n": 2}, {"n": 1}, {"n": 0}]), encoding="utf-8")
+
+        store = HistoryStore(Path(tmp) / "history.jsonl", legacy_path=legacy)
+        store.append([{"n": 3}])
+        assert [e["n"] for e in store.iter_newest()] == [3, 2, 1, 0]
+        assert not legacy.exists()
+    print("✓ Legacy history migrated")
+
+
+def test_history_query_filters_and_pages():
+    """Filter text is parsed into a query; the log pages through matches."""
+    from src.history_store import HistoryQuery, HistoryStore
+
+    query = HistoryQuery.parse("search Red Panda mode:text-to-image since:2025-01-02")
+    assert query.terms == ["Red", "Panda"] and query.mode == "text-to-image"
+    assert query.since == "2025-01-02T00:00:00"
+    assert HistoryQuery.parse("since:7d").since > "2025"
+    assert HistoryQuery.parse("  ").empty
+    try:
+        HistoryQuery.parse("since:yesterday")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(Path(tmp) / "history.jsonl")
+        store.append([{"n": n, "mode": "text-to-image", "prompt": "red panda" if n % 2 else "banana",
+                       "timestamp": f"2025-01-0{1 + n // 10}T00:00:00"} for n in range(30)])
+        page, cursor = store.query(query, limit=4)
+        assert [e["n"] for e in page] == [29, 27, 25, 23]
+        page, cursor = store.query(query, cursor, limit=4)
+        assert [e["n"] for e in page] == [21, 19, 17, 15]
+        page, cursor = store.query(query, cursor, limit=4)
+        assert [e["n"] for e in page] == [13, 11] and cursor is None
+    print("✓ History queries filter and page")
+
+
+def test_config_history_appends_in_background():
+    """Config.add_to_history appends to the log and honours max_history_items."""
+    from src.config import Config
+    from src.write_behind import write_behind
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original_cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            config = Config()
+            config.settings.update({"save_history": True, "max_history_items": 3})
+            for n in range(5):
+                config.add_to_history({"mode": "text-to-image", "prompt": f"banana {n}"})
+
+            history = config.get_history()
+            assert [e["prompt"] for e in history] == ["banana 4", "banana 3", "banana 2"]
+            assert all("timestamp" in e for e in history)
+            assert config.history_count() == 3
+            assert not write_behind.flush()
+
+            config.clear_history()
+            assert config.get_history() == []
+        finally:
+            os.chdir(original_cwd)
+    print("✓ Config history uses the log")
+
+
+if __name__ == "__main__":
+    test_history_store_reads_newest_first_and_compacts()
+    test_history_store_migrates_legacy_json()
+    test_history_query_filters_and_pages()
+    test_config_history_appends_in_background()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test perceptual hashing and near-duplicate grouping.
+"""
+
+import sys
+import os
+import random
+import tempfile
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def _make_photos(root: Path):
+    """Five distinct pictures, each with a resized and a recompressed copy."""
+    from PIL import Image, ImageDraw
+
+    originals = []
+    for n in range(5):
+        rng = random.Random(n)
+        img = Image.new("RGB", (640, 480), tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(img)
+        for _ in range(12):
+            x, y = rng.randrange(600), rng.randrange(440)
+            draw.ellipse((x, y, x + rng.randrange(40, 300), y + rng.randrange(40, 300)),
+                         fill=tuple(rng.randrange(256) for _ in range(3)))
+        path = root / f"shot_{n}.png"
+        img.save(path)
+        img.resize((400, 300)).save(root / f"shot_{n}_small.jpg", quality=85)
+        img.save(root / f"shot_{n}_low.jpg", quality=40)
+        originals.append(path)
+    return originals
+
+
+def test_multi_index_matches_brute_force():
+    """Range queries return exactly the hashes a linear scan would."""
+    from src.image_hash import MultiIndex
+
+    rng = random.Random(42)
+    values = [rng.getrandbits(64) for _ in range(2000)]
+    values += [v ^ (1 << rng.randrange(64)) for v in values[:200]]  # close neighbours
+    for radius in (0, 3, 6, 10):
+        index = MultiIndex(radius)
+        for position, value in enumerate(values):
+            index.add(value, position)
+        for probe in values[:50]:
+            found = sorted(position for _, position in index.search(probe))
+            assert found == [i for i, v in enumerate(values) if (v ^ probe).bit_count() <= radius]
+    print("✓ Multi-index range search")
+
+
+def test_near_duplicates_are_grouped():
+    """Resized and recompressed copies land in one group per picture, with and without numpy."""
+    print("Testing near-duplicate detection...")
+    from src import image_hash
+    from src.thumbnail_cache import ThumbnailCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _make_photos(root)
+        paths = sorted(str(p) for p in root.iterdir())
+        cache = ThumbnailCache(root / "thumbs")
+
+        methods = ["dhash", "phash"] if image_hash.np is not None else ["dhash"]
+        for method in methods:
+            hashes = image_hash.compute_hashes(paths, method, cache=cache)
+            groups = image_hash.group_near_duplicates(hashes, image_hash.DEFAULT_THRESHOLDS[method])
+            assert sorted(sorted(os.path.basename(p) for p in g) for g in groups) == [
+                [f"shot_{n}.png", f"shot_{n}_low.jpg", f"shot_{n}_small.jpg"] for n in range(5)], method
+
+        if image_hash.np is not None:
+            # The pure-Python dHash agrees with the vectorized one
+            with_numpy = image_hash.compute_hashes(paths, "dhash", cache=cache)
+            image_hash._hash_cache.clear()
+            np, image_hash.np = image_hash.np, None
+            try:
+                assert image_hash.compute_hashes(paths, "dhash", cache=cache) == with_numpy
+            finally:
+                image_hash.np = np
+    print("✓ Near duplicates grouped")
+
+
+if __name__ == "__main__":
+    test_multi_index_matches_brute_force()
+    test_near_duplicates_are_grouped()
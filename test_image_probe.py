@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test header-only image probing and its metadata cache.
+"""
+
+import sys
+import os
+import time
+import tempfile
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def test_image_probe_caches_until_file_changes():
+    """Probed metadata is reused until the file's size or mtime changes."""
+    print("Testing image probe...")
+    from PIL import Image
+    from src.image_probe import ImageProbe
+
+    probe = ImageProbe(max_entries=2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "photo.jpg")
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees
+        Image.new("RGB", (320, 200)).save(path, exif=exif)
+
+        meta = probe.probe(path)
+        assert meta.format == "JPEG" and meta.dimensions == (320, 200)
+        assert meta.display_dimensions == (200, 320)
+        assert probe.probe(path) is meta and probe.hits == 1
+        print("✓ Second probe is served from the cache")
+
+        time.sleep(0.01)
+        Image.new("RGB", (64, 48)).save(path)
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+        assert probe.probe(path).dimensions == (64, 48)
+        print("✓ Changed files are probed again")
+
+        missing = os.path.join(tmp, "missing.png")
+        results = probe.probe_many([path, missing])
+        assert results[missing] is None and results[path].format == "JPEG"
+        print("✓ probe_many returns None for unreadable files")
+
+
+if __name__ == "__main__":
+    test_image_probe_caches_until_file_changes()
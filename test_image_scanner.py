@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Test the parallel image scanner and the browser's use of it.
+"""
+
+import sys
+import os
+import time
+import tempfile
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def _make_tree(root: Path):
+    for rel in ["b.png", "A.jpg", "notes.txt", "Zoo/z1.webp", "zoo2/deep/d1.PNG", "zoo2/deep/deeper/d2.jpg",
+                ".hidden/h.jpg", "node_modules/pkg/icon.png", "cache_tmp/c.png", "empty/readme.md"]:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\xff\xd8\xff" + rel.encode())
+    if hasattr(os, "symlink"):
+        try:
+            os.symlink(root, root / "zoo2" / "loop")  # must not be followed
+        except OSError:
+            pass
+
+
+def test_scanner_walks_in_parallel_with_depth_and_ignore():
+    """The scanner honours hidden/ignored names and depth, and orders results like the browser."""
+    print("Testing image scanner...")
+    from src.image_scanner import ImageScanner, iter_images
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _make_tree(root)
+
+        scanner = ImageScanner(ignore=["node_modules", "*_tmp"], max_workers=4)
+        tree = scanner.scan(root)
+        found = [os.path.join(listing.relative, f.name) for listing, f in iter_images(tree)]
+        assert found == [os.path.join("Zoo", "z1.webp"), os.path.join("zoo2", "deep", "deeper", "d2.jpg"),
+                         os.path.join("zoo2", "deep", "d1.PNG"), "A.jpg", "b.png"]
+        assert tree.image_count == 5
+        assert [os.path.basename(c.listing.path) for c in tree.children] == ["empty", "Zoo", "zoo2"]
+
+        # Sequential and parallel walks agree; progress reports running totals
+        progress = []
+        sequential = ImageScanner(ignore=["node_modules", "*_tmp"], max_workers=1).scan(
+            root, on_listing=lambda listing, dirs, images: progress.append((dirs, images)))
+        assert [f.name for _, f in iter_images(sequential)] == [os.path.basename(p) for p in found]
+        assert progress[-1] == (6, 5)
+
+        shallow = ImageScanner(max_depth=1, ignore=["node_modules", "*_tmp"]).scan(root)
+        assert [f.name for _, f in iter_images(shallow)] == ["z1.webp", "A.jpg", "b.png"]
+
+        # Stopping a streaming walk early doesn't hang
+        walk = scanner.walk(root)
+        assert next(walk).relative == ""
+        walk.close()
+
+        assert scanner.scan(root / "missing") is None
+    print("✓ Scanner honours ignore list and depth limit")
+
+
+def test_browser_scan_is_cached():
+    """The browser scans a directory once until asked to rescan."""
+    from rich.console import Console
+    from src.enhanced_image_browser import EnhancedImageBrowser
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _make_tree(root)
+        browser = EnhancedImageBrowser(Console(file=open(os.devnull, "w")))
+        browser.use_index = False
+        browser.current_directory = root
+
+        images, subdirs = browser._scan_cached(root)
+        assert [img.relative_path for img in images][-2:] == ["A.jpg", "b.png"]
+        # The default ignore list skips node_modules but not cache_tmp
+        assert images[0].path == str(root / "cache_tmp" / "c.png")
+        assert [(d.name, d.image_count) for d in subdirs] == [("cache_tmp", 1), ("Zoo", 1), ("zoo2", 2)]
+
+        (root / "new.png").write_bytes(b"\x89PNG")
+        assert browser._scan_cached(root)[0] is images
+        assert len(browser._scan_cached(root, refresh=True)[0]) == len(images) + 1
+
+        images, _ = browser._scan_images_in_directory(root, recursive=False)
+        assert [img.name for img in images] == ["A.jpg", "b.png", "new.png"]
+    print("✓ Browser caches scans")
+
+
+def test_directory_index_revalidates_changed_directories():
+    """A stored index is reused; only directories whose mtime changed are listed again."""
+    from src.directory_index import DirectoryIndex
+    from src.image_probe import ImageMeta, image_probe
+    from src.image_scanner import ImageScanner, iter_images, iter_listings
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "tree"
+        root.mkdir()
+        _make_tree(root)
+        index = DirectoryIndex(Path(tmp) / "index", max_indexes=2)
+        scanner = ImageScanner(max_workers=2)
+
+        tree = scanner.scan(root)
+        path = str(root / "A.jpg")
+        st = os.stat(path)
+        image_probe.prime([ImageMeta(path, "JPEG", 640, 480, "RGB", 1, st.st_size, st.st_mtime_ns)])
+        index.save(str(root), scanner, iter_listings(tree))
+        image_probe.clear()
+
+        previous = index.load(str(root), scanner)
+        assert [f.name for _, f in iter_images(scanner.build_tree(previous))] == \
+               [f.name for _, f in iter_images(tree)]
+        assert image_probe.cached(path).dimensions == (640, 480)
+        assert index.load(str(root), ImageScanner(max_depth=1)) is None  # other settings
+
+        # Unchanged tree: every listing is reused as-is
+        _, changed = index.refresh(str(root), scanner, previous)
+        assert not changed
+
+        # Adding a file changes only that directory's mtime
+        (root / "zoo2" / "deep" / "new.jpg").write_bytes(b"\xff\xd8\xff")
+        os.utime(root / "zoo2" / "deep", ns=(st.st_mtime_ns, st.st_mtime_ns + 10 ** 9))
+        fresh, changed = index.refresh(str(root), scanner, previous)
+        assert changed
+        names = [f.name for _, f in iter_images(fresh)]
+        assert "new.jpg" in names and len(names) == len(list(iter_images(tree))) + 1
+        listings = {n.listing.relative: n.listing for n in fresh.children}
+        assert listings["Zoo"] is previous["Zoo"]
+        assert listings["zoo2"] is previous["zoo2"]
+
+        # Only the most recent indexes are kept
+        for name in ("a", "b"):
+            other = Path(tmp) / name
+            other.mkdir()
+            index.save(str(other), scanner, iter_listings(scanner.scan(other)))
+        assert len(list((Path(tmp) / "index").glob("*.json"))) == 2
+        index.clear()
+        assert index.load(str(root), scanner) is None
+    print("✓ Directory index revalidates by mtime")
+
+
+def test_browser_shows_index_then_refreshes_in_background():
+    """Reopening the browser uses the index and picks up changes found in the background."""
+    from rich.console import Console
+    from src.enhanced_image_browser import EnhancedImageBrowser
+    from src.write_behind import write_behind
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original_cwd = os.getcwd()
+        os.chdir(tmp)  # the index lives under ./.nanobanana
+        try:
+            root = Path(tmp) / "tree"
+            root.mkdir()
+            _make_tree(root)
+            console = Console(file=open(os.devnull, "w"))
+
+            first = EnhancedImageBrowser(console)
+            first.current_directory = root
+            images, _ = first._scan_cached(root)
+            # The search index is built on its own thread; only its file is written behind
+            deadline = time.time() + 5
+            while time.time() < deadline and not list(Path(tmp).glob(".nanobanana/index/*.names")):
+                time.sleep(0.01)
+            write_behind.flush()
+            assert len(list(Path(tmp).glob(".nanobanana/index/*.names"))) == 1
+
+            (root / "added.png").write_bytes(b"\x89PNG")
+            st = os.stat(root)
+            os.utime(root, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+            second = EnhancedImageBrowser(console)
+            second.current_directory = root
+            cached, _ = second._scan_cached(root)
+            assert [img.path for img in cached] == [img.path for img in images]
+
+            deadline = time.time() + 5
+            while time.time() < deadline and str(root) not in second._refreshed:
+                time.sleep(0.01)
+            updated, _ = second._scan_cached(root)
+            assert len(updated) == len(images) + 1
+        finally:
+            os.chdir(original_cwd)
+    print("✓ Browser refreshes from the index in the background")
+
+
+def test_image_catalog_stores_columns():
+    """The catalog matches the scan order and answers the selection queries from its columns."""
+    from src.enhanced_image_browser import ImageCatalog
+    from src.image_scanner import ImageScanner, iter_images, iter_listings
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _make_tree(root)
+        tree = ImageScanner().scan(root)
+        catalog = ImageCatalog.from_tree(tree, prefix="sub")
+
+        expected = [(listing, scanned) for listing, scanned in iter_images(tree)]
+        assert len(catalog) == len(expected)
+        for info, (listing, scanned) in zip(catalog, expected):
+            assert info.path == os.path.join(listing.path, scanned.name) == catalog.path(catalog.names.index(info.name))
+            assert (info.size, info.mtime_ns, info.directory) == (scanned.size, scanned.mtime_ns, listing.path)
+            assert info.relative_path == os.path.join("sub", listing.relative, scanned.name)
+        assert [img.name for img in catalog[-2:]] == ["A.jpg", "b.png"]
+        assert len(catalog.dir_paths) == 5  # only directories with images
+
+        # Directory structure and index listings come from the catalog, not the scan tree
+        assert ({l.relative: (l.files, l.subdirs, l.mtime_ns) for l in catalog.listings()}
+                == {l.relative: (l.files, l.subdirs, l.mtime_ns) for l in iter_listings(tree)})
+        counts = {}
+        stack = catalog.directory_infos()
+        while stack:
+            info = stack.pop()
+            counts[info.path] = info.image_count
+            stack.extend(info.subdirs)
+        expected_counts = {}
+        for listing, _ in expected:
+            path = listing.path
+            while path != str(root):
+                expected_counts[path] = expected_counts.get(path, 0) + 1
+                path = os.path.dirname(path)
+        assert counts == expected_counts
+
+        groups = catalog.by_directory()
+        deep = os.path.join(tmp, "zoo2", "deep")
+        assert [catalog.names[i] for i in groups[deep]] == ["d1.PNG"]
+        subset = catalog.subset(groups[str(root)])
+        assert [img.relative_path for img in subset] == [os.path.join("sub", "A.jpg"), os.path.join("sub", "b.png")]
+
+        # Search covers the relative path, and subsets get their own index
+        assert [catalog.names[hit.index] for hit in catalog.search("*.png")] == ["c.png", "d1.PNG", "b.png"]
+        assert [catalog.names[hit.index] for hit in catalog.search("zoo deep")] == ["d2.jpg", "d1.PNG"]
+        assert [subset.names[hit.index] for hit in subset.search("b.p")] == ["b.png"]
+    print("✓ Image catalog stores columns")
+
+
+def test_browser_list_view_formats_only_visible_rows():
+    """Pages are rendered from cached cells and the scan's stat data, without touching files again."""
+    from PIL import Image
+    from src.enhanced_image_browser import ImageCatalog, ImageListView
+    from src.image_probe import image_probe
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "real.png"
+        Image.new("RGB", (64, 48)).save(path)
+        st = os.stat(path)
+        images = ImageCatalog()
+        directory = images.add_directory(tmp, "")
+        images.append(directory, "real.png", st.st_size, st.st_mtime_ns)
+        for n in range(100000):
+            images.append(directory, f"missing_{n}.jpg", 1, 1)
+        view = ImageListView(images)
+
+        page = view.render(0, 6, {1}, cols=2).plain.split("\n")
+        assert len(page) == 3
+        # Column-major like the old list: row 0 holds items 1 and 4
+        assert page[0].startswith("  1. real.png") and "64x48    4. missing_2.jpg" in page[0]
+        assert page[1].startswith("✓ 2. missing_0.jpg")
+        assert len(view._cells) == 6  # nothing beyond the page was formatted
+
+        misses = image_probe.misses
+        cell = view.cell(0, 1, False)
+        view.render(0, 6, {1}, cols=2)
+        assert view.cell(0, 1, False) is cell
+        assert image_probe.misses == misses
+
+        last = view.render(len(images) - 2, len(images), set(), cols=2).plain
+        assert "missing_99999.jpg" in last and len(view._cells) == 8
+    print("✓ Browser list renders visible rows only")
+
+
+def test_picker_walks_once_and_stops_early():
+    """The legacy picker lists nearest images first, stops at the limit and counts the rest."""
+    from src.image_scanner import ImageScanner
+    from src.ui import NanoBananaUI
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _make_tree(root)
+        found = [path for path, _ in ImageScanner(max_workers=1).iter_files(str(root))]
+        assert [os.path.relpath(p, tmp) for p in found] == [
+            "A.jpg", "b.png", os.path.join("cache_tmp", "c.png"), os.path.join("Zoo", "z1.webp"),
+            os.path.join("zoo2", "deep", "d1.PNG"), os.path.join("zoo2", "deep", "deeper", "d2.jpg")]
+
+        ui = NanoBananaUI()
+        images = ui._scan_for_images(tmp, limit=2)
+        assert [os.path.basename(p) for p in images] == ["A.jpg", "b.png"]
+        assert ui._image_size_text(images[0]) == ui._format_file_size(os.path.getsize(root / "A.jpg"))
+        assert ui._image_count.wait(5) and ui._image_count.count == len(found)
+
+        assert len(ui._scan_for_images(tmp, recursive=False)) == 2
+        assert ui._image_count is None
+    print("✓ Picker scan stops early and counts in the background")
+
+
+if __name__ == "__main__":
+    test_scanner_walks_in_parallel_with_depth_and_ignore()
+    test_browser_scan_is_cached()
+    test_directory_index_revalidates_changed_directories()
+    test_browser_shows_index_then_refreshes_in_background()
+    test_image_catalog_stores_columns()
+    test_browser_list_view_formats_only_visible_rows()
+    test_picker_walks_once_and_stops_early()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test that starting the CLI doesn't load the Gemini SDK or the mode modules.
+"""
+
+import sys
+import os
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+HEAVY_MODULES = ("google.generativeai", "google.api_core", "PIL", "src.gemini_client",
+                 "src.text_to_image", "src.image_editing", "src.chat_image", "src.enhanced_image_browser")
+
+# Wall-clock budget for `import src.main` in a fresh interpreter (about 0.13 s here; margin for slow CI)
+IMPORT_BUDGET_SECONDS = 0.5
+
+def _import_in_subprocess(statement: str) -> dict:
+    """Run an import in a fresh interpreter; return its duration and loaded heavy modules."""
+    code = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    env = {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "dummy")}
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_main_import_is_light():
+    """Importing the CLI entry point defers the SDK, Pillow and the mode modules."""
+    print("Testing CLI import time...")
+    results = [_import_in_subprocess("import src.main") for _ in range(3)]
+    for result in results:
+        assert result["loaded"] == [], result["loaded"]
+    # Best of three, so one slow start on a busy machine doesn't fail the test
+    seconds = min(result["seconds"] for result in results)
+    assert seconds < IMPORT_BUDGET_SECONDS, f"import src.main took {seconds:.2f} s"
+    print(f"✓ src.main imported in {seconds * 1000:.0f} ms without heavy modules")
+
+def test_package_import_does_not_load_app():
+    """Importing a helper module doesn't pull in the UI through the package."""
+    result = _import_in_subprocess("import src.image_probe")
+    assert "src.gemini_client" not in result["loaded"]
+    code = "import sys, src; print('src.main' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+    print("✓ Package import is lazy")
+
+if __name__ == "__main__":
+    test_main_import_is_light()
+    test_package_import_does_not_load_app()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test request metrics and the Prometheus textfile export.
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def test_histogram_quantiles_and_prometheus_export():
+    """Histograms report nearest-rank quantiles and cumulative buckets."""
+    print("Testing metrics registry...")
+    from src.metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    for ms in range(1, 101):
+        registry.observe("demo_seconds", ms / 1000, buckets=(0.01, 0.05), mode="text-to-image")
+    registry.inc("demo_total", 3, mode="text-to-image")
+
+    (labels, stats), = registry.quantiles("demo_seconds", mode="text-to-image").items()
+    assert (stats["p50"], stats["p95"], stats["p99"]) == (0.05, 0.095, 0.099)
+    assert stats["count"] == 100
+
+    text = registry.to_prometheus()
+    assert 'demo_seconds_bucket{mode="text-to-image",le="0.01"} 10' in text
+    assert 'demo_seconds_bucket{mode="text-to-image",le="+Inf"} 100' in text
+    assert 'demo_total{mode="text-to-image"} 3' in text
+
+    with tempfile.TemporaryDirectory() as tmp:
+        summary = os.path.join(tmp, "metrics.jsonl")
+        registry.export(os.path.join(tmp, "nanobanana.prom"), summary)
+        registry.export(None, summary)
+        with open(summary) as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 2 and lines[0]["counters"][0]["value"] == 3
+    print("✓ Quantiles, textfile and JSONL summary are consistent")
+
+
+def test_client_records_call_metrics():
+    """Each client request records its outcome, phases and payload sizes."""
+    print("Testing client call metrics...")
+    from src.backends import FakeBackend
+    from src.config import config
+    from src.gemini_client import GeminiClient
+    from src.metrics import metrics
+
+    original = dict(config.settings)
+    config.settings.update({"retry_max_attempts": 1, "rate_limit_rpm": 0, "response_cache": False})
+    metrics.reset()
+    try:
+        client = GeminiClient(backend=FakeBackend(latency_mean=0, default_size="16x16"))
+        client.generate_text_to_image("a pear", "square-small")
+        client.backend.safety_rate = 1.0
+        client.generate_text_to_image("blocked", "square-small")
+
+        text = metrics.to_prometheus()
+        assert 'outcome="success",resolution="square-small"} 1' in text
+        assert 'outcome="safety",resolution="square-small"} 1' in text
+        network = metrics.quantiles("nanobanana_request_phase_seconds", phase="network")
+        assert sum(stats["count"] for stats in network.values()) == 2
+        print("✓ Success and failure outcomes are recorded")
+    finally:
+        config.settings.clear()
+        config.settings.update(original)
+        metrics.reset()
+
+
+if __name__ == "__main__":
+    test_histogram_quantiles_and_prometheus_export()
+    test_client_records_call_metrics()
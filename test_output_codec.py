@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test the output codec used when saving generated images.
+"""
+
+import sys
+import os
+import subprocess
+import tempfile
+from io import BytesIO
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def _png_bytes(size=(64, 48)):
+    from PIL import Image
+    buffer = BytesIO()
+    Image.new("RGB", size, (30, 144, 255)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_output_codec_passthrough_and_reencode():
+    """PNG bytes are written untouched by default and re-encoded on request."""
+    print("Testing output codec...")
+    from PIL import Image
+    from src.output_codec import OutputCodec, sniff_format
+
+    data = _png_bytes()
+    assert sniff_format(data) == ("PNG", ".png")
+
+    for codec in (OutputCodec("original"), OutputCodec("png")):
+        assert codec.passthrough(data) and codec.encode(data) is data
+        assert codec.extension(data) == ".png"
+    print("✓ PNG responses are written as their original bytes")
+
+    for name, image_format, extension in (("jpeg", "JPEG", ".jpg"),
+                                          ("webp", "WEBP", ".webp"),
+                                          ("webp-lossless", "WEBP", ".webp"),
+                                          ("png-optimized", "PNG", ".png")):
+        codec = OutputCodec(name, quality=80)
+        encoded = codec.encode(data)
+        assert codec.extension(data) == extension
+        img = Image.open(BytesIO(encoded))
+        assert img.format == image_format and img.size == (64, 48)
+    print("✓ Configured codecs re-encode in the process pool")
+
+
+def test_encodes_queued_at_exit_still_run():
+    """Images still being encoded by write-behind at interpreter exit are written after the pool closes."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        # write_behind first: its exit hook then runs after the process pool has shut down
+        code = (
+            "import sys, time\n"
+            f"sys.path.insert(0, {root!r})\n"
+            "from src.write_behind import write_behind\n"
+            "from src.output_codec import OutputCodec\n"
+            "from test_output_codec import _png_bytes\n"
+            "codec, data = OutputCodec('webp', 80), _png_bytes()\n"
+            "codec.encode(data)\n"
+            "def write(i):\n"
+            "    time.sleep(0.2)\n"
+            "    encoded = codec.encode(data)\n"
+            f"    open({tmp!r} + f'/{{i}}.webp', 'wb').write(encoded)\n"
+            "for i in range(3):\n"
+            "    write_behind.submit(write, i, description=f'image {i}')\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=tmp, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        assert "failed" not in result.stderr, result.stderr
+        assert sorted(os.listdir(tmp)) == ["0.webp", "1.webp", "2.webp"]
+    print("✓ Queued encodes finish at exit")
+
+
+if __name__ == "__main__":
+    test_output_codec_passthrough_and_reencode()
+    test_encodes_queued_at_exit_still_run()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test the on-disk response cache.
+"""
+
+import sys
+import os
+import tempfile
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def test_cache_roundtrip_and_lru():
+    """Cached responses round-trip and the least recently used entry is evicted."""
+    print("Testing response cache...")
+    from src.response_cache import ResponseCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(tmp, max_bytes=2500)
+        key_a = ResponseCache.make_key("model", "prompt a")
+        key_b = ResponseCache.make_key("model", "prompt b")
+        key_c = ResponseCache.make_key("model", "prompt c")
+
+        assert ResponseCache.make_key("model", "prompt a", ["h1"]) != key_a
+        assert cache.get(key_a) is None
+
+        cache.put(key_a, "text a", [b"a" * 1000])
+        cache.put(key_b, None, [b"b" * 500, b"B" * 500])
+        assert cache.get(key_a) == ("text a", [b"a" * 1000])
+        assert cache.get(key_b) == (None, [b"b" * 500, b"B" * 500])
+        print("✓ Entries round-trip text and image bytes")
+
+        # key_a was used least recently, so adding key_c evicts it
+        cache.get(key_b)
+        cache.put(key_c, "text c", [b"c" * 1000])
+        assert cache.get(key_a) is None
+        assert cache.get(key_c) is not None
+
+        stats = cache.stats()
+        assert stats["entries"] == 2 and stats["bytes"] <= 2500
+        assert stats["hits"] == 4 and stats["misses"] == 2
+        print(f"✓ LRU eviction keeps cache within budget ({stats['bytes']} bytes)")
+
+        # A new instance rebuilds its index from disk
+        reopened = ResponseCache(tmp, max_bytes=2500)
+        assert reopened.stats()["entries"] == 2
+        print("✓ Cache index survives restarts")
+
+
+if __name__ == "__main__":
+    test_cache_roundtrip_and_lru()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test error classification and retry with backoff (no API calls are made).
+"""
+
+import sys
+import os
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def test_error_classification():
+    """API errors map to the expected categories."""
+    print("Testing error classification...")
+    from google.api_core import exceptions as api_exceptions
+    from src import retry
+
+    assert retry.classify_error(api_exceptions.TooManyRequests("slow down")) == retry.RATE_LIMIT
+    assert retry.classify_error(api_exceptions.ServiceUnavailable("try later")) == retry.SERVER
+    assert retry.classify_error(api_exceptions.Unauthenticated("bad key")) == retry.AUTH
+    assert retry.classify_error(ConnectionResetError("reset by peer")) == retry.NETWORK
+    assert retry.classify_error(FileNotFoundError("missing.png")) == retry.FILE
+    assert retry.classify_error(ValueError("Response blocked by safety settings")) == retry.SAFETY
+    assert retry.classify_error(ValueError("something odd")) == retry.UNKNOWN
+    print("✓ Errors classified correctly")
+
+
+def test_retry_policy():
+    """Retryable errors are retried; auth and safety errors fail immediately."""
+    print("Testing retry policy...")
+    from src.retry import RetryPolicy, RetryStats, RetryTotals, call_with_retry
+
+    policy = RetryPolicy(max_attempts=4, base_delay=0.001, max_delay=0.01, deadline=5)
+    totals = RetryTotals()
+
+    failures = [ConnectionResetError("reset"), RuntimeError("429 quota exceeded")]
+
+    def flaky():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    stats = RetryStats()
+    assert call_with_retry(flaky, policy, stats, totals) == "ok"
+    assert stats.attempts == 3 and stats.retries == 2
+    print(f"✓ Recovered after {stats.retries} retries ({stats.backoff_seconds * 1000:.1f}ms backoff)")
+
+    def unauthorized():
+        raise RuntimeError("401 unauthorized")
+
+    stats = RetryStats()
+    try:
+        call_with_retry(unauthorized, policy, stats, totals)
+        assert False, "auth errors should not be swallowed"
+    except RuntimeError:
+        pass
+    assert stats.attempts == 1 and stats.retries == 0
+    print("✓ Auth errors fail without retrying")
+
+    def always_busy():
+        raise RuntimeError("503 service unavailable")
+
+    stats = RetryStats()
+    try:
+        call_with_retry(always_busy, policy, stats, totals)
+    except RuntimeError:
+        pass
+    assert stats.attempts == 4
+    assert totals.snapshot()["retries"] == 2 + 3
+    print("✓ Attempts are capped by max_attempts")
+
+
+if __name__ == "__main__":
+    test_error_classification()
+    test_retry_policy()
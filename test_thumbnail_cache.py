@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the thumbnail cache and half-block previews.
+"""
+
+import sys
+import os
+import shutil
+import time
+import tempfile
+from pathlib import Path
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def _make_images(root: Path, count: int):
+    from PIL import Image
+
+    paths = []
+    for n in range(count):
+        path = root / f"photo_{n:02d}.jpg"
+        Image.new("RGB", (1600, 1200), (n * 6 % 256, 120, 200)).save(path, "JPEG", quality=80)
+        paths.append(str(path))
+    Image.new("RGBA", (300, 100), (255, 0, 0, 128)).save(root / "alpha.png")
+    paths.append(str(root / "alpha.png"))
+    return paths
+
+
+def test_thumbnails_are_content_keyed_and_render_quickly():
+    """Thumbnails are built once per content; cached previews of a page render fast."""
+    print("Testing thumbnail cache...")
+    from PIL import Image
+    from src.thumbnail_cache import ThumbnailCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = _make_images(root, 40)
+        cache = ThumbnailCache(root / "thumbs")
+
+        thumbs = cache.ensure(paths)
+        for path in paths:
+            with Image.open(thumbs[path]) as thumb:
+                assert max(thumb.size) == cache.size
+        with Image.open(thumbs[str(root / "alpha.png")]) as thumb:
+            assert thumb.size == (128, 43) and thumb.mode == "RGB"
+
+        # A copy has the same content key and reuses the thumbnail
+        shutil.copy(paths[0], root / "copy.jpg")
+        assert cache.key(str(root / "copy.jpg")) == cache.key(paths[0])
+        assert cache.ensure([str(root / "not-there.jpg")]) == {str(root / "not-there.jpg"): None}
+
+        # Same-size uncompressed files differing only in the middle get different keys
+        first, second = root / "first.bmp", root / "second.bmp"
+        Image.new("RGB", (512, 512), (0, 0, 0)).save(first)
+        img = Image.new("RGB", (512, 512), (0, 0, 0))
+        img.putpixel((256, 256), (255, 255, 255))
+        img.save(second)
+        assert first.stat().st_size == second.stat().st_size
+        assert cache.key(str(first)) != cache.key(str(second))
+
+        # A failed write leaves no temporary file behind
+        from src.thumbnail_cache import make_thumbnail
+        dest = root / "thumbs" / "missing-dir" / "x.jpg"
+        assert not make_thumbnail(paths[0], str(dest))
+        assert make_thumbnail(paths[0], str(root / "ok.jpg"))
+        assert not [p for p in root.rglob("*.tmp")]
+        blocked = root / "thumbs" / "blocked.jpg"
+        blocked.mkdir(parents=True)  # os.replace onto a directory fails after the save
+        assert not make_thumbnail(paths[0], str(blocked))
+        assert not [p for p in root.rglob("*.tmp")]
+
+        preview = cache.preview(paths[1], 22, 8)
+        assert len(preview.plain.split("\n")) == 8
+        assert max(len(line) for line in preview.plain.split("\n")) == 21  # 4:3 fitted into 22x16 pixels
+
+        # Once thumbnails exist, a fresh cache renders a 40-image page from disk
+        fresh = ThumbnailCache(root / "thumbs")
+        started = time.perf_counter()
+        fresh.ensure(paths[:40])
+        previews = [fresh.preview(path, 22, 8) for path in paths[:40]]
+        elapsed = time.perf_counter() - started
+        assert all(previews)
+        assert elapsed < 1.0
+        print(f"  40 cached previews in {elapsed * 1000:.0f} ms")
+
+        fresh.prune(max_bytes=0)
+        assert not list((root / "thumbs").glob("*/*.jpg"))
+    print("✓ Thumbnail cache builds and renders previews")
+
+
+if __name__ == "__main__":
+    test_thumbnails_are_content_keyed_and_render_quickly()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test the input image upload policy.
+"""
+
+import sys
+import os
+import tempfile
+from io import BytesIO
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def test_upload_policy_downscales_large_images():
+    """Camera-sized inputs are downscaled; small inputs are left alone."""
+    print("Testing upload policy...")
+    from PIL import Image
+    from src.upload_policy import UploadPolicy
+
+    policy = UploadPolicy(max_long_edge=1024, max_megapixels=0.5, format="JPEG", quality=85)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        large = os.path.join(tmp, "large.jpg")
+        Image.new("RGB", (4000, 3000), (200, 120, 40)).save(large, quality=95)
+
+        content, info = policy.prepare_path(large)
+        assert info.path == "resized"
+        assert content["mime_type"] == "image/jpeg"
+        uploaded = Image.open(BytesIO(content["data"]))
+        assert max(uploaded.size) <= 1024
+        assert uploaded.size[0] * uploaded.size[1] <= 500_000
+        assert info.uploaded_bytes < info.original_bytes
+        print(f"✓ {info.original_size} -> {info.uploaded_size}")
+
+        small = os.path.join(tmp, "small.png")
+        Image.new("RGBA", (400, 300), (0, 0, 0, 0)).save(small)
+        content, info = policy.prepare_path(small)
+        assert info.path == "passthrough" and info.uploaded_size == (400, 300)
+        with open(small, "rb") as f:
+            assert content == {"mime_type": "image/png", "data": f.read()}
+        print("✓ Small PNG/JPEG inputs are sent as their original bytes")
+
+        gif = os.path.join(tmp, "small.gif")
+        Image.new("P", (64, 64)).save(gif)
+        content, info = policy.prepare_path(gif)
+        assert info.path == "reencoded" and content["mime_type"] == "image/jpeg"
+        print("✓ Unsupported formats are re-encoded without resizing")
+
+        # An opened image is encoded as it is, even if it still only has its header loaded
+        with Image.open(large) as img:
+            img.draft("RGB", (500, 375))
+            content, info = policy.prepare_image(img, large)
+        assert info.path == "reencoded" and info.original_size == (500, 375)
+        assert Image.open(BytesIO(content["data"])).size == info.uploaded_size
+        print("✓ PIL images are never replaced by their file's bytes")
+
+
+if __name__ == "__main__":
+    test_upload_policy_downscales_large_images()
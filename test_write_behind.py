@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the background write-behind queue.
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+from io import StringIO
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def test_write_behind_queue_is_bounded_and_flushes():
+    """Writes run in the background, the queue is bounded and flush reports errors."""
+    print("Testing write-behind queue...")
+    from src.write_behind import WriteBehindQueue
+
+    queue = WriteBehindQueue(max_workers=1, max_pending=2)
+    release = threading.Event()
+    done = []
+
+    queue.submit(release.wait)
+    queue.submit(done.append, 1)
+    assert queue.pending == 2
+
+    # A third write has to wait for a free slot
+    blocked = threading.Thread(target=queue.submit, args=(done.append, 2))
+    blocked.start()
+    time.sleep(0.05)
+    assert blocked.is_alive()
+    print("✓ Submitting blocks while the queue is full")
+
+    release.set()
+    blocked.join(timeout=2)
+    queue.submit(lambda: 1 / 0, description="bad write")
+    errors = queue.flush()
+    assert done == [1, 2] and queue.pending == 0
+    assert len(errors) == 1 and errors[0].startswith("bad write")
+    assert queue.flush() == []
+    print("✓ flush waits for every write and returns errors once")
+    queue.shutdown()
+
+
+def test_save_images_writes_in_background():
+    """save_images returns paths immediately and reports them once written."""
+    print("Testing background image saving...")
+    from io import BytesIO
+    from PIL import Image
+    from src.config import config
+    from src.gemini_client import GeminiClient
+    from src.write_behind import write_behind
+
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), (255, 0, 0)).save(buffer, "PNG")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original_dir = config.IMAGES_DIR
+        config.IMAGES_DIR = tmp
+        try:
+            results = []
+            paths = GeminiClient().save_images([buffer.getvalue(), b"not an image"], "bg",
+                                               on_complete=lambda files, errors: results.append((files, errors)))
+            assert len(paths) == 2
+            assert write_behind.flush() == []  # the broken image is reported to on_complete only
+            files, errors = results[0]
+            assert files == [paths[0]] and len(errors) == 1
+            assert Image.open(paths[0]).size == (8, 8)
+            assert not os.path.exists(paths[1]) and not os.path.exists(paths[1] + ".tmp")
+            print("✓ Saved paths and errors are reported after the writes finish")
+        finally:
+            config.IMAGES_DIR = original_dir
+
+
+def test_ui_records_only_written_images():
+    """The interactive save reports failed images and keeps them out of history."""
+    print("Testing interactive save reporting...")
+    from io import BytesIO
+    from PIL import Image
+    from rich.console import Console
+    from src import ui as ui_module
+    from src.config import Config, config
+    from src.gemini_client import GeminiClient
+
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), (0, 255, 0)).save(buffer, "PNG")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original_cwd, original_config, original_dir = os.getcwd(), ui_module.config, config.IMAGES_DIR
+        original_console = ui_module.ui.console
+        os.chdir(tmp)
+        try:
+            ui_module.config = Config()
+            config.IMAGES_DIR = tmp
+            ui_module.ui.console = Console(file=StringIO(), width=200)
+            saved = ui_module.ui.save_generated_images(GeminiClient(), [buffer.getvalue(), b"not an image"],
+                                                       "ui", {"mode": "text-to-image", "prompt": "green"})
+            assert len(saved) == 1 and os.path.exists(saved[0])
+            history = ui_module.config.get_history()
+            assert [entry["generated_files"] for entry in history] == [saved]
+            output = ui_module.ui.console.file.getvalue()
+            assert "Error saving image 2" in output and "Saved 1 image(s)" in output
+        finally:
+            ui_module.config, config.IMAGES_DIR = original_config, original_dir
+            ui_module.ui.console = original_console
+            os.chdir(original_cwd)
+    print("✓ Failed images are reported and left out of history")
+
+
+if __name__ == "__main__":
+    test_write_behind_queue_is_bounded_and_flushes()
+    test_save_images_writes_in_background()
+    test_ui_records_only_written_images()